@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import numpy as np
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import time
 from tickers import TICKER_CATEGORIES
+from market_data import get_history, fetch_many, IN_FLIGHT
+from bar_cache import BAR_CACHE
+from quarantine import QUARANTINE
+import panel
+from panel import Panel
+import ranking
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Set page config
 st.set_page_config(
@@ -55,52 +61,46 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=3600)  # Cache data for 1 hour
-def calculate_mcso(ticker_symbol, period="1mo", interval="1d"):
+def fetch_mcso_data(ticker_symbol, period="1mo", interval="1d"):
     """
-    Calculate MCSO (Monthly Cycle Swing Oscillator) for a given ticker.
-    MCSO = ((close - month_low) / (month_high - month_low)) * 100
+    Fetch the bars the MCSO of a ticker is calculated from.
+    Returns None if there is not enough data.
     """
     try:
         # Index tickers (starting with ^) need a longer period to ensure enough data
         actual_period = "3mo" if ticker_symbol.startswith('^') else period
         
-        # Get historical data
-        data = yf.download(ticker_symbol, period=actual_period, interval=interval, progress=False)
+        # Get historical data through the shared bar cache (bars are reused for 1 hour while
+        # the market is open and until the next session once it has closed)
+        data = get_history(ticker_symbol, period=actual_period, interval=interval, max_age=3600, app="mcso")
         
         # Check if data is empty or too small
         if data.empty or len(data) < 5:  # Need at least a few days of data
-            return None, None, None, None
+            return None
         
         # For index tickers, use more recent data matching the original requested period
         if ticker_symbol.startswith('^') and period == "1mo":
             # Keep approximately one month of trading days
             data = data.tail(22)  # ~22 trading days in a month
         
-        # Calculate monthly high and low (using last 20 bars as in the script)
-        month_high = data['High'].rolling(window=20).max().iloc[-1]
-        month_low = data['Low'].rolling(window=20).min().iloc[-1]
-        close = data['Close'].iloc[-1]
-        
-        # Convert to float to ensure scalar values
-        try:
-            month_high = float(month_high)
-            month_low = float(month_low)
-            close = float(close)
-        except (TypeError, ValueError):
-            # If conversion fails, it's likely we have invalid data
-            return None, None, None, None
-        
-        # Calculate MCSO - check numeric equality properly for floats
-        if abs(month_high - month_low) < 1e-6:  # Avoid division by zero
-            return 0, close, month_low, month_high
-        
-        mcso = ((close - month_low) / (month_high - month_low)) * 100
-        return mcso, close, month_low, month_high
+        return data
     
     except Exception as e:
         st.error(f"Error calculating MCSO for {ticker_symbol}: {e}")
-        return None, None, None, None
+        return None
+
+def calculate_mcso(frames):
+    """
+    Calculate MCSO (Monthly Cycle Swing Oscillator) for many tickers in one vectorized pass.
+    MCSO = ((close - month_low) / (month_high - month_low)) * 100, using the last 20 bars.
+    Returns {ticker: (mcso, close, month_low, month_high)}; flat ranges give an MCSO of 0.
+    """
+    bars = Panel(frames, columns=("High", "Low", "Close"))
+    mcso, close, month_low, month_high = panel.window_position(bars["High"], bars["Low"], bars["Close"], window=20)
+    return {
+        ticker: (float(mcso[j]), float(close[j]), float(month_low[j]), float(month_high[j]))
+        for j, ticker in enumerate(bars.symbols)
+    }
 
 # Add new function to display a consolidated "All Tickers" table
 def display_all_tickers_table(results_df, mcso_threshold):
@@ -115,7 +115,7 @@ def display_all_tickers_table(results_df, mcso_threshold):
     styled_df = results_df[['Category', 'Ticker', 'Name', 'MCSO', 'Current', 'Month Low', 'Month High', 'Status']].copy()
     
     # Sort by MCSO (high to low)
-    styled_df = styled_df.sort_values(by='MCSO', ascending=False)
+    styled_df = styled_df.iloc[ranking.order(styled_df['MCSO'])]
     
     # Format the display
     styled_df['MCSO'] = styled_df['MCSO'].round(2)
@@ -147,38 +147,53 @@ def scan_tickers(categories, min_mcso=50, progress_bar=None):
     """
     results = []
     
-    # Get total ticker count for progress tracking
-    ticker_dict = {}
-    total_tickers = 0
-    for category in categories:
-        ticker_dict[category] = TICKER_CATEGORIES[category]
-        total_tickers += len(TICKER_CATEGORIES[category])
+    # Flatten the selected categories into (category, ticker, name) items,
+    # skipping symbols quarantined after repeated fetch failures
+    items = [
+        (category, ticker, name)
+        for category in categories
+        for ticker, name in TICKER_CATEGORIES[category].items()
+        if not QUARANTINE.blocked(ticker)
+    ]
+    tickers = list(dict.fromkeys(ticker for _, ticker, _ in items))
+    total_tickers = len(tickers)
     
-    # Scan tickers
-    processed = 0
-    for category in categories:
-        for ticker, name in ticker_dict[category].items():
-            # Update progress
-            processed += 1
-            if progress_bar is not None:
-                progress_bar.progress(processed / total_tickers, 
-                                     text=f"Processing {ticker} ({processed}/{total_tickers})")
-            
-            # Calculate MCSO
-            mcso, close, month_low, month_high = calculate_mcso(ticker)
-            
-            if mcso is not None:
-                status = "BULLISH" if mcso >= min_mcso else "BEARISH"
-                results.append({
-                    'Category': category,
-                    'Ticker': ticker,
-                    'Name': name,
-                    'MCSO': mcso,
-                    'Current': close,
-                    'Month Low': month_low,
-                    'Month High': month_high,
-                    'Status': status
-                })
+    # Fetch concurrently; worker threads need the script context for Streamlit calls
+    ctx = get_script_run_ctx()
+    frames = {}
+    fetched = fetch_many(
+        tickers,
+        fetch_mcso_data,
+        initializer=lambda: add_script_run_ctx(ctx=ctx)
+    )
+    for processed, (ticker, data, error) in enumerate(fetched, 1):
+        # Update progress
+        if progress_bar is not None:
+            progress_bar.progress(processed / total_tickers, 
+                                 text=f"Processing {ticker} ({processed}/{total_tickers})")
+        if error is None and data is not None:
+            frames[ticker] = data
+    
+    # MCSO for every ticker at once
+    mcso_values = calculate_mcso(frames)
+    
+    # Build results in category order regardless of completion order
+    for item in items:
+        category, ticker, name = item
+        mcso, close, month_low, month_high = mcso_values.get(ticker, (None, None, None, None))
+        
+        if mcso is not None:
+            status = "BULLISH" if mcso >= min_mcso else "BEARISH"
+            results.append({
+                'Category': category,
+                'Ticker': ticker,
+                'Name': name,
+                'MCSO': mcso,
+                'Current': close,
+                'Month Low': month_low,
+                'Month High': month_high,
+                'Status': status
+            })
     
     # Convert to DataFrame
     if results:
@@ -313,7 +328,10 @@ if st.sidebar.button("Run Scan", type="primary"):
         
         # Sort results
         sort_col, sort_asc = sort_options[sort_by]
-        results_df = results_df.sort_values(by=sort_col, ascending=sort_asc)
+        if sort_col == 'MCSO':
+            results_df = results_df.iloc[ranking.order(results_df['MCSO'], descending=not sort_asc)]
+        else:
+            results_df = results_df.sort_values(by=sort_col, ascending=sort_asc)
         
         # Clear progress bar
         progress_bar.empty()
@@ -413,6 +431,20 @@ with st.sidebar.expander("About MCSO Indicator"):
     - Higher MCSO values indicate stronger bullish momentum
     """)
 
+# Bar cache shared with the other Stockbot apps in this process
+with st.sidebar.expander("Bar Cache"):
+    st.dataframe(pd.DataFrame(BAR_CACHE.report()), use_container_width=True, hide_index=True)
+    flight = IN_FLIGHT.stats()
+    st.caption(f"{flight['fetches']} fetches run, {flight['duplicates saved']} duplicate concurrent fetches saved by coalescing")
+
+# Symbols skipped because they keep failing (delisted, renamed, ...)
+quarantined = QUARANTINE.report()
+if quarantined:
+    with st.sidebar.expander(f"Quarantined Symbols ({len(quarantined)})"):
+        st.dataframe(pd.DataFrame(quarantined), use_container_width=True, hide_index=True)
+        if st.button("Retry quarantined symbols"):
+            QUARANTINE.clear()
+
 # Default content when app starts
 if not st.session_state.get('scan_run', False):
     st.info("👈 Select categories and click 'Run Scan' to analyze tickers")
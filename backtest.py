@@ -0,0 +1,316 @@
+"""
+Backtests of the scanners' signals over stored daily histories.
+
+A signal (a strategy setup such as "Potential Long", a dashboard label such
+as "🚀🚀", or the MCSO crossing a level) is replayed on every past bar by
+signals.py, without look-ahead. Trades are then simulated for all symbols
+at once on a daily panel (see panel.py):
+
+- a signal on a bar's close is filled at the next bar's open,
+- a position exits at its stop or target (filled at the level, or at the
+  open when the bar gaps through it; the stop is assumed to come first when
+  a bar reaches both), or at the close of its last holding bar,
+- one position per symbol: signals while a position is open are skipped,
+- positions still open when the data ends are marked at the last close
+  (exit reason "open") and left out of the stats, which are realized only.
+
+Results are memoized by parameter set and the fingerprint of the bars, so
+re-running a backtest (or one with the same signal and other exits) over
+unchanged histories is cheap.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import events
+import market_data
+import panel
+import signals
+import strategy_rules
+from indicator_memo import IndicatorMemo
+
+DEFAULT_PERIOD = "10y"
+DEFAULT_HOLD = 20  # bars
+DEFAULT_STOP = 0.08  # 8% against the entry
+MCSO_WINDOW = 20  # as in the MCSO scanner
+
+# Entry signals and backtest results by parameter set
+BACKTESTS = IndicatorMemo(max_entries=256)
+
+
+def load_histories(symbols, period=DEFAULT_PERIOD, max_age=86400):
+    """Daily histories of many symbols from the bar cache and store. Returns {symbol: daily bars}"""
+    histories = {}
+    fetch = lambda symbol: market_data.get_history(symbol, period, "1d", max_age=max_age, app="backtest")
+    for symbol, data, error in market_data.fetch_many(symbols, fetch):
+        if error is None and data is not None and not data.empty:
+            histories[symbol] = data
+    return {symbol: histories[symbol] for symbol in symbols if symbol in histories}
+
+
+def _key(kind, params, frames):
+    symbols = tuple(frames)
+    return BACKTESTS.key(symbols, "1d", (kind,) + tuple(params), tuple(frames[symbol] for symbol in symbols))
+
+
+def _history(params, frames, compute):
+    """Historical signal tables (see signals.py), memoized like the results"""
+    key = _key("history", params, frames)
+    cached = BACKTESTS.get(key)
+    return cached if cached is not None else BACKTESTS.put(key, compute())
+
+
+def first_days(fired):
+    """True where fired starts a run of days (it did not hold the day before), down the first axis"""
+    previous = np.zeros_like(fired)
+    previous[1:] = fired[:-1]
+    return fired & ~previous
+
+
+def signal_spec(signal):
+    """
+    The compiled spec a signal replays (None for the MCSO) and its trade
+    direction (1 long, -1 short); raises ValueError for unknown signals
+    """
+    kind = signal[0]
+    if kind == "setup":
+        _, name, setup = signal
+        spec = strategy_rules.load_strategies().get(name)
+        if spec is None:
+            raise ValueError(f"Unknown strategy: {name}")
+        sides = [side for side in spec.setups if setup.endswith(" " + side["side"])]
+        if not sides or setup not in signals.setup_labels(spec):
+            raise ValueError(f"{name} has no setup {setup!r}")
+        return spec, sides[0]["direction"]
+    if kind == "dashboard":
+        return strategy_rules.load_scorecard("dashboard"), 1
+    if kind == "mcso":
+        return None, 1
+    raise ValueError(f"Unknown signal: {signal!r}")
+
+
+def spec_version(spec):
+    """The spec a signal replays as sorted JSON (None for the MCSO), so editing a spec file invalidates its entries"""
+    return json.dumps(spec.spec, sort_keys=True) if spec is not None else None
+
+
+def signal_history(signal, spec, frames, cache=None, **settings):
+    """
+    Historical tables (see signals.py) of a signal's spec over clean frames.
+    settings are the dashboard's indicator settings (see
+    signals.dashboard_history); cache is passed to historical_setups.
+    """
+    kind = signal[0]
+    if kind == "setup":
+        return signals.historical_setups(spec, frames, cache=cache)
+    if kind == "dashboard":
+        return signals.dashboard_history(spec, frames, **settings)
+    return signals.mcso_history(frames, signal[2] if len(signal) > 2 else MCSO_WINDOW)
+
+
+def entry_matrix(signal, history, frames):
+    """Days the signal fires in its history tables, as a (bars x symbols) bool matrix on the daily panel of frames"""
+    kind = signal[0]
+    daily = panel.Panel(frames, columns=("Close",))
+    entries = np.zeros((daily.rows, len(daily)), dtype=bool)
+    for j, symbol in enumerate(daily.symbols):
+        table = history.get(symbol)
+        if table is None:
+            continue
+        if kind == "setup":
+            fired = first_days(table["Setup"].to_numpy() == signal[2])
+        elif kind == "dashboard":
+            fired = first_days(table["emoji"].to_numpy() == signal[1])
+        else:
+            fired = events.cross_up(table["MCSO"].to_numpy(), signal[1])
+        rows = daily.index[symbol].get_indexer(table.index[fired])
+        entries[daily.starts[j] + rows, j] = True
+    return entries
+
+
+def entry_signals(signal, frames):
+    """
+    Days a signal fires, as a (bars x symbols) bool matrix on the daily
+    panel of frames, and the trade direction (1 long, -1 short).
+    signal is one of:
+      ("setup", strategy name, setup)   e.g. ("setup", "Strict Strategy", "Potential Long")
+      ("dashboard", label)              e.g. ("dashboard", "🚀🚀")
+      ("mcso", level)                   the MCSO crossing up through level, e.g. ("mcso", 50)
+    Setups and labels fire on the first day they appear, not again while
+    they hold.
+    """
+    spec, direction = signal_spec(signal)
+    frames = signals.clean_frames(frames)
+    version = spec_version(spec)
+    key = _key("entries", (signal, version), frames)
+    cached = BACKTESTS.get(key)
+    if cached is not None:
+        return cached
+    # Every setup of a strategy comes from one replay
+    replayed = signal[:2] if signal[0] == "setup" else signal[:1] + signal[2:]
+    history = _history((replayed, version), frames, lambda: signal_history(signal, spec, frames))
+    return BACKTESTS.put(key, (entry_matrix(signal, history, frames), direction))
+
+
+def simulate(bars, entries, direction=1, hold=DEFAULT_HOLD, stop=DEFAULT_STOP, target=None, cost=0.0):
+    """
+    Trades of every symbol in a daily Panel (Open, High, Low, Close) from a
+    (bars x symbols) entry matrix. stop and target are fractions of the
+    entry price (None for no stop/target), hold is the most bars a trade is
+    held and cost is charged once per trade as a fraction.
+    Returns a DataFrame with a row per trade.
+    """
+    if hold < 1:
+        raise ValueError("hold must be at least one bar")
+    open_, high, low, close = (bars[column] for column in ("Open", "High", "Low", "Close"))
+    # A signal on the last bar has no next open to fill at
+    signal_rows, columns = np.nonzero(entries[:-1])
+    entry_rows = signal_rows + 1
+    fills = open_[entry_rows, columns]
+    valid = fills > 0
+    signal_rows, columns, entry_rows, fills = signal_rows[valid], columns[valid], entry_rows[valid], fills[valid]
+
+    # Every candidate trade's holding window, one row of `hold` bars each
+    window_rows = entry_rows[:, None] + np.arange(hold)
+    inside = window_rows < bars.rows
+    window_rows = np.minimum(window_rows, bars.rows - 1)
+    window_columns = columns[:, None]
+    opens = open_[window_rows, window_columns]
+    adverse = (low if direction > 0 else high)[window_rows, window_columns]
+    favourable = (high if direction > 0 else low)[window_rows, window_columns]
+    with np.errstate(invalid="ignore"):
+        stop_price = fills * (1 - direction * stop) if stop else np.full(len(fills), np.nan)
+        target_price = fills * (1 + direction * target) if target else np.full(len(fills), np.nan)
+        stopped = inside & (direction * (adverse - stop_price[:, None]) <= 0)
+        reached = inside & (direction * (favourable - target_price[:, None]) >= 0)
+    exited = stopped | reached
+    last = inside.sum(axis=1) - 1
+    offset = np.where(exited.any(axis=1), exited.argmax(axis=1), last)
+    trade = np.arange(len(fills))
+    exit_rows = entry_rows + offset
+    exit_open = opens[trade, offset]
+    is_stop, is_target = stopped[trade, offset], reached[trade, offset]
+    with np.errstate(invalid="ignore"):
+        exits = np.select(
+            [is_stop, is_target],
+            [
+                np.where(direction * (exit_open - stop_price) < 0, exit_open, stop_price),
+                np.where(direction * (exit_open - target_price) > 0, exit_open, target_price),
+            ],
+            close[exit_rows, columns],
+        )
+    reasons = np.select([is_stop, is_target, offset < hold - 1], ["stop", "target", "open"], "time")
+
+    # One position per symbol: a signal counts once the previous trade has exited
+    order = np.lexsort((signal_rows, columns))
+    signal_rows, columns, entry_rows, exit_rows = signal_rows[order], columns[order], entry_rows[order], exit_rows[order]
+    fills, exits, reasons, offset = fills[order], exits[order], reasons[order], offset[order]
+    bounds = np.searchsorted(columns, np.arange(len(bars) + 1))
+    taken = np.zeros(len(order), dtype=bool)
+    for j in range(len(bars)):
+        lo, hi = bounds[j], bounds[j + 1]
+        i = lo
+        while i < hi:
+            taken[i] = True
+            i = lo + np.searchsorted(signal_rows[lo:hi], exit_rows[i], side="left")
+
+    columns, signal_rows, entry_rows, exit_rows = columns[taken], signal_rows[taken], entry_rows[taken], exit_rows[taken]
+    symbols = np.asarray(bars.symbols, dtype=object)
+    dates = panel_dates(bars)
+    return pd.DataFrame({
+        "Symbol": symbols[columns],
+        "Signal date": dates[signal_rows, columns],
+        "Entry date": dates[entry_rows, columns],
+        "Exit date": dates[exit_rows, columns],
+        "Entry": fills[taken],
+        "Exit": exits[taken],
+        "Return": direction * (exits[taken] / fills[taken] - 1) - cost,
+        "Bars": offset[taken] + 1,
+        "Exit reason": reasons[taken],
+    })
+
+
+def panel_dates(bars):
+    """(bars x symbols) matrix of every panel cell's date"""
+    dates = np.full((bars.rows, len(bars)), np.datetime64("NaT"), dtype="datetime64[ns]")
+    for j, symbol in enumerate(bars.symbols):
+        dates[bars.starts[j]:, j] = bars.index[symbol].values
+    return dates
+
+
+def trade_stats(trades, include_open=False):
+    """
+    Per-symbol statistics of a trade table and the aggregate over all trades.
+    Trades still open when the data ends are unrealized marks and only
+    counted (as "open trades") unless include_open.
+    Returns (DataFrame by symbol, dict).
+    """
+    exits = trades["Exit reason"].value_counts().to_dict()
+    still_open = trades["Exit reason"] == "open"
+    if not include_open:
+        trades = trades[~still_open]
+    returns = trades["Return"]
+    growth = np.log1p(returns)
+    # Compounded equity of each symbol's trades, from 1 before the first
+    equity = growth.groupby(trades["Symbol"]).cumsum()
+    peak = np.maximum(equity.groupby(trades["Symbol"]).cummax(), 0)
+    by_symbol = pd.DataFrame({
+        "Symbol": trades["Symbol"],
+        "Win": returns > 0,
+        "Return": returns,
+        "Growth": growth,
+        "Gain": returns.clip(lower=0),
+        "Loss": -returns.clip(upper=0),
+        "Bars": trades["Bars"],
+        "Drawdown": np.expm1(equity - peak),
+    }).groupby("Symbol")
+    per_symbol = pd.DataFrame({
+        "Trades": by_symbol.size(),
+        "Win rate": by_symbol["Win"].mean(),
+        "Avg return": by_symbol["Return"].mean(),
+        "Total return": np.expm1(by_symbol["Growth"].sum()),
+        "Profit factor": _profit_factor(by_symbol["Gain"].sum(), by_symbol["Loss"].sum()),
+        "Avg bars": by_symbol["Bars"].mean(),
+        "Max drawdown": by_symbol["Drawdown"].min(),
+    })
+    gains, losses = returns.clip(lower=0).sum(), -returns.clip(upper=0).sum()
+    summary = {
+        "trades": len(trades),
+        "symbols": len(per_symbol),
+        "win rate": float((returns > 0).mean()) if len(trades) else np.nan,
+        "avg return": float(returns.mean()) if len(trades) else np.nan,
+        "median return": float(returns.median()) if len(trades) else np.nan,
+        "profit factor": float(_profit_factor(gains, losses)),
+        "avg bars": float(trades["Bars"].mean()) if len(trades) else np.nan,
+        "avg total return per symbol": float(per_symbol["Total return"].mean()) if len(per_symbol) else np.nan,
+        "profitable symbols": float((per_symbol["Total return"] > 0).mean()) if len(per_symbol) else np.nan,
+        "open trades": int(still_open.sum()),
+        "exits": exits,
+    }
+    return per_symbol, summary
+
+
+def _profit_factor(gains, losses):
+    # Gross gains over gross losses (inf without losses, NaN without trades)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(losses > 0, gains / np.where(losses > 0, losses, 1), np.where(gains > 0, np.inf, np.nan))
+
+
+def run_backtest(signal, frames, hold=DEFAULT_HOLD, stop=DEFAULT_STOP, target=None, cost=0.0):
+    """
+    Backtest a signal (see entry_signals) over {symbol: daily bars}.
+    Returns {"trades": trade table, "symbols": per-symbol stats, "summary": aggregate stats};
+    results are shared, so callers must not modify them.
+    """
+    spec, _ = signal_spec(signal)
+    frames = signals.clean_frames(frames)
+    key = _key("backtest", (signal, spec_version(spec), hold, stop, target, cost), frames)
+    cached = BACKTESTS.get(key)
+    if cached is not None:
+        return cached
+    entries, direction = entry_signals(signal, frames)
+    bars = panel.Panel(frames, columns=("Open", "High", "Low", "Close"))
+    trades = simulate(bars, entries, direction, hold, stop, target, cost)
+    per_symbol, summary = trade_stats(trades)
+    return BACKTESTS.put(key, {"trades": trades, "symbols": per_symbol, "summary": summary})
@@ -0,0 +1,180 @@
+"""
+Process-wide in-memory bar cache shared by the Stockbot apps.
+
+Replaces the per-app st.cache_data silos: every app asks the same cache for a
+symbol's bars, so ^FTSE or AAPL is held once per process however many apps or
+sessions use it. Entries are keyed by (symbol, interval) and hold the longest
+history requested so far; shorter periods are sliced from it. Across processes
+the on-disk bar store plays the same role, since a bar refreshed by one app is
+served from disk to the others until it expires.
+
+Hit/miss counts and the memory held by the entries each app uses are tracked
+per app for display.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import bar_store
+import market_hours
+
+# Upper bound on the memory held by cached bars (derived frames included)
+DEFAULT_MAX_BYTES = int(float(os.environ.get("STOCKBOT_BAR_CACHE_MB", 512)) * 1024 * 1024)
+
+
+def frame_bytes(data):
+    """Memory used by a DataFrame, index included"""
+    if data is None:
+        return 0
+    return int(data.memory_usage(deep=True, index=True).sum())
+
+
+class CacheEntry:
+    """One symbol/interval history plus frames derived from it"""
+
+    def __init__(self, data, start, loaded_at):
+        self.data = data
+        self.start = start  # Earliest timestamp requested, None for "max"
+        self.loaded_at = loaded_at
+        self.derived = {}
+        self.nbytes = frame_bytes(data)
+
+    def covers(self, period):
+        if self.start is None:
+            return True
+        start = bar_store.period_start(period)
+        return start is not None and self.start <= start
+
+
+class BarCache:
+    """Thread-safe LRU cache of bar histories with per-app statistics"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.app_stats = {}
+        self.app_keys = {}
+
+    def _app(self, app):
+        app = app or "default"
+        if app not in self.app_stats:
+            self.app_stats[app] = {"hits": 0, "misses": 0}
+            self.app_keys[app] = set()
+        return app
+
+    def lookup(self, symbol, interval, period, ttl, app=None):
+        """
+        Return the cached full history if it covers the period and is still
+        fresh for the symbol's market hours (see market_hours.is_fresh), else None.
+        """
+        key = (symbol, interval)
+        with self.lock:
+            app = self._app(app)
+            entry = self.entries.get(key)
+            if entry is not None and entry.covers(period) and market_hours.is_fresh(symbol, entry.loaded_at, ttl):
+                self.entries.move_to_end(key)
+                self.app_stats[app]["hits"] += 1
+                self.app_keys[app].add(key)
+                return entry.data
+            self.app_stats[app]["misses"] += 1
+            return None
+
+    def store(self, symbol, interval, period, data, app=None, loaded_at=None):
+        """
+        Cache a loaded history (replacing any older entry) and return it.
+        loaded_at is when the bars were fetched (epoch seconds), e.g. the bar
+        store's fetched_at for bars served from disk; None for just now.
+        """
+        if data is None or data.empty:
+            return data  # Failed fetches are not cached
+        key = (symbol, interval)
+        start = bar_store.period_start(period)
+        with self.lock:
+            app = self._app(app)
+            previous = self.entries.get(key)
+            # Keep the widest coverage known for this key, if the new bars still reach back that far
+            if (previous is not None and previous.start is not None and previous.covers(period)
+                    and data.index[0] <= previous.start.tz_localize(None)):
+                start = previous.start
+            self.entries[key] = CacheEntry(data, start, time.time() if loaded_at is None else loaded_at)
+            self.entries.move_to_end(key)
+            self.app_keys[app].add(key)
+            self._evict()
+        return data
+
+    def get_full(self, symbol, interval, period, ttl, load, app=None):
+        """
+        Return the whole cached history (at least covering the period). On a
+        miss load(period) must return (bars, when they were fetched or None)
+        """
+        data = self.lookup(symbol, interval, period, ttl, app)
+        if data is None:
+            data, loaded_at = load(period)
+            data = self.store(symbol, interval, period, data, app, loaded_at)
+        return data
+
+    def get(self, symbol, interval, period, ttl, load, app=None):
+        """Return bars for a period, calling load(period) on a miss (see get_full)"""
+        return bar_store.slice_period(self.get_full(symbol, interval, period, ttl, load, app), period)
+
+    def derived(self, symbol, interval, name, data, build):
+        """
+        Memoize build(data) on the cache entry holding `data`, e.g. resampled bars.
+        If the entry has since been replaced or evicted the frame is just built.
+        """
+        key = (symbol, interval)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.data is not data:
+                entry = None
+            elif name in entry.derived:
+                return entry.derived[name]
+        result = build(data)
+        if entry is not None:
+            with self.lock:
+                if self.entries.get(key) is entry and name not in entry.derived:
+                    entry.derived[name] = result
+                    entry.nbytes += frame_bytes(result)
+                    self._evict()
+        return result
+
+    def _evict(self):
+        total = sum(entry.nbytes for entry in self.entries.values())
+        while total > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            total -= entry.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def report(self):
+        """Per-app hit/miss counts and memory held by the entries each app uses"""
+        with self.lock:
+            rows = []
+            for app, stats in self.app_stats.items():
+                keys = [key for key in self.app_keys[app] if key in self.entries]
+                requests = stats["hits"] + stats["misses"]
+                rows.append({
+                    "app": app,
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "hit rate": round(stats["hits"] / requests, 3) if requests else 0.0,
+                    "symbols": len(keys),
+                    "memory MB": round(sum(self.entries[key].nbytes for key in keys) / 1024 ** 2, 2),
+                })
+            rows.append({
+                "app": "total (shared)",
+                "hits": sum(row["hits"] for row in rows),
+                "misses": sum(row["misses"] for row in rows),
+                "hit rate": None,
+                "symbols": len(self.entries),
+                "memory MB": round(sum(entry.nbytes for entry in self.entries.values()) / 1024 ** 2, 2),
+            })
+            return rows
+
+
+# The one cache every app in this process shares
+BAR_CACHE = BarCache()
@@ -0,0 +1,229 @@
+"""
+On-disk OHLCV store shared by the Stockbot apps.
+
+Bars are kept as one Parquet file per (symbol, interval). After the first full
+download only bars newer than the last stored timestamp are requested and
+appended, so a warm restart needs almost no network traffic.
+"""
+import json
+import os
+import time
+from urllib.parse import quote
+
+import pandas as pd
+
+import market_hours
+
+# Store location, shared by every app started from this folder
+STORE_DIR = os.environ.get(
+    "STOCKBOT_BAR_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bar_store"),
+)
+
+PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+# Relative close difference above which a re-fetched bar means the history was re-adjusted
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def period_start(period, now=None):
+    """
+    Translate a Yahoo period string ("3mo", "1y", "max", ...) into the
+    earliest timestamp it covers. Returns None for "max".
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    if period in (None, "max"):
+        return None
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+    for suffix, unit in PERIOD_UNITS.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return (now - pd.DateOffset(**{unit: int(period[:-len(suffix)])})).normalize()
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def normalize_bars(data):
+    """
+    Store every frame with a timezone-naive index in exchange local time,
+    which is what grouped downloads return for daily and longer bars.
+    """
+    if data is None or data.empty:
+        return data
+    if getattr(data.index, "tz", None) is not None:
+        data = data.copy()
+        data.index = data.index.tz_localize(None)
+    return data
+
+
+def slice_period(data, period, now=None):
+    """Keep only the bars that fall inside a Yahoo period string"""
+    start = period_start(period, now)
+    if data is None or data.empty or start is None:
+        return data
+    start = start.tz_localize(None)
+    # Unchanged frames stay the same object, so results memoized on it (BAR_CACHE.derived) are found
+    if data.index[0] >= start:
+        return data
+    return data[data.index >= start]
+
+
+def merge_bars(stored, new):
+    """Append new bars to stored ones; newer rows replace revised bars with the same timestamp"""
+    if stored is None or stored.empty:
+        return new
+    if new is None or new.empty:
+        return stored
+    merged = pd.concat([stored, new])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def _paths(symbol, interval, root=None):
+    folder = os.path.join(root or STORE_DIR, interval)
+    name = quote(symbol, safe="")
+    return os.path.join(folder, f"{name}.parquet"), os.path.join(folder, f"{name}.json")
+
+
+def read_bars(symbol, interval, root=None):
+    """Load stored bars and their metadata; returns (DataFrame, dict)"""
+    data_path, meta_path = _paths(symbol, interval, root)
+    if not os.path.exists(data_path):
+        return pd.DataFrame(), {}
+    try:
+        data = pd.read_parquet(data_path)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return data, meta
+    except Exception:
+        # A corrupt or half-written file is treated as a cold cache
+        return pd.DataFrame(), {}
+
+
+def write_bars(symbol, interval, data, meta, root=None):
+    """Atomically write bars and metadata so concurrent readers never see partial files"""
+    data_path, meta_path = _paths(symbol, interval, root)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    tmp_data = f"{data_path}.{os.getpid()}.tmp"
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    data.to_parquet(tmp_data)
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_meta, meta_path)
+
+
+def write_meta(symbol, interval, meta, root=None):
+    """Atomically rewrite only the metadata of stored bars"""
+    _, meta_path = _paths(symbol, interval, root)
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+
+def _covers(meta, period):
+    """Check whether the stored history reaches back far enough for a period"""
+    if "covered_from" not in meta:
+        return False
+    if meta["covered_from"] is None:
+        return True
+    start = period_start(period)
+    return start is not None and pd.Timestamp(meta["covered_from"]) <= start
+
+
+def plan_update(symbol, interval, period, max_age=0):
+    """
+    Decide how a symbol's stored bars should be refreshed.
+
+    Returns (mode, stored, meta) where mode is "fresh" (serve from disk),
+    "incremental" (fetch bars since the last stored one) or "full".
+    Freshness follows the symbol's market hours: max_age applies while its
+    market is open, and bars fetched after the close stay fresh until it reopens.
+    """
+    stored, meta = read_bars(symbol, interval)
+    if stored.empty or not _covers(meta, period):
+        return "full", stored, meta
+    if market_hours.is_fresh(symbol, meta.get("fetched_at", 0), max_age):
+        return "fresh", stored, meta
+    return "incremental", stored, meta
+
+
+def incremental_start(stored):
+    """
+    Start date for an incremental fetch: the last stored bar is re-fetched as
+    it may have been revised, and the one before it to check the history was
+    not re-adjusted (see readjusted)
+    """
+    return stored.index[-min(2, len(stored))].strftime("%Y-%m-%d")
+
+
+def readjusted(stored, fetched, tolerance=ADJUSTMENT_TOLERANCE):
+    """
+    Whether re-fetched bars disagree with the stored copies of completed bars.
+    Bars are adjusted (auto_adjust), so a split or dividend rescales the whole
+    past history; stored bars can then no longer be topped up and the
+    history has to be downloaded again.
+    """
+    if stored is None or stored.empty or fetched is None or fetched.empty:
+        return False
+    fetched = normalize_bars(fetched)
+    new = fetched["Close"][~fetched.index.duplicated(keep="last")]
+    # The last stored bar may have been stored before it was complete
+    old = stored["Close"].iloc[:-1]
+    new = new[new.index.isin(old.index)]
+    if new.empty:
+        return False
+    old = old.loc[new.index]
+    return bool(((new - old).abs() > tolerance * old.abs()).any())
+
+
+def save_update(symbol, interval, period, mode, stored, meta, fetched):
+    """
+    Merge freshly fetched bars into the store and return the merged history.
+    Callers check incremental fetches with readjusted first.
+    """
+    if fetched is None or fetched.empty:
+        if mode == "incremental":
+            # Nothing new since the last bar: the stored bars stay fresh without another request
+            write_meta(symbol, interval, dict(meta, fetched_at=time.time()))
+        return stored
+    merged = merge_bars(stored, normalize_bars(fetched))
+    meta = dict(meta)
+    if mode == "full":
+        start = period_start(period)
+        meta["covered_from"] = None if start is None else start.isoformat()
+    meta["fetched_at"] = time.time()
+    write_bars(symbol, interval, merged, meta)
+    return merged
+
+
+def load_bars(symbol, interval, period, fetch, max_age=0):
+    """
+    get_bars, also returning when the bars were fetched: (bars, epoch
+    seconds), with None for bars fetched just now
+    """
+    mode, stored, meta = plan_update(symbol, interval, period, max_age)
+    if mode == "fresh":
+        return slice_period(stored, period), meta.get("fetched_at")
+    if mode == "incremental":
+        fetched = fetch(symbol, interval, start=incremental_start(stored))
+        if readjusted(stored, fetched):
+            # A split or dividend rescaled the history: download it again
+            mode, stored = "full", stored.iloc[:0]
+            fetched = fetch(symbol, interval, period=period)
+    else:
+        fetched = fetch(symbol, interval, period=period)
+    merged = save_update(symbol, interval, period, mode, stored, meta, fetched)
+    return slice_period(merged, period), None
+
+
+def get_bars(symbol, interval, period, fetch, max_age=0):
+    """
+    Return bars for a symbol from the store, topping it up from the network.
+
+    fetch(symbol, interval, period=None, start=None) must return a DataFrame.
+    Bars still fresh for max_age and the market's hours are served without any request.
+    """
+    return load_bars(symbol, interval, period, fetch, max_age)[0]
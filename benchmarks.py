@@ -0,0 +1,1183 @@
+"""
+Benchmarks and parity checks for the shared data and indicator helpers.
+
+Run `python benchmarks.py --help` to list the available checks. These scripts
+do not import the Streamlit apps, so they can run headless.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import bar_store
+import indicator_state
+import indicators
+import market_data
+import optimizer
+import panel
+import parallel
+from bar_cache import BAR_CACHE
+from indicator_memo import INDICATOR_MEMO
+import providers
+import ranking
+import signals
+import strategy_rules
+import strategy_scan
+from tickers import TICKER_CATEGORIES
+import walkforward
+
+
+def universe_symbols(extra=0):
+    """All symbols in TICKER_CATEGORIES plus `extra` synthetic ones"""
+    symbols = list(dict.fromkeys(t for category in TICKER_CATEGORIES.values() for t in category))
+    return symbols + [f"SYN{i:05d}" for i in range(extra)]
+
+
+def synthetic_bars(n_bars, seed, end=None):
+    """Random-walk daily OHLCV on business days, ending today"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now().normalize() if end is None else end
+    index = pd.bdate_range(end=end, periods=n_bars)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n_bars)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.006, n_bars)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.006, n_bars)))
+    volume = rng.integers(1e5, 1e7, n_bars).astype(float)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+def make_replay(args):
+    """Write synthetic daily recordings for the ticker universe into a replay folder"""
+    symbols = universe_symbols(args.extra)
+    for seed, symbol in enumerate(symbols):
+        bar_store.write_bars(symbol, "1d", synthetic_bars(args.bars, seed), {"covered_from": None, "fetched_at": time.time()}, root=args.root)
+    print(f"Wrote {len(symbols)} synthetic daily recordings ({args.bars} bars each) to {args.root}")
+    return 0
+
+
+def record_replay(args):
+    """Record live daily bars from Yahoo Finance into a replay folder"""
+    symbols = args.tickers or universe_symbols()
+    providers.record(providers.YFinanceProvider(), symbols, args.root, interval="1d", period=args.period)
+    print(f"Recorded {len(symbols)} symbols to {args.root}")
+    return 0
+
+
+def scan_throughput(args):
+    """
+    Measure fetch throughput against the replay provider, cold (empty bar store)
+    and warm, for both the per-ticker pooled path and the grouped batch path.
+    """
+    providers.set_provider(providers.ReplayProvider(args.root, latency=args.latency, latency_per_symbol=args.latency_per_symbol))
+    symbols = universe_symbols(args.extra)[:args.limit] if args.limit else universe_symbols(args.extra)
+    timeframes = [("5y", "1wk"), ("1y", "1d"), ("10y", "1mo")]
+
+    for path in ("pooled", "batched"):
+        bar_store.STORE_DIR = tempfile.mkdtemp(prefix="stockbot-bench-")
+        BAR_CACHE.clear()
+        for label, max_age in (("cold", 0), ("warm", 0), ("fresh", 3600)):
+            provider = providers.get_provider()
+            requests_before = provider.requests
+            started = time.perf_counter()
+            if path == "pooled":
+                list(market_data.fetch_many(symbols, lambda s: market_data.get_timeframes(s, timeframes, max_age=max_age), max_workers=args.workers))
+            else:
+                market_data.fetch_batch_history(symbols, period="10y", interval="1d", batch_size=args.batch_size, max_age=max_age)
+            elapsed = time.perf_counter() - started
+            print(f"{path:>8} {label:>5}: {len(symbols)} symbols in {elapsed:6.2f}s "
+                  f"({len(symbols) / elapsed:8.1f} symbols/s, {provider.requests - requests_before} provider requests)")
+    return 0
+
+
+def coalesce(args):
+    """
+    Start several simulated sessions scanning the same symbols at the same
+    moment against a cold cache, and count provider requests with and without
+    single-flight coalescing.
+    """
+    provider = providers.ReplayProvider(args.root, latency=args.latency)
+    providers.set_provider(provider)
+    symbols = universe_symbols()[:args.limit]
+
+    def session(fetch):
+        for _ in market_data.fetch_many(symbols, fetch, max_workers=args.workers):
+            pass
+
+    for label, fetch in (
+        ("uncoalesced", lambda s: bar_store.get_bars(s, "1d", "1y", market_data.download_history)),
+        ("single-flight", lambda s: market_data.get_history(s, "1y", "1d", app="bench")),
+    ):
+        bar_store.STORE_DIR = tempfile.mkdtemp(prefix="stockbot-bench-")
+        BAR_CACHE.clear()
+        requests_before, saved_before = provider.requests, market_data.IN_FLIGHT.saved
+        threads = [threading.Thread(target=session, args=(fetch,)) for _ in range(args.sessions)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"{label:>13}: {args.sessions} sessions x {len(symbols)} symbols in {elapsed:5.2f}s, "
+              f"{provider.requests - requests_before} provider requests, "
+              f"{market_data.IN_FLIGHT.saved - saved_before} duplicates saved")
+    return 0
+
+
+def bar_cache_check(args):
+    """
+    Check that BAR_CACHE entries only claim the coverage their bars have
+    (a long history that expires and is reloaded for a shorter period must
+    not keep serving the long period from the short bars) and that bars
+    served from the bar store keep the time they were fetched.
+    """
+    BAR_CACHE.clear()
+    long_bars = synthetic_bars(2700, 0)  # A little over 10y
+    short_bars = long_bars.iloc[-252:]
+    failures = 0
+
+    BAR_CACHE.get("SYN", "1d", "10y", 3600, lambda period: (long_bars, None), app="check")
+    BAR_CACHE.entries[("SYN", "1d")].loaded_at = 0  # Expire the entry
+    short = BAR_CACHE.get("SYN", "1d", "1y", 3600, lambda period: (short_bars, None), app="check")
+    calls = []
+    reloaded = BAR_CACHE.get("SYN", "1d", "10y", 3600, lambda period: (calls.append(period) or long_bars, None), app="check")
+    for label, ok in (
+        ("1y reload served", len(short) == len(bar_store.slice_period(short_bars, "1y"))),
+        ("10y after a 1y reload fetched again", calls == ["10y"]),
+        ("10y bars after the refetch", len(reloaded) == len(bar_store.slice_period(long_bars, "10y"))),
+    ):
+        failures += not ok
+        print(f"{label:>36}: {'OK' if ok else 'MISMATCH'}")
+
+    # A reload that still reaches back keeps the wider coverage
+    BAR_CACHE.entries[("SYN", "1d")].loaded_at = 0
+    BAR_CACHE.get("SYN", "1d", "1y", 3600, lambda period: (long_bars, None), app="check")
+    ok = BAR_CACHE.lookup("SYN", "1d", "5y", 3600, app="check") is long_bars
+    failures += not ok
+    print(f"{'wide reload keeps its coverage':>36}: {'OK' if ok else 'MISMATCH'}")
+
+    # Bars served from the store expire when the stored copy does, not later
+    BAR_CACHE.clear()
+    bar_store.STORE_DIR = tempfile.mkdtemp(prefix="stockbot-bench-")
+    fetched_at = time.time() - 600
+    bar_store.write_bars("SYN", "1d", long_bars, {"covered_from": None, "fetched_at": fetched_at})
+    ok = True
+    for load in (lambda: market_data.get_history("SYN", "1y", "1d", max_age=3600, app="check"),
+                 lambda: market_data.fetch_batch_history(["SYN"], period="1y", interval="1d", max_age=3600, app="check")):
+        BAR_CACHE.clear()
+        load()
+        ok &= BAR_CACHE.entries[("SYN", "1d")].loaded_at == fetched_at
+    failures += not ok
+    print(f"{'disk bars keep their fetch time':>36}: {'OK' if ok else 'MISMATCH'}")
+    BAR_CACHE.clear()
+    return 1 if failures else 0
+
+
+def legacy_rsi(data, window=14):
+    """The per-bar loop calculate_rsi used before indicators.wilder_rsi, kept as the parity reference"""
+    if data.empty or len(data) < window*2:
+        return pd.Series([np.nan] * len(data))
+    delta = data['Close'].diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gains = [np.nan] * window + [gain.iloc[1:window+1].mean()]
+    avg_losses = [np.nan] * window + [loss.iloc[1:window+1].mean()]
+    for i in range(window+1, len(delta)):
+        avg_gains.append((avg_gains[-1] * (window-1) + gain.iloc[i]) / window)
+        avg_losses.append((avg_losses[-1] * (window-1) + loss.iloc[i]) / window)
+    rs = pd.Series(avg_gains, index=data.index) / pd.Series(avg_losses, index=data.index)
+    rsi = 100 - (100 / (1 + rs))
+    return rsi.replace([np.inf, -np.inf], 100)
+
+
+def rsi_parity(args):
+    """Check indicators.wilder_rsi against the legacy loop, then time both"""
+    index = pd.bdate_range(end="2024-12-31", periods=60)
+    cases = {f"random walk {n}": synthetic_bars(n, seed=n) for n in (28, 29, 60, 252, 2600)}
+    cases["flat"] = pd.DataFrame({"Close": np.full(60, 100.0)}, index=index)
+    cases["rising"] = pd.DataFrame({"Close": np.arange(60, dtype=float)}, index=index)
+    gappy = synthetic_bars(252, seed=7)
+    gappy.iloc[[30, 31, 100], gappy.columns.get_loc("Close")] = np.nan
+    cases["missing closes"] = gappy
+
+    failures = 0
+    for label, data in cases.items():
+        for window in (9, 14):
+            if len(data) < window * 2:
+                continue
+            expected = legacy_rsi(data, window)
+            actual = indicators.wilder_rsi(data["Close"], window)
+            same_nan = np.array_equal(expected.isna().to_numpy(), actual.isna().to_numpy())
+            diff = np.nanmax(np.abs(expected.to_numpy() - actual.to_numpy()), initial=0.0)
+            ok = same_nan and diff <= args.tolerance
+            failures += 0 if ok else 1
+            print(f"{label:>18} window={window:2d}  max abs diff={diff:.2e}  NaNs match={same_nan}  {'OK' if ok else 'MISMATCH'}")
+
+    for n in (252, 2600):
+        data = synthetic_bars(n, seed=1)
+        timings = {}
+        for label, fn in (("legacy", lambda: legacy_rsi(data)), ("vectorized", lambda: indicators.wilder_rsi(data["Close"]))):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                fn()
+            timings[label] = (time.perf_counter() - started) / args.repeat
+        print(f"{n:5d} bars: legacy {timings['legacy'] * 1e3:8.3f} ms, vectorized {timings['vectorized'] * 1e3:6.3f} ms "
+              f"({timings['legacy'] / timings['vectorized']:.0f}x)")
+    return 1 if failures else 0
+
+
+def ta_ema(close, length):
+    """pandas_ta.ema (SMA-seeded, adjust=False), or a transcription when pandas_ta is not installed"""
+    try:
+        import pandas_ta
+        return pandas_ta.ema(close, length=length)
+    except ImportError:
+        pass
+    if len(close) < length:
+        return None
+    close = close.copy()
+    seed = close.iloc[0:length].mean()
+    close.iloc[:length - 1] = np.nan
+    close.iloc[length - 1] = seed
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def ta_rsi(close, length):
+    """pandas_ta.rsi, or a transcription when pandas_ta is not installed"""
+    try:
+        import pandas_ta
+        return pandas_ta.rsi(close, length=length)
+    except ImportError:
+        pass
+    negative = close.diff()
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = positive.ewm(alpha=1 / length, min_periods=length).mean()
+    negative_avg = negative.ewm(alpha=1 / length, min_periods=length).mean()
+    return 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def ta_macd(close, fast, slow, signal):
+    """(MACD, histogram, signal) as pandas_ta.macd computes them"""
+    line = ta_ema(close, fast) - ta_ema(close, slow)
+    signal_line = ta_ema(line.loc[line.first_valid_index():], signal).reindex(line.index)
+    return line, line - signal_line, signal_line
+
+
+def legacy_strategy_indicators(data):
+    """The strategy scanner's old per-ticker path: copy the bars and append each pandas_ta column"""
+    data_copy = data.copy()
+    try:
+        import pandas_ta  # noqa: F401 registers the .ta accessor
+        data_copy.ta.ema(length=11, append=True)
+        data_copy.ta.ema(length=21, append=True)
+        data_copy.ta.ema(length=50, append=True)
+        data_copy.ta.rsi(length=14, append=True)
+        data_copy["RSI_14_MA_9"] = data_copy["RSI_14"].rolling(9).mean()
+        data_copy.ta.macd(fast=12, slow=26, signal=9, append=True)
+        return data_copy
+    except ImportError:
+        pass
+    for length in (11, 21, 50):
+        data_copy[f"EMA_{length}"] = ta_ema(data_copy["Close"], length)
+    data_copy["RSI_14"] = ta_rsi(data_copy["Close"], 14)
+    data_copy["RSI_14_MA_9"] = data_copy["RSI_14"].rolling(9).mean()
+    data_copy["MACD_12_26_9"], data_copy["MACDh_12_26_9"], data_copy["MACDs_12_26_9"] = ta_macd(data_copy["Close"], 12, 26, 9)
+    return data_copy
+
+
+def strategy_indicators(data):
+    """The same columns from indicators.py, as the strategy scanner computes them per ticker"""
+    close = data["Close"]
+    out = {f"EMA_{length}": indicators.ema(close, length) for length in (11, 21, 50)}
+    out["RSI_14"] = indicators.rsi(close, 14)
+    out["RSI_14_MA_9"] = out["RSI_14"].rolling(9).mean()
+    out["MACD_12_26_9"], out["MACDs_12_26_9"], out["MACDh_12_26_9"] = indicators.macd(close, 12, 26, 9)
+    return out
+
+
+def import_seconds(module, repeat):
+    """Best-of-`repeat` import time of a module in a fresh interpreter, or None if it is not installed"""
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    timings = []
+    for _ in range(repeat):
+        run = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if run.returncode != 0:
+            return None
+        timings.append(float(run.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def strategy_indicator_benchmark(args):
+    """
+    Check indicators.py against pandas_ta (or its transcription when pandas_ta
+    is not installed), then compare cold-start import time and per-ticker time.
+    """
+    failures = 0
+    worst = 0.0
+    for seed, n_bars in enumerate((50, 51, 75, 260, 1300)):
+        data = synthetic_bars(n_bars, seed)
+        expected, actual = legacy_strategy_indicators(data), strategy_indicators(data)
+        for name, got in actual.items():
+            got, want = got.to_numpy(), expected[name].to_numpy()
+            if not np.array_equal(np.isnan(got), np.isnan(want)):
+                print(f"  {n_bars} bars {name}: NaN positions differ")
+                failures += 1
+                continue
+            worst = max(worst, np.nanmax(np.abs(got - want), initial=0.0))
+    failures += worst > args.tolerance
+    print(f"parity: max abs diff {worst:.1e}")
+
+    print("cold import (fresh interpreter, best of %d):" % args.repeat)
+    for module in ("pandas", "pandas_ta", "indicators"):
+        seconds = import_seconds(module, args.repeat)
+        print(f"  {module:>10}: " + ("not installed" if seconds is None else f"{seconds * 1000:7.1f} ms"))
+
+    data = synthetic_bars(args.bars, 0)
+    timings = {}
+    for label, compute in (("pandas_ta path", legacy_strategy_indicators), ("indicators.py", strategy_indicators)):
+        started = time.perf_counter()
+        for _ in range(args.repeat * 10):
+            compute(data)
+        timings[label] = (time.perf_counter() - started) / (args.repeat * 10)
+    try:
+        import pandas_ta  # noqa: F401
+    except ImportError:
+        print("  (pandas_ta is not installed: its path is timed with the transcription in this file)")
+    print(f"per ticker ({args.bars} bars): pandas_ta path {timings['pandas_ta path'] * 1000:.2f} ms, "
+          f"indicators.py {timings['indicators.py'] * 1000:.2f} ms "
+          f"({timings['pandas_ta path'] / timings['indicators.py']:.1f}x)")
+    return 1 if failures else 0
+
+
+def per_ticker_indicators(daily, weekly):
+    """The per-ticker indicator calls the scanners made before the panel engine"""
+    def calculate_rsi(data):
+        # calculate_rsi leaves histories shorter than two windows undefined
+        return indicators.wilder_rsi(data["Close"]) if len(data) >= 28 else pd.Series(np.nan, index=data.index)
+
+    close = daily["Close"]
+    rsi = calculate_rsi(daily)
+    out = {
+        "dashboard rsi": rsi,
+        "rsi signal": rsi.rolling(9).mean(),
+        "weekly rsi": calculate_rsi(weekly),
+        "macd": close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean(),
+    }
+    out["macd signal"] = out["macd"].ewm(span=9, adjust=False).mean()
+    for span in (7, 11, 21):
+        out[f"ema {span}"] = close.ewm(span=span, adjust=False).mean()
+    for length in (11, 21, 50):
+        out[f"ta ema {length}"] = ta_ema(close, length)
+    out["ta rsi"] = ta_rsi(close, 14)
+    out["ta rsi ma"] = out["ta rsi"].rolling(9).mean()
+    out["ta macd"], out["ta macd hist"], out["ta macd signal"] = ta_macd(close, 12, 26, 9)
+    return out
+
+
+def panel_indicators(daily_frames, weekly_frames):
+    """The same indicators for every ticker at once"""
+    daily = panel.Panel(daily_frames, columns=("Close",))
+    weekly = panel.Panel(weekly_frames, columns=("Close",))
+    close = daily["Close"]
+    rsi = panel.wilder_rsi(close, 14, daily.starts)
+    out = {
+        "dashboard rsi": rsi,
+        "rsi signal": panel.sma(rsi, 9),
+        "weekly rsi": panel.wilder_rsi(weekly["Close"], 14, weekly.starts),
+    }
+    out["macd"], out["macd signal"], _ = panel.macd(close)
+    for span in (7, 11, 21):
+        out[f"ema {span}"] = panel.ema(close, span)
+    for length in (11, 21, 50):
+        out[f"ta ema {length}"] = panel.ema(close, length, sma_seed=True, starts=daily.starts)
+    out["ta rsi"] = panel.rma_rsi(close, 14)
+    out["ta rsi ma"] = panel.sma(out["ta rsi"], 9)
+    out["ta macd"], out["ta macd signal"], out["ta macd hist"] = panel.macd(close, 12, 26, 9, sma_seed=True, starts=daily.starts)
+    return daily, weekly, out
+
+
+def panel_benchmark(args):
+    """
+    Check the panel engine against per-ticker calls on histories of mixed
+    lengths, then time both at several universe sizes.
+    """
+    rng = np.random.default_rng(0)
+    failures = 0
+    sizes = [int(size) for size in args.sizes.split(",")]
+    for n_symbols in sizes:
+        lengths = rng.integers(args.min_bars, args.max_bars + 1, n_symbols)
+        daily_frames = {f"SYN{i:05d}": synthetic_bars(int(n), seed=i) for i, n in enumerate(lengths)}
+        weekly_frames = {symbol: market_data.resample_bars(data, "1wk") for symbol, data in daily_frames.items()}
+
+        started = time.perf_counter()
+        expected = {symbol: per_ticker_indicators(daily_frames[symbol], weekly_frames[symbol]) for symbol in daily_frames}
+        per_ticker = time.perf_counter() - started
+
+        started = time.perf_counter()
+        daily, weekly, actual = panel_indicators(daily_frames, weekly_frames)
+        vectorized = time.perf_counter() - started
+
+        # Parity on a sample of symbols (all of them for small universes)
+        worst = 0.0
+        for symbol in list(daily_frames)[:200]:
+            for name, values in actual.items():
+                bars = weekly if name == "weekly rsi" else daily
+                got = bars.series(values, symbol).to_numpy()
+                want = expected[symbol][name]
+                want = np.full(len(got), np.nan) if want is None else want.to_numpy()
+                if not np.array_equal(np.isnan(got), np.isnan(want)):
+                    print(f"  {symbol} {name}: NaN positions differ")
+                    failures += 1
+                    continue
+                worst = max(worst, np.nanmax(np.abs(got - want), initial=0.0))
+        failures += worst > args.tolerance
+        print(f"{n_symbols:5d} symbols: per-ticker {per_ticker:7.3f}s, panel {vectorized:6.3f}s "
+              f"({per_ticker / vectorized:5.1f}x), max abs diff {worst:.1e}")
+    return 1 if failures else 0
+
+
+def stream_benchmark(args):
+    """
+    Replay auto-refresh cycles over a synthetic universe (unchanged bars, a
+    revised latest bar, a newly closed bar) on a window that slides forward
+    with each new bar, as the dashboard's do. Times the incremental indicator
+    states against a full recompute of the window each cycle, and checks them
+    against a recompute of the history since the states were built.
+    """
+    rng = np.random.default_rng(1)
+    # Extra bars at the end are revealed one per "new bar" cycle
+    histories = {f"SYN{i:05d}": synthetic_bars(args.bars + args.cycles, seed=i) for i in range(args.symbols)}
+    shown = args.bars
+    states = indicator_state.IndicatorStates(path=f"{tempfile.mkdtemp()}/indicator_state.pkl")
+    failures = 0
+    print(f"{args.symbols} symbols, windows of {args.bars} bars")
+    frames = {}
+    for cycle in ["cold"] + ["unchanged", "revised", "new bar"] * args.cycles:
+        if cycle == "new bar":
+            shown += 1
+        if cycle != "unchanged":
+            # Unchanged bars come back from the bar cache as the same frames
+            frames = {symbol: data.iloc[shown - args.bars:shown] for symbol, data in histories.items()}
+        if cycle == "revised":
+            # The latest bar is still forming: nudge every symbol's last close
+            for symbol in frames:
+                data = histories[symbol].copy()
+                data.iloc[shown - 1, data.columns.get_loc("Close")] *= 1 + rng.normal(0, 0.002)
+                histories[symbol] = data
+                frames[symbol] = data.iloc[shown - args.bars:shown]
+
+        started = time.perf_counter()
+        actual = states.update(frames, "1d")
+        incremental = time.perf_counter() - started
+
+        # Fresh frames, so the recompute pays for its own column extraction
+        recompute_frames = ({symbol: data.iloc[shown - args.bars:shown] for symbol, data in histories.items()}
+                            if cycle != "unchanged" else frames)
+        started = time.perf_counter()
+        indicator_state.rebuild(recompute_frames)
+        full = time.perf_counter() - started
+
+        # The states carry on from the window they were built from
+        anchored = {symbol: data.iloc[:shown] for symbol, data in histories.items()}
+        expected = {symbol: result for symbol, (result, _) in indicator_state.rebuild(anchored).items()}
+        worst = 0.0
+        for symbol, want in expected.items():
+            got = actual[symbol]
+            pairs = [(got["emas"][span], want["emas"][span]) for span in indicator_state.EMA_SPANS]
+            pairs += [(got[name], want[name]) for name in ("macd_line", "signal_line", "rsi", "rsi_signal")]
+            for a, b in pairs:
+                if np.isnan(a) != np.isnan(b):
+                    failures += 1
+                elif not np.isnan(a):
+                    worst = max(worst, abs(a - b))
+            failures += got["has_rsi"] != want["has_rsi"]
+            for name, series in want["series"].items():
+                ours, series = got["series"][name], series[-args.bars:]
+                if len(ours) != len(series) or not np.array_equal(np.isnan(ours), np.isnan(series)):
+                    failures += 1
+                    continue
+                worst = max(worst, np.nanmax(np.abs(ours - series), initial=0.0))
+        failures += worst > args.tolerance
+        print(f"  {cycle:>9}: incremental {incremental * 1000:8.2f}ms, full recompute {full * 1000:8.2f}ms "
+              f"({full / incremental:6.1f}x), max abs diff {worst:.1e}")
+    print(f"  served: {states.stats()}")
+    return 1 if failures else 0
+
+
+# Setups the strict strategy classified before it became a spec (strategies/strict.json),
+# for symbols of strategy_universe(..., n_bars=2600, seed=0, end=STRICT_SETUPS_END)
+STRICT_SETUPS_END = pd.Timestamp("2026-09-30")
+STRICT_SETUPS = {
+    "SYN00000": ("None", 0, []),
+    "SYN00002": ("Potential Short", -7, ["W:RSI<50 & <MA", "W:MACD Bearish", "W:Price<EMAs", "W:Price<EMA50 (Bonus)",
+                                         "D:RSI Cross <50 & <MA", "D:MACD Death Cross/Hook", "D:Rally Rejection at EMAs"]),
+    "SYN00010": ("Potential Short", -6, ["W:RSI<50 & <MA", "W:MACD Bearish", "W:Price<EMAs", "W:Price<EMA50 (Bonus)",
+                                         "D:MACD Bearish", "D:Price<EMAs"]),
+    "SYN00005": ("Watch Short", -4, ["W:RSI<50 & <MA", "W:MACD Bearish", "W:Price<EMAs", "D:Price<EMAs"]),
+    "SYN00014": ("Potential Long", 6, ["W:RSI>50 & >MA", "W:MACD Bullish", "W:Price>EMAs", "W:Price>EMA50 (Bonus)",
+                                       "D:MACD Bullish", "D:Price>EMAs"]),
+    "SYN00021": ("Potential Long", 7, ["W:RSI>50 & >MA", "W:MACD Bullish", "W:Price>EMAs", "W:Price>EMA50 (Bonus)",
+                                       "D:RSI Cross >50 & >MA", "D:MACD Bullish", "D:Price>EMAs"]),
+    "SYN00042": ("Watch Long", 4, ["W:RSI>50 & >MA", "W:MACD Bullish", "W:Price>EMAs", "D:Price>EMAs"]),
+    "SYN00094": ("Caution Long", 4, ["W:RSI>50 & >MA", "W:MACD Bullish", "W:Price>EMAs", "W:Price>EMA50 (Bonus)",
+                                     "D:RSI Cross >50 & >MA", "D:Pullback Support at EMAs", "M:WARNING-RSI<40"]),
+    "SYN00444": ("Caution Long", 4, ["W:RSI>50 & >MA", "W:MACD Bullish", "W:Price>EMAs", "D:RSI Cross >50 & >MA",
+                                     "D:Price>EMAs", "M:WARNING-RSI<40"]),
+    "SYN00579": ("Caution Short", -4, ["W:RSI<50 & <MA", "W:MACD Bearish", "W:Price<EMAs", "D:MACD Bearish",
+                                       "D:Rally Rejection at EMAs", "M:WARNING-RSI>60"]),
+    "SYN00603": ("Caution Short", -5, ["W:RSI<50 & <MA", "W:MACD Bearish", "W:Price<EMAs", "D:RSI Cross <50 & <MA",
+                                       "D:MACD Death Cross/Hook", "D:Rally Rejection at EMAs", "M:WARNING-RSI>60"]),
+}
+
+
+def strategy_bars(i, n_bars, seed, end=None):
+    """
+    Synthetic (weekly, daily, monthly) bars of symbol i as the strategy
+    scanner fetches them: a year of daily bars, five years of weekly and all
+    of the history as monthly bars, resampled from one daily history. Every
+    tenth symbol has a third of the history, too short for monthly indicators.
+    """
+    daily = synthetic_bars(n_bars if i % 10 else n_bars // 3, seed + i, end)
+    return (
+        market_data.resample_bars(daily.iloc[-1260:], "1wk"),
+        daily.iloc[-252:],
+        market_data.resample_bars(daily, "1mo"),
+    )
+
+
+def strategy_universe(n_symbols, n_bars, seed, end=None):
+    """strategy_bars of n_symbols symbols, by name"""
+    return {f"SYN{i:05d}": strategy_bars(i, n_bars, seed, end) for i in range(n_symbols)}
+
+
+def strategy_rules_benchmark(args):
+    """
+    Check the strict strategy's setups, scores and rules met against the
+    STRICT_SETUPS fixtures, then time every strategy on synthetic bars
+    """
+    failures = 0
+    strategies = strategy_rules.load_strategies()
+    strict = strategies["Strict Strategy"]
+
+    def engine(strategy, universe):
+        recent = {timeframe: strategy.indicators({symbol: bars[k] for symbol, bars in universe.items()}, timeframe)
+                  for k, timeframe in enumerate(("weekly", "daily", "monthly")) if timeframe in strategy.timeframes}
+        return strategy.classify(recent)
+
+    fixtures = {symbol: strategy_bars(int(symbol[3:]), 2600, 0, STRICT_SETUPS_END) for symbol in STRICT_SETUPS}
+    rows = engine(strict, fixtures).to_dict("index")
+    for symbol, expected in STRICT_SETUPS.items():
+        row = rows.get(symbol)
+        actual = (row["Setup"], row["Score"], strict.rules_met(row)) if row is not None else None
+        if actual != expected:
+            failures += 1
+            print(f"  {symbol}: expected {expected}, got {actual}")
+    print(f"fixtures: {len(STRICT_SETUPS)} symbols, {failures} mismatches")
+
+    universe = strategy_universe(args.symbols, args.bars, 0)
+    for name, strategy in strategies.items():
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            table = engine(strategy, universe)
+        elapsed = (time.perf_counter() - started) / args.repeat
+        started = time.perf_counter()
+        for row in table.head(args.shown).to_dict("index").values():
+            strategy.metrics(row)
+            strategy.rules_met(row)
+        described = time.perf_counter() - started
+        columns = {timeframe: len(strategy.columns[timeframe]) for timeframe in strategy.timeframes}
+        print(f"  {name + ' ' + str(columns):<60} {(elapsed + described) * 1000:9.1f}ms for {len(universe)} symbols")
+    return 1 if failures else 0
+
+
+def signals_benchmark(args):
+    """
+    Check historical setups against a scan of the history up to each of a
+    few sampled days (weekly and monthly bars resampled from it, the last
+    week and month still forming), then time the whole universe
+    """
+    failures = checked = 0
+    strict = strategy_rules.load_strategies()["Strict Strategy"]
+    histories = {f"SYN{i:05d}": synthetic_bars(args.bars if i % 10 else args.bars // 3, i)
+                 for i in range(args.symbols)}
+
+    started = time.perf_counter()
+    history = signals.historical_setups(strict, histories)
+    elapsed = time.perf_counter() - started
+
+    rng = np.random.default_rng(0)
+    dates = max(histories.values(), key=len).index
+    for day in dates[np.sort(rng.choice(np.arange(strict.min_bars, len(dates)), args.checks, replace=False))]:
+        truncated = {symbol: data.loc[:day] for symbol, data in histories.items()}
+        frames = {
+            "weekly": {symbol: market_data.resample_bars(data, "1wk") for symbol, data in truncated.items()},
+            "daily": truncated,
+            "monthly": {symbol: market_data.resample_bars(data, "1mo") for symbol, data in truncated.items()},
+        }
+        recent = {timeframe: strict.indicators(frames[timeframe], timeframe) for timeframe in strict.timeframes}
+        rows = strict.classify(recent)
+        for symbol, table in history.items():
+            # Only days the symbol traded; others are the previous session's
+            if day not in histories[symbol].index:
+                continue
+            expected = (rows.at[symbol, "Setup"], rows.at[symbol, "Score"]) if symbol in rows.index else None
+            actual = (table.at[day, "Setup"], table.at[day, "Score"]) if day in table.index else None
+            checked += 1
+            if expected != actual:
+                failures += 1
+                if failures <= 5:
+                    print(f"  {symbol} {day:%Y-%m-%d}: scan {expected}, history {actual}")
+    print(f"parity over {checked} symbol-days: {failures} mismatches")
+
+    days = sum(len(table) for table in history.values())
+    counts = pd.concat([table["Setup"] for table in history.values()]).value_counts()
+    print(f"setups per day: {dict(counts[counts > 0])}")
+    print(f"  {len(history)} symbols, {days} days in {elapsed * 1000:.0f}ms "
+          f"({elapsed / max(days, 1) * 1e6:.2f}us per day)")
+    return 1 if failures else 0
+
+
+def reference_trades(data, signal_days, direction, hold, stop, target, cost):
+    """Trades of one symbol, walked bar by bar (what backtest.simulate vectorizes)"""
+    trades = []
+    position = None
+    bars = list(data[["Open", "High", "Low", "Close"]].itertuples())
+    signal_days = set(signal_days)
+    for i, bar in enumerate(bars):
+        if position is not None:
+            entry, entry_row, signal_row = position
+            held = i - entry_row + 1
+            adverse, favourable = (bar.Low, bar.High) if direction > 0 else (bar.High, bar.Low)
+            stop_price = entry * (1 - direction * stop) if stop else None
+            target_price = entry * (1 + direction * target) if target else None
+            if stop_price is not None and direction * (adverse - stop_price) <= 0:
+                price = bar.Open if direction * (bar.Open - stop_price) < 0 else stop_price
+                reason = "stop"
+            elif target_price is not None and direction * (favourable - target_price) >= 0:
+                price = bar.Open if direction * (bar.Open - target_price) > 0 else target_price
+                reason = "target"
+            elif held == hold:
+                price, reason = bar.Close, "time"
+            elif i == len(bars) - 1:
+                price, reason = bar.Close, "open"
+            else:
+                continue
+            trades.append((bars[signal_row].Index, bars[entry_row].Index, bar.Index, entry, price,
+                           direction * (price / entry - 1) - cost, held, reason))
+            position = None
+            if i == len(bars) - 1:
+                break
+        if position is None and bar.Index in signal_days and i + 1 < len(bars):
+            position = (bars[i + 1].Open, i + 1, i)
+    return trades
+
+
+def backtest_benchmark(args):
+    """
+    Check the vectorized trade simulation against a bar-by-bar walk for a
+    few symbols, then time backtests of each signal over a synthetic
+    universe the size of TICKER_CATEGORIES, cold and from the result memo
+    """
+    failures = 0
+    n_symbols = args.symbols or len(universe_symbols())
+    histories = {f"SYN{i:05d}": synthetic_bars(args.bars if i % 10 else args.bars // 3, i) for i in range(n_symbols)}
+    runs = [
+        ("setup", "Strict Strategy", "Potential Long"),
+        ("setup", "Strict Strategy", "Potential Short"),
+        ("dashboard", "🚀🚀"),
+        ("mcso", 50),
+    ]
+    exits = {"hold": args.hold, "stop": args.stop, "target": args.target, "cost": args.cost}
+    total = 0.0
+    for signal in runs:
+        started = time.perf_counter()
+        result = backtest.run_backtest(signal, histories, **exits)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        backtest.run_backtest(signal, histories, **exits)
+        warm = time.perf_counter() - started
+        started = time.perf_counter()
+        backtest.run_backtest(signal, histories, **dict(exits, hold=args.hold * 2))
+        other_exits = time.perf_counter() - started
+        total += cold
+
+        # Parity on a sample of symbols, from the same entry days
+        entries, direction = backtest.entry_signals(signal, histories)
+        bars = panel.Panel(histories)
+        trades = result["trades"]
+        for j in range(0, len(bars), max(1, len(bars) // args.checked)):
+            symbol = bars.symbols[j]
+            days = bars.index[symbol][np.nonzero(entries[bars.starts[j]:, j])[0]]
+            expected = reference_trades(histories[symbol], days, direction, **exits)
+            actual = list(trades[trades["Symbol"] == symbol].drop(columns="Symbol").itertuples(index=False, name=None))
+            same = len(expected) == len(actual) and all(
+                e[:3] == a[:3] and e[6:] == a[6:] and np.allclose(e[3:6], a[3:6], rtol=1e-12)
+                for e, a in zip(expected, actual)
+            )
+            if not same:
+                failures += 1
+                if failures <= 5:
+                    print(f"  {signal} {symbol}: {len(expected)} walked trades, {len(actual)} simulated")
+        summary = result["summary"]
+        print(f"{str(signal):<48} cold {cold:6.2f}s  memo {warm * 1000:6.1f}ms  other exits {other_exits * 1000:6.1f}ms  "
+              f"trades {summary['trades']:6d} (+{summary['open trades']} open)  win {summary['win rate']:.1%}  avg {summary['avg return']:+.2%}  "
+              f"PF {summary['profit factor']:.2f}")
+    print(f"{n_symbols} symbols x {args.bars} bars: {total:.1f}s for {len(runs)} signals; {failures} parity mismatches")
+    return 1 if failures else 0
+
+
+def sweep_benchmark(args):
+    """
+    Run a random search over the strict strategy's constants on a synthetic
+    universe the size of the FTSE list, check a few rows against a serial
+    evaluation without the shared indicator cache, and report the rate
+    """
+    failures = 0
+    n_symbols = args.symbols or len(TICKER_CATEGORIES["FTSE STOCKS"])
+    histories = signals.clean_frames({f"SYN{i:05d}": synthetic_bars(args.bars, i) for i in range(n_symbols)})
+    signal = ("setup", "Strict Strategy", "Potential Long")
+    base = strategy_rules.load_strategies()["Strict Strategy"].params
+    space = {
+        "ema_short": [8, 9, 10, 11, 12, 13],
+        "ema_long": [18, 21, 26, 30],
+        "ema_context": [50, 100, 200],
+        "rsi_window": [9, 14, 21],
+        "rsi_ma_period": [5, 9, 14],
+        "macd_fast": [8, 12],
+        "macd_slow": [21, 26],
+        "rsi_mid": [45, 50, 55],
+        "hold": [10, 20, 40],
+        "stop": [0.05, 0.08, 0.12],
+    }
+    combinations = optimizer.random_search(space, args.combinations, seed=0, base=base)
+    exits = {"cost": 0.001}
+    started = time.perf_counter()
+    table = optimizer.sweep(signal, histories, combinations, exits=exits, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    # Rows must not depend on which other combinations shared the cache
+    rows = table.set_index(list(space)).sort_index()
+    for params in combinations[:args.checked]:
+        expected = optimizer.evaluate(signal, histories, params, exits)
+        actual = rows.loc[tuple(params[name] for name in space)]
+        if not all(np.isclose(actual[name], expected[name], rtol=1e-5, equal_nan=True) for name in optimizer.STATS):
+            failures += 1
+            print(f"  {params}: sweep {actual.to_dict()}, serial {expected}")
+    workers = args.workers or os.cpu_count()
+    per_combination = elapsed * min(workers, os.cpu_count()) / len(combinations)
+    print(table.head(5).to_string())
+    print(f"{len(combinations)} combinations over {n_symbols} symbols x {args.bars} bars on {workers} worker(s): "
+          f"{elapsed:.1f}s ({per_combination:.2f} CPU-s per combination, "
+          f"~{per_combination * 1000 / 60:.0f} CPU-min per 1000); table {table.memory_usage(deep=True).sum() / 1024:.0f}KB; "
+          f"{failures} mismatches")
+    return 1 if failures else 0
+
+
+def walkforward_benchmark(args):
+    """
+    Walk-forward re-fit of the strict strategy's thresholds on a synthetic
+    universe: check that the variants evaluated on shared indicator windows
+    classify every day as historical_setups does for each variant on its
+    own, and time both routes
+    """
+    failures = 0
+    n_symbols = args.symbols or len(TICKER_CATEGORIES["FTSE STOCKS"])
+    histories = signals.clean_frames({f"SYN{i:05d}": synthetic_bars(args.bars, i) for i in range(n_symbols)})
+    strategy = strategy_rules.load_strategies()["Strict Strategy"]
+    space = {"monthly_strong": [55, 60, 65], "monthly_weak": [35, 40, 45], "rsi_mid": [45, 50, 55]}
+    variants = [strategy_rules.Strategy(dict(strategy.spec, params=dict(strategy.params, **params)), strategy.name)
+                for params in optimizer.grid(space, strategy.params)[:args.checked]]
+
+    started = time.perf_counter()
+    shared = signals.historical_variants(variants, histories)
+    shared_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    labels = signals.setup_labels(strategy)
+    for k, variant in enumerate(variants):
+        for symbol, table in signals.historical_setups(variant, histories).items():
+            expected = table["Setup"].cat.codes.to_numpy()
+            if not table.index.equals(shared[symbol].index) or (shared[symbol][k].to_numpy() != expected).any():
+                failures += 1
+                day = table.index[np.argmax(shared[symbol][k].to_numpy() != expected)]
+                print(f"  variant {k} {symbol} {day.date()}: shared {labels[shared[symbol][k][day]]}, "
+                      f"alone {table['Setup'][day]}")
+    separate_seconds = time.perf_counter() - started
+    print(f"{len(variants)} variants over {n_symbols} symbols x {args.bars} bars: shared windows {shared_seconds:.1f}s, "
+          f"one historical_setups per variant {separate_seconds:.1f}s")
+
+    started = time.perf_counter()
+    result = walkforward.walk_forward("Strict Strategy", histories, space, train=args.train, test=args.test,
+                                      exits={"cost": 0.001}, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    shown = ["Test start", "Variant", "Train trades", "Train profit factor", "Test trades", "Test profit factor",
+             "Baseline profit factor"] + list(space)
+    print(result["folds"][shown].to_string())
+    summary = result["summary"]
+    print(f"{len(result['variants'])} variants x {len(result['folds'])} folds on {args.workers or os.cpu_count()} worker(s): "
+          f"{elapsed:.1f}s; out of sample {summary.get('trades', 0)} trades, profit factor "
+          f"{summary.get('profit factor', float('nan')):.2f}; {failures} mismatches")
+    return 1 if failures else 0
+
+
+def legacy_leaderboards(results, categories):
+    """The dashboard's list sorts: global ranks, per-category lists and top 3 bulls/bears"""
+    ordered = sorted(results, key=lambda x: x.get("score", -1000), reverse=True)
+    by_category = {cat: sorted([r for r in results if r["category"] == cat], key=lambda x: x.get("score", -1000), reverse=True)
+                   for cat in categories}
+    bulls = sorted([r for r in results if r["daily_status"] == "Bullish" and r["weekly_status"] == "Bullish"],
+                   key=lambda x: x.get("score", -1000), reverse=True)[:3]
+    bears = sorted([r for r in results if r["daily_status"] == "Bearish" and r["weekly_status"] == "Bearish"],
+                   key=lambda x: x.get("score", 1000))[:3]
+    return ordered, by_category, bulls, bears
+
+
+def ranking_benchmark(args):
+    """
+    Check Leaderboard rankings against the dashboard's list sorts on random
+    scan results (arriving in random order) and time both, for a whole
+    rerun and for one top 3 query
+    """
+    rng = np.random.default_rng(0)
+    categories = [f"CAT{i}" for i in range(args.categories)]
+    statuses = ["Bullish", "Bearish", "Neutral"]
+    results = [{"ticker": f"SYN{i:05d}", "category": categories[i % len(categories)], "score": int(rng.integers(-12, 13)),
+                "daily_status": statuses[rng.integers(3)], "weekly_status": statuses[rng.integers(3)]}
+               for i in range(args.symbols)]
+
+    def build():
+        # As the dashboard does once its results are in: scores and groups in key order, then one build
+        scores, groups = [], []
+        for r in results:
+            trend = (r["daily_status"],) if r["daily_status"] == r["weekly_status"] else ()
+            scores.append(r["score"])
+            groups.append((r["category"],) + trend)
+        return ranking.Leaderboard.build(range(len(results)), scores, results, groups)
+
+    def fill():
+        # Results updated one at a time, in the random order they would arrive in
+        board = ranking.Leaderboard(range(len(results)))
+        for i in rng.permutation(len(results)):
+            r = results[i]
+            trend = (r["daily_status"],) if r["daily_status"] == r["weekly_status"] else ()
+            board.update(i, r["score"], r, groups=(r["category"],) + trend)
+        return board
+
+    def rankings(board):
+        return (board.ranked(), {cat: board.ranked(cat) for cat in categories}, board.top(3, "Bullish"),
+                board.bottom(3, "Bearish"))
+
+    def best(function):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    expected = legacy_leaderboards(results, categories)
+    failures = 0
+    for board in (build(), fill()):
+        failures += sum(a != e for a, e in zip(rankings(board), expected))
+
+    board = build()
+    legacy = best(lambda: legacy_leaderboards(results, categories))
+    built = best(build)
+    ranked = best(lambda: rankings(build()))
+    filled = best(lambda: rankings(fill()))
+    top = best(lambda: board.top(3, "Bullish"))
+    sort = best(lambda: sorted([r for r in results if r["daily_status"] == "Bullish" and r["weekly_status"] == "Bullish"],
+                               key=lambda x: x.get("score", -1000), reverse=True)[:3])
+    print(f"{args.symbols} results in {args.categories} categories: list sorts {legacy * 1000:.2f}ms, "
+          f"leaderboard build {built * 1000:.2f}ms, build and rankings {ranked * 1000:.2f}ms "
+          f"(one update per result and rankings {filled * 1000:.2f}ms); "
+          f"top 3 bulls {top * 1e6:.0f}us vs {sort * 1e6:.0f}us sorted; {failures} mismatches")
+    return 1 if failures else 0
+
+
+def legacy_resample_bars(daily, interval):
+    """market_data.resample_bars as a pandas resample, kept as the parity reference"""
+    rule = market_data.RESAMPLE_RULES[interval]
+    agg = {col: how for col, how in market_data.RESAMPLE_AGG.items() if col in daily.columns}
+    if rule == "W-MON":
+        bars = daily.resample(rule, label="left", closed="left").agg(agg)
+    else:
+        bars = daily.resample(rule).agg(agg)
+    return bars.dropna(subset=["Close"])
+
+
+def strategy_scan_benchmark(args):
+    """
+    Scan the whole ticker universe (padded with synthetic symbols to
+    --symbols) with the strict strategy against the replay provider, cold
+    and warm, next to a scan capped at 40 tickers as the scanner used to be.
+    Checks a sample of setups against per-ticker analysis, local weekly and
+    monthly bars against a pandas resample, and the scan time against
+    strategy_scan.SCAN_BUDGET.
+    """
+    base = universe_symbols()
+    symbols = universe_symbols(max(0, args.symbols - len(base)))[:args.symbols or None]
+    root = args.root
+    if root is None:
+        root = tempfile.mkdtemp(prefix="stockbot-replay-")
+        for seed, symbol in enumerate(symbols):
+            bar_store.write_bars(symbol, "1d", synthetic_bars(args.bars, seed), {"covered_from": None, "fetched_at": time.time()}, root=root)
+    providers.set_provider(providers.ReplayProvider(root, latency=args.latency, latency_per_symbol=args.latency_per_symbol))
+    strategy = strategy_rules.load_strategies()["Strict Strategy"]
+    tickers = {symbol: symbol for symbol in symbols}
+
+    def run(label, cold, **kwargs):
+        if cold:
+            bar_store.STORE_DIR = tempfile.mkdtemp(prefix="stockbot-bench-")
+            BAR_CACHE.clear()
+            INDICATOR_MEMO.clear()
+        results, stats = strategy_scan.scan(tickers, strategy, max_workers=args.workers, **kwargs)
+        print(f"{label:>12}: {stats['scanned']:5d} symbols in {stats['seconds']:6.2f}s "
+              f"(fetch {stats['fetch seconds']:.2f}s, indicators {stats['indicator seconds']:.2f}s, "
+              f"classify {stats['classify seconds']:.2f}s), {stats['classified']} classified, "
+              f"{stats['scanned'] / stats['seconds']:.0f} symbols/s")
+        return results, stats
+
+    run("capped cold", True, max_tickers=40)
+    results, cold = run("full cold", True)
+    _, warm = run("full warm", False)
+
+    # The batched pipeline must classify as the per-ticker path does
+    failures = 0
+    frames = strategy_scan.fetch_frames(symbols[:args.checked], strategy.min_bars)
+    rows = {row["ticker"]: row for row in results}
+    for ticker, data in frames.items():
+        daily = bar_store.read_bars(ticker, "1d", root=root)[0]
+        for interval in ("1wk", "1mo"):
+            expected = legacy_resample_bars(daily, interval)
+            actual = market_data.resample_bars(daily, interval)
+            if not actual.equals(expected) or not actual.index.equals(expected.index):
+                failures += 1
+                print(f"  {ticker} {interval}: resampled bars differ from pandas")
+        alone = strategy_scan.analyze_ticker(ticker, ticker, strategy, *data)
+        if (alone["Setup"], alone["Score"]) != (rows[ticker]["Setup"], rows[ticker]["Score"]):
+            failures += 1
+            print(f"  {ticker}: scan {rows[ticker]['Setup']} {rows[ticker]['Score']}, alone {alone['Setup']} {alone['Score']}")
+    budget = strategy_scan.SCAN_BUDGET
+    print(f"{len(symbols)} symbols: cold {cold['seconds']:.1f}s, warm {warm['seconds']:.1f}s against a {budget:.0f}s budget "
+          f"({'within' if not cold['over budget'] else 'OVER'}); {failures} mismatches in {len(frames)} checked")
+    return 1 if failures or cold["over budget"] else 0
+
+
+def parallel_benchmark(args):
+    """
+    Time the strategy scanner's indicator stage in-process and on worker
+    processes fed through shared memory, check that every worker count
+    returns the same snapshots, and report the speedup per worker count
+    """
+    strategy = strategy_rules.load_strategies()["Strict Strategy"]
+    daily = {f"SYN{i:05d}": synthetic_bars(args.bars, i) for i in range(args.symbols)}
+    frames = {
+        "daily": daily,
+        "weekly": {symbol: market_data.resample_bars(data, "1wk") for symbol, data in daily.items()},
+        "monthly": {symbol: market_data.resample_bars(data, "1mo") for symbol, data in daily.items()},
+    }
+    timeframes = [tf for tf in ("weekly", "daily", "monthly") if tf in strategy.timeframes]
+
+    def stage(workers):
+        return {tf: parallel.indicators(strategy, frames[tf], tf, workers=workers) for tf in timeframes}
+
+    def best(workers):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = stage(workers)
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    failures = 0
+    serial, expected = best(0)
+    print(f"{args.symbols} symbols x {args.bars} daily bars, {os.cpu_count()} CPU(s): in-process {serial:.2f}s")
+    for workers in args.workers:
+        stage(workers)  # Start the pool outside the timings
+        elapsed, result = best(workers)
+        same = all(
+            result[tf].keys() == expected[tf].keys()
+            # Chunks are padded to their own longest history, which moves running sums by rounding only
+            and all(np.allclose(result[tf][s], expected[tf][s], rtol=1e-10, atol=1e-10, equal_nan=True) for s in expected[tf])
+            for tf in timeframes
+        )
+        failures += 0 if same else 1
+        print(f"  {workers:2d} workers: {elapsed:.2f}s ({serial / elapsed:.2f}x){'' if same else '  MISMATCH'}")
+    parallel.shutdown()
+    return 1 if failures else 0
+
+
+def resample_parity(args):
+    """
+    Compare locally resampled weekly/monthly bars against the provider's own
+    weekly/monthly bars for the same tickers.
+    """
+    failures = 0
+    for ticker in args.tickers:
+        daily = bar_store.normalize_bars(market_data.download_history(ticker, "1d", period=args.period))
+        for interval in ("1wk", "1mo"):
+            provider = bar_store.normalize_bars(market_data.download_history(ticker, interval, period=args.period))
+            local = market_data.resample_bars(daily, interval)
+            # The oldest bar may start part-way through a week/month, so compare from the second one
+            common = provider.index.intersection(local.index)[1:]
+            if len(common) == 0:
+                print(f"{ticker:>10} {interval:>4}  no overlapping bars")
+                failures += 1
+                continue
+            columns = ["Open", "High", "Low", "Close"]
+            expected = provider.loc[common, columns].to_numpy()
+            actual = local.loc[common, columns].to_numpy()
+            rel_diff = np.nanmax(np.abs(actual - expected) / np.abs(expected))
+            missing = len(provider.index.difference(local.index)[1:])
+            ok = rel_diff <= args.tolerance and missing == 0
+            failures += 0 if ok else 1
+            print(f"{ticker:>10} {interval:>4}  bars={len(common):4d}  missing={missing:3d}  "
+                  f"max rel diff={rel_diff:.2e}  {'OK' if ok else 'MISMATCH'}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parity = commands.add_parser("resample-parity", help="check local weekly/monthly bars against the provider's")
+    parity.add_argument("tickers", nargs="*", default=["AAPL", "^FTSE", "BP.L", "EURUSD=X", "7203.T"])
+    parity.add_argument("--period", default="2y")
+    parity.add_argument("--tolerance", type=float, default=1e-4, help="max relative OHLC difference")
+    parity.set_defaults(func=resample_parity)
+
+    replay = commands.add_parser("make-replay", help="write synthetic recordings for offline runs")
+    replay.add_argument("root")
+    replay.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    replay.add_argument("--extra", type=int, default=0, help="synthetic symbols to add to the universe")
+    replay.set_defaults(func=make_replay)
+
+    rec = commands.add_parser("record", help="record live daily bars into a replay folder")
+    rec.add_argument("root")
+    rec.add_argument("tickers", nargs="*")
+    rec.add_argument("--period", default="10y")
+    rec.set_defaults(func=record_replay)
+
+    throughput = commands.add_parser("scan-throughput", help="measure fetch throughput against a replay folder")
+    throughput.add_argument("root")
+    throughput.add_argument("--latency", type=float, default=0.05, help="seconds per provider request")
+    throughput.add_argument("--latency-per-symbol", type=float, default=0.005, help="extra seconds per symbol in grouped requests")
+    throughput.add_argument("--workers", type=int, default=market_data.DEFAULT_MAX_WORKERS)
+    throughput.add_argument("--batch-size", type=int, default=market_data.DEFAULT_BATCH_SIZE)
+    throughput.add_argument("--extra", type=int, default=0)
+    throughput.add_argument("--limit", type=int, default=0, help="only use the first N symbols")
+    throughput.set_defaults(func=scan_throughput)
+
+    cache = commands.add_parser("bar-cache", help="check the coverage shared cache entries claim after reloads")
+    cache.set_defaults(func=bar_cache_check)
+
+    rsi = commands.add_parser("rsi", help="check the vectorized RSI against the legacy loop and time both")
+    rsi.add_argument("--tolerance", type=float, default=1e-9, help="max absolute RSI difference")
+    rsi.add_argument("--repeat", type=int, default=20)
+    rsi.set_defaults(func=rsi_parity)
+
+    engine = commands.add_parser("panel", help="check the panel indicator engine against per-ticker calls and time both")
+    engine.add_argument("--sizes", default="50,500,5000", help="comma-separated universe sizes")
+    engine.add_argument("--min-bars", type=int, default=40, help="shortest synthetic daily history")
+    engine.add_argument("--max-bars", type=int, default=260, help="longest synthetic daily history")
+    engine.add_argument("--tolerance", type=float, default=1e-8, help="max absolute indicator difference")
+    engine.set_defaults(func=panel_benchmark)
+
+    stream = commands.add_parser("stream", help="check incremental indicator updates against full recomputes and time both")
+    stream.add_argument("--symbols", type=int, default=2000)
+    stream.add_argument("--bars", type=int, default=63, help="daily bars per symbol (the dashboard scans ~3 months)")
+    stream.add_argument("--cycles", type=int, default=3, help="rounds of unchanged / revised / new-bar refreshes")
+    stream.add_argument("--tolerance", type=float, default=1e-8, help="max absolute indicator difference")
+    stream.set_defaults(func=stream_benchmark)
+
+    strategy = commands.add_parser("strategy-indicators", help="check indicators.py against pandas_ta and compare import and per-ticker time")
+    strategy.add_argument("--bars", type=int, default=260, help="daily bars for the per-ticker timing")
+    strategy.add_argument("--repeat", type=int, default=5)
+    strategy.add_argument("--tolerance", type=float, default=1e-9, help="max absolute indicator difference")
+    strategy.set_defaults(func=strategy_indicator_benchmark)
+
+    rules = commands.add_parser("strategy-rules", help="check the strict strategy against fixed setups and time the strategies")
+    rules.add_argument("--symbols", type=int, default=300)
+    rules.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    rules.add_argument("--repeat", type=int, default=3)
+    rules.add_argument("--shown", type=int, default=50, help="rows described, as for one screen of results")
+    rules.set_defaults(func=strategy_rules_benchmark)
+
+    history = commands.add_parser("signals", help="check historical setups against scans of truncated histories and time them")
+    history.add_argument("--symbols", type=int, default=300)
+    history.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    history.add_argument("--checks", type=int, default=20, help="sampled days scanned for the parity check")
+    history.set_defaults(func=signals_benchmark)
+
+    trading = commands.add_parser("backtest", help="check the vectorized trade simulation against a bar-by-bar walk and time backtests")
+    trading.add_argument("--symbols", type=int, default=0, help="synthetic symbols (default: as many as TICKER_CATEGORIES)")
+    trading.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    trading.add_argument("--hold", type=int, default=backtest.DEFAULT_HOLD)
+    trading.add_argument("--stop", type=float, default=backtest.DEFAULT_STOP)
+    trading.add_argument("--target", type=float, default=None)
+    trading.add_argument("--cost", type=float, default=0.001)
+    trading.add_argument("--checked", type=int, default=20, help="symbols walked bar by bar for the parity check")
+    trading.set_defaults(func=backtest_benchmark)
+
+    search = commands.add_parser("sweep", help="time a random search over the strict strategy's constants")
+    search.add_argument("--symbols", type=int, default=0, help="synthetic symbols (default: as many as the FTSE list)")
+    search.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    search.add_argument("--combinations", type=int, default=1000)
+    search.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    search.add_argument("--checked", type=int, default=3, help="combinations re-evaluated serially")
+    search.set_defaults(func=sweep_benchmark)
+
+    forward = commands.add_parser("walkforward", help="check shared-window threshold variants and time a walk-forward re-fit")
+    forward.add_argument("--symbols", type=int, default=0, help="synthetic symbols (default: as many as the FTSE list)")
+    forward.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    forward.add_argument("--train", default=walkforward.DEFAULT_TRAIN)
+    forward.add_argument("--test", default=walkforward.DEFAULT_TEST)
+    forward.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    forward.add_argument("--checked", type=int, default=4, help="variants checked against historical_setups")
+    forward.set_defaults(func=walkforward_benchmark)
+
+    board = commands.add_parser("ranking", help="check leaderboard rankings against list sorts and time both")
+    board.add_argument("--symbols", type=int, default=5000)
+    board.add_argument("--categories", type=int, default=20)
+    board.add_argument("--repeat", type=int, default=5)
+    board.set_defaults(func=ranking_benchmark)
+
+    full = commands.add_parser("strategy-scan", help="time full-universe strategy scans against the scan budget")
+    full.add_argument("--root", default=None, help="replay folder (default: synthetic recordings in a temporary folder)")
+    full.add_argument("--symbols", type=int, default=0, help="symbols scanned, synthetic ones past the universe (default: the universe)")
+    full.add_argument("--bars", type=int, default=2600, help="daily bars per synthetic symbol (~10y)")
+    full.add_argument("--latency", type=float, default=0.25, help="seconds per provider request")
+    full.add_argument("--latency-per-symbol", type=float, default=0.01, help="extra seconds per symbol in grouped requests")
+    full.add_argument("--workers", type=int, default=strategy_scan.BATCH_WORKERS, help="grouped downloads in flight")
+    full.add_argument("--checked", type=int, default=50, help="symbols re-analyzed one at a time for the parity check")
+    full.set_defaults(func=strategy_scan_benchmark)
+
+    processes = commands.add_parser("parallel", help="time the indicator stage on worker processes against in-process")
+    processes.add_argument("--symbols", type=int, default=2000)
+    processes.add_argument("--bars", type=int, default=2600, help="daily bars per symbol (~10y)")
+    processes.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="worker counts timed")
+    processes.add_argument("--repeat", type=int, default=3)
+    processes.set_defaults(func=parallel_benchmark)
+
+    flight = commands.add_parser("coalesce", help="count duplicate fetches saved by single-flight coalescing")
+    flight.add_argument("root")
+    flight.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    flight.add_argument("--latency", type=float, default=0.2, help="seconds per provider request")
+    flight.add_argument("--workers", type=int, default=market_data.DEFAULT_MAX_WORKERS)
+    flight.add_argument("--limit", type=int, default=40, help="symbols per session")
+    flight.set_defaults(func=coalesce)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Vectorized event detection for the scanners.
+
+Each detector takes NumPy arrays with time along the first axis: one series
+(1-D) or a whole panel (bars x symbols, see panel.py). It returns a boolean
+array of the same shape that is True on the bar where an event completes,
+so nothing looks ahead. NaN inputs never produce events.
+
+bars_since() then reduces an event array to "how many bars ago did this last
+happen" within a lookback window, per column.
+"""
+import numpy as np
+
+
+def _previous(values):
+    """values shifted down one bar (NaN on the first)"""
+    values = np.asarray(values, dtype=float)
+    shifted = np.full_like(values, np.nan)
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def _broadcast(level, like):
+    # A scalar level (e.g. RSI 50) applies to every bar
+    return np.broadcast_to(np.asarray(level, dtype=float), np.shape(like))
+
+
+def cross_up(values, level):
+    """values goes from at-or-below level to above it on this bar"""
+    values = np.asarray(values, dtype=float)
+    level = _broadcast(level, values)
+    return (_previous(values) <= _previous(level)) & (values > level)
+
+
+def cross_down(values, level):
+    """values goes from at-or-above level to below it on this bar"""
+    values = np.asarray(values, dtype=float)
+    level = _broadcast(level, values)
+    return (_previous(values) >= _previous(level)) & (values < level)
+
+
+def touch_and_reject(extreme, close, level, side="support"):
+    """
+    The previous bar touched level and closed back on the other side, and
+    this bar confirmed it: for support the low reached the level, the close
+    stayed above it and this close is higher; for resistance the mirror image
+    with the high.
+    """
+    extreme = np.asarray(extreme, dtype=float)
+    close = np.asarray(close, dtype=float)
+    level = _broadcast(level, close)
+    if side == "support":
+        touched = (extreme <= level) & (close > level)
+        confirmed = close > _previous(close)
+    else:
+        touched = (extreme >= level) & (close < level)
+        confirmed = close < _previous(close)
+    previous_touch = np.zeros_like(touched)
+    previous_touch[1:] = touched[:-1]
+    return previous_touch & confirmed
+
+
+def hook(values, bars=3, direction="up"):
+    """values moved strictly in one direction over the last `bars` bars, ending on this bar"""
+    values = np.asarray(values, dtype=float)
+    hooked = np.zeros(values.shape, dtype=bool)
+    if len(values) < bars:
+        return hooked
+    steps = np.diff(values, axis=0)
+    moving = steps > 0 if direction == "up" else steps < 0
+    # A run of bars - 1 consecutive moves ending at each bar
+    run = np.ones(moving[bars - 2:].shape, dtype=bool)
+    for k in range(bars - 1):
+        run &= moving[k:len(moving) - (bars - 2) + k]
+    hooked[bars - 1:] = run
+    return hooked
+
+
+def bars_since(events, lookback):
+    """
+    Bars since the latest event among the last `lookback` bars (0 = on the
+    latest bar), per column; NaN when there was none.
+    """
+    events = np.asarray(events, dtype=bool)
+    window = events[-lookback:][::-1] if lookback > 0 else events[:0]
+    if not len(window):
+        return np.full(events.shape[1:], np.nan) if events.ndim > 1 else np.nan
+    # First hit counting back from the latest bar
+    return np.where(window.any(axis=0), np.argmax(window, axis=0), np.nan)
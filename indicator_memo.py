@@ -0,0 +1,125 @@
+"""
+Memoized indicator snapshots shared by the Stockbot apps.
+
+Every Streamlit rerun (widget change, auto-refresh, tab switch) scans again,
+even when the bar cache hands back the same bars. Snapshots computed from a
+symbol's bars are stored under (symbol, interval, indicator params,
+fingerprint of the bars), where the fingerprint is the bar count, the last
+bar's timestamp and a hash of the last few bars. A rerun over unchanged bars
+gets the previous snapshot back; a new or revised bar changes the
+fingerprint and the snapshot is recomputed.
+
+Snapshots are shared, so callers must not modify them. The memo is an LRU
+bounded by both entry count and bytes.
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from bar_cache import frame_bytes
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("STOCKBOT_MEMO_ENTRIES", 20000))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("STOCKBOT_MEMO_MB", 128)) * 1024 * 1024)
+
+# Bars hashed into the fingerprint: new bars and revisions of the forming bar land
+# here, and price adjustments rescale the whole history, these bars included
+FINGERPRINT_BARS = 5
+
+
+def fingerprint(data, tail=FINGERPRINT_BARS):
+    """(bar count, last timestamp, hash of the last `tail` bars) of a frame"""
+    if data is None or data.empty:
+        return (0, None, None)
+    recent = data.iloc[-tail:]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(recent.index.values.tobytes())
+    digest.update(np.ascontiguousarray(recent.to_numpy(dtype=float)).tobytes())
+    return (len(data), data.index[-1], digest.hexdigest())
+
+
+def snapshot_bytes(value):
+    """Rough memory held by a snapshot (frames, arrays and containers of them)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return frame_bytes(value) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(snapshot_bytes(k) + snapshot_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(snapshot_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class IndicatorMemo:
+    """Thread-safe LRU of indicator snapshots bounded by entries and bytes"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (snapshot, nbytes)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(symbol, interval, params, data):
+        """Memo key for bars `data` (one frame, or a tuple of frames the snapshot depends on)"""
+        if isinstance(data, tuple):
+            return (symbol, interval, params, tuple(fingerprint(frame) for frame in data))
+        return (symbol, interval, params, fingerprint(data))
+
+    def get(self, key):
+        """The stored snapshot, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, snapshot):
+        """Store a snapshot (evicting the least recently used ones) and return it"""
+        if snapshot is None:
+            return snapshot  # Failed computations are retried next time
+        nbytes = snapshot_bytes(snapshot)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self.entries[key] = (snapshot, nbytes)
+            self.nbytes += nbytes
+            self._evict()
+        return snapshot
+
+    def _evict(self):
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, nbytes) = self.entries.popitem(last=False)
+            self.nbytes -= nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "snapshots": len(self.entries),
+                "memory MB": round(self.nbytes / 1024 ** 2, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit rate": round(self.hits / requests, 3) if requests else 0.0,
+            }
+
+
+# Shared by every app in the process
+INDICATOR_MEMO = IndicatorMemo()
@@ -0,0 +1,308 @@
+"""
+Incremental indicator state for the dashboard scan.
+
+EMA, MACD and Wilder RSI are recursive: once a symbol's history has been
+computed, the next bar needs only the previous values. An IndicatorState keeps
+those values for one (symbol, timeframe) as of its last committed bar (every
+bar but the latest). The latest bar is still forming, so each refresh applies
+it provisionally on top of the committed values without folding it in. A
+refresh therefore costs O(1) per ticker:
+
+- unchanged bars return the previous result,
+- a revised latest bar is re-applied to the committed values,
+- bars that have closed since the last refresh are committed one step each.
+
+A state is anchored on the history it was built from, not on the start of
+the window it is given: the dashboard's windows (e.g. the last 3 months)
+slide forward a bar every day, and the state keeps stepping forward from its
+last committed bar while the values are those of the history since it was
+built. Only the chart series are trimmed to the window.
+
+Anything else rebuilds the state from the window: the last committed bar is
+no longer in it or was revised, the window reaches further back than the
+state, or there is too little history to seed the averages. All rebuilt
+symbols go through one vectorized panel pass.
+
+States are kept in the process-wide INDICATOR_STATES and saved next to the bar
+store, so a restarted app starts warm.
+"""
+import os
+import pickle
+import threading
+import weakref
+
+import numpy as np
+
+import bar_store
+import panel
+
+EMA_SPANS = (7, 11, 21)
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_WINDOW = 14
+RSI_SIGNAL = 9
+
+# Saved states are discarded if any of these change
+STATE_VERSION = 3  # 2: states keep the chart series, 3: states follow sliding windows
+PARAMS = (STATE_VERSION, EMA_SPANS, MACD_FAST, MACD_SLOW, MACD_SIGNAL, RSI_WINDOW, RSI_SIGNAL)
+
+
+def _ewm_step(previous, value, alpha):
+    """One adjust=False EWM step, written as pandas (and panel.ewm_mean) computes it"""
+    if previous == value:
+        return previous
+    return ((1 - alpha) * previous + alpha * value) / ((1 - alpha) + alpha)
+
+
+def _rsi(avg_gain, avg_loss):
+    # No losses gives RSI 100; no movement at all stays NaN
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else np.nan
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class IndicatorState:
+    """Recursive indicator values of one symbol as of its last committed bar"""
+
+    def __init__(self, bars, last_time, last_close, emas, signal, avg_gain, avg_loss, rsi_tail, rsi_seen, series):
+        self.bars = bars  # number of committed bars kept in series
+        self.last_time = last_time
+        self.last_close = last_close
+        self.emas = emas  # {span: EMA}, including the MACD spans
+        self.signal = signal  # MACD signal EMA
+        self.avg_gain = avg_gain
+        self.avg_loss = avg_loss
+        self.rsi_tail = rsi_tail  # last RSI_SIGNAL - 1 committed RSI values
+        self.rsi_seen = rsi_seen  # any valid RSI among the committed bars
+        self.series = series  # committed EMA_SPANS and RSI values for the chart, as lists
+        self.latest = None  # (bars, first time, time, close) and result of the last refresh
+        self.frame = None  # weak reference to the frame of the last refresh
+
+    def __getstate__(self):
+        return dict(self.__dict__, frame=None)
+
+    def _step(self, close):
+        """Indicator values after appending `close` to the committed bars"""
+        emas = {span: _ewm_step(value, close, 2 / (span + 1)) for span, value in self.emas.items()}
+        line = emas[MACD_FAST] - emas[MACD_SLOW]
+        change = close - self.last_close
+        avg_gain = _ewm_step(self.avg_gain, change if change > 0 else 0.0, 1 / RSI_WINDOW)
+        avg_loss = _ewm_step(self.avg_loss, -change if change < 0 else 0.0, 1 / RSI_WINDOW)
+        return {
+            "emas": emas,
+            "line": line,
+            "signal": _ewm_step(self.signal, line, 2 / (MACD_SIGNAL + 1)),
+            "avg_gain": avg_gain,
+            "avg_loss": avg_loss,
+            "rsi": _rsi(avg_gain, avg_loss),
+        }
+
+    def _commit(self, time, close):
+        step = self._step(close)
+        self.emas = step["emas"]
+        self.signal = step["signal"]
+        self.avg_gain, self.avg_loss = step["avg_gain"], step["avg_loss"]
+        self.rsi_tail = (self.rsi_tail + [step["rsi"]])[1:]
+        self.rsi_seen = self.rsi_seen or not np.isnan(step["rsi"])
+        newest = dict(step["emas"], rsi=step["rsi"])
+        for name, values in self.series.items():
+            values.append(newest[name])
+        self.bars += 1
+        self.last_time, self.last_close = time, close
+
+    def advance(self, data):
+        """
+        Result for `data` (the committed bars plus any new ones), or None when
+        the history was revised and the state has to be rebuilt.
+        Returns (result, how it was served).
+        """
+        # The bar cache hands back the same frame until the symbol's bars change
+        if self.frame is not None and self.frame() is data:
+            return self.latest[1], "unchanged"
+        times, closes = data.index.values, data["Close"].to_numpy(dtype=float)
+        bars = len(closes)
+        # The window may have slid forward since the last refresh: find the last committed bar in it
+        committed = int(np.searchsorted(times, self.last_time)) + 1
+        if committed > bars or times[committed - 1] != self.last_time or closes[committed - 1] != self.last_close:
+            return None
+        if committed == bars or committed > self.bars:
+            return None  # No latest bar, or the window starts before the state
+        latest = (bars, times[0], times[-1], closes[-1])
+        if self.latest is not None and self.latest[0] == latest:
+            self.frame = weakref.ref(data)
+            return self.latest[1], "unchanged"
+        if np.isnan(closes[committed:]).any():
+            return None
+        how = "committed" if bars > committed + 1 else "provisional"
+        for k in range(committed, bars - 1):
+            self._commit(times[k], float(closes[k]))
+        # Chart series only need the window's bars
+        if self.bars > bars - 1:
+            for values in self.series.values():
+                del values[:self.bars - (bars - 1)]
+            self.bars = bars - 1
+        step = self._step(float(closes[-1]))
+        rsi_window = self.rsi_tail + [step["rsi"]]
+        newest = dict(step["emas"], rsi=step["rsi"])
+        result = _result(
+            bars,
+            step["emas"],
+            step["line"],
+            step["signal"],
+            step["rsi"],
+            sum(rsi_window) / RSI_SIGNAL,
+            self.rsi_seen or not np.isnan(step["rsi"]),
+            {name: np.array(values + [newest[name]]) for name, values in self.series.items()},
+        )
+        self.latest = (latest, result)
+        self.frame = weakref.ref(data)
+        return result, how
+
+
+def _result(bars, emas, line, signal, rsi, rsi_signal, rsi_seen, series):
+    """
+    Latest values as the dashboard reads them, plus the EMA and RSI series for
+    its chart. RSI needs 2 * RSI_WINDOW bars (see indicators.wilder_rsi).
+    """
+    enough = bars >= RSI_WINDOW * 2
+    if not enough:
+        series = dict(series, rsi=np.full(bars, np.nan))
+    return {
+        "series": series,
+        "emas": {span: emas[span] for span in EMA_SPANS},
+        "macd_line": line,
+        "signal_line": signal,
+        "rsi": rsi if enough else np.nan,
+        "rsi_signal": rsi_signal if enough else np.nan,
+        "has_rsi": bool(enough and rsi_seen),
+    }
+
+
+def rebuild(frames):
+    """
+    Compute every symbol's result from its full history in one panel pass,
+    with the state to continue from (None if the history is too short to seed it).
+    Returns {symbol: (result, state)}.
+    """
+    bars = panel.Panel(frames, columns=("Close",))
+    close, starts = bars["Close"], bars.starts
+    spans = sorted(set(EMA_SPANS) | {MACD_FAST, MACD_SLOW})
+    emas = {span: panel.ema(close, span) for span in spans}
+    line = emas[MACD_FAST] - emas[MACD_SLOW]
+    signal = panel.ema(line, MACD_SIGNAL)
+    avg_gain, avg_loss = panel.wilder_averages(close, RSI_WINDOW, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi_signal = panel.sma(rsi, RSI_SIGNAL)
+    valid_rsi = ~np.isnan(rsi)
+    chart_series = dict({span: emas[span] for span in EMA_SPANS}, rsi=rsi)
+
+    built = {}
+    for j, symbol in enumerate(bars.symbols):
+        length = int(bars.lengths[j])
+        times, closes = bars.index[symbol].values, close[-length:, j]
+        result = _result(
+            length,
+            {span: float(values[-1, j]) for span, values in emas.items()},
+            float(line[-1, j]),
+            float(signal[-1, j]),
+            float(rsi[-1, j]),
+            float(rsi_signal[-1, j]),
+            bool(valid_rsi[:, j].any()),
+            {name: values[-length:, j].copy() for name, values in chart_series.items()},
+        )
+        state = None
+        # The Wilder averages are seeded at bar RSI_WINDOW; commit only once they exist
+        if length >= RSI_WINDOW + 2 and not np.isnan(closes).any():
+            committed = -2
+            state = IndicatorState(
+                bars=length - 1,
+                last_time=times[committed],
+                last_close=closes[committed],
+                emas={span: float(values[committed, j]) for span, values in emas.items()},
+                signal=float(signal[committed, j]),
+                avg_gain=float(avg_gain[committed, j]),
+                avg_loss=float(avg_loss[committed, j]),
+                rsi_tail=[float(value) for value in rsi[-RSI_SIGNAL:-1, j]],
+                rsi_seen=bool(valid_rsi[:-1, j].any()),
+                series={name: values[-length:-1, j].tolist() for name, values in chart_series.items()},
+            )
+            state.latest = ((length, times[0], times[-1], closes[-1]), result)
+            state.frame = weakref.ref(frames[symbol])
+        built[symbol] = (result, state)
+    return built
+
+
+class IndicatorStates:
+    """Thread-safe store of IndicatorState per (symbol, timeframe), saved to disk on request"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.states = None  # loaded on first use
+        self.counts = {"unchanged": 0, "provisional": 0, "committed": 0, "rebuilt": 0}
+
+    def _path(self):
+        return self.path or os.path.join(bar_store.STORE_DIR, "indicator_state.pkl")
+
+    def _load(self):
+        if self.states is not None:
+            return
+        self.states = {}
+        try:
+            with open(self._path(), "rb") as f:
+                saved = pickle.load(f)
+            if saved.get("params") == PARAMS:
+                self.states = saved["states"]
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError):
+            pass
+
+    def update(self, frames, timeframe):
+        """Latest indicator values for {symbol: bars}, advancing each symbol's state"""
+        results, stale = {}, {}
+        with self.lock:
+            self._load()
+            for symbol, data in frames.items():
+                if data is None or data.empty:
+                    continue
+                state = self.states.get((symbol, timeframe))
+                served = state.advance(data) if state is not None else None
+                if served is None:
+                    stale[symbol] = data
+                    continue
+                results[symbol], how = served
+                self.counts[how] += 1
+            if stale:
+                for symbol, (result, state) in rebuild(stale).items():
+                    results[symbol] = result
+                    if state is None:
+                        self.states.pop((symbol, timeframe), None)
+                    else:
+                        self.states[(symbol, timeframe)] = state
+                self.counts["rebuilt"] += len(stale)
+        return results
+
+    def save(self):
+        """Write the states next to the bar store"""
+        with self.lock:
+            if self.states is None:
+                return
+            path = self._path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"params": PARAMS, "states": self.states}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def clear(self):
+        with self.lock:
+            self.states = {}
+            self.counts = dict.fromkeys(self.counts, 0)
+
+    def stats(self):
+        """How symbols have been served since start (or the last clear)"""
+        with self.lock:
+            return dict(self.counts, states=len(self.states or {}))
+
+
+# Shared by every scan in the process
+INDICATOR_STATES = IndicatorStates()
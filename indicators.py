@@ -0,0 +1,96 @@
+"""
+Vectorized technical indicators shared by the Stockbot apps.
+
+These replace per-bar Python loops with pandas/NumPy operations while
+keeping the apps' existing seeding conventions, so values match the old
+implementations to floating-point tolerance (see `benchmarks.py rsi`).
+ema/rsi/macd follow pandas_ta's definitions, so the strategy scanner does
+not need pandas_ta (see `benchmarks.py strategy-indicators`).
+"""
+import numpy as np
+import pandas as pd
+
+
+def wilder_average(values, window):
+    """
+    Wilder's smoothed average of a NumPy array.
+
+    Seeded with the simple mean of values[1:window + 1] at position `window`
+    (position 0 is the undefined first price change), then
+    avg[i] = (avg[i - 1] * (window - 1) + values[i]) / window, which is an
+    exponential average with alpha = 1 / window. Earlier positions are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    averages = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return averages
+    seed = values[1:window + 1].mean()
+    smoothed = pd.Series(np.concatenate(([seed], values[window + 1:]))).ewm(alpha=1 / window, adjust=False).mean()
+    averages[window:] = smoothed.to_numpy()
+    return averages
+
+
+def wilder_rsi(close, window=14):
+    """
+    RSI with Wilder smoothing, seeded with the SMA of the first `window` price changes.
+    Returns a Series aligned with `close`.
+    """
+    delta = close.diff().to_numpy(dtype=float)
+    # Missing changes count as no move, as in the original loop
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = wilder_average(gain, window)
+    avg_loss = wilder_average(loss, window)
+
+    # No losses gives rs = inf and RSI 100; no movement at all stays NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return pd.Series(rsi, index=close.index)
+
+
+def ema(close, length=10):
+    """
+    EMA as pandas_ta computes it: the mean of the first `length` closes seeds
+    position length - 1, then an adjust=False EMA. None if close is shorter than length.
+    """
+    if close is None or len(close) < length:
+        return None
+    values = close.to_numpy(dtype=float, copy=True)
+    values[length - 1] = np.nanmean(values[:length])
+    values[:length - 1] = np.nan
+    return pd.Series(values, index=close.index).ewm(span=length, adjust=False).mean()
+
+
+def rsi(close, length=14):
+    """
+    RSI as pandas_ta computes it: RMA (an adjusted EMA with alpha = 1 / length
+    and min_periods = length) of the gains and losses. None if close is shorter than length.
+    """
+    if close is None or len(close) < length:
+        return None
+    delta = close.diff().to_numpy(dtype=float)
+    # The undefined first change stays NaN so the averages skip it
+    gain = pd.Series(np.where(delta < 0, 0.0, delta), index=close.index)
+    loss = pd.Series(np.where(delta > 0, 0.0, -delta), index=close.index)
+    avg_gain = gain.ewm(alpha=1 / length, min_periods=length).mean()
+    avg_loss = loss.ewm(alpha=1 / length, min_periods=length).mean()
+    return 100 * avg_gain / (avg_gain + avg_loss)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    MACD as pandas_ta computes it, from SMA-seeded EMAs; the signal EMA is
+    seeded from the first valid MACD value. Returns (line, signal line,
+    histogram), or None if close is shorter than the longest length.
+    """
+    if close is None or len(close) < max(fast, slow, signal):
+        return None
+    line = ema(close, fast) - ema(close, slow)
+    first = line.first_valid_index()
+    signal_line = ema(line.loc[first:], signal) if first is not None else None
+    if signal_line is None:
+        signal_line = pd.Series(np.nan, index=line.index)
+    signal_line = signal_line.reindex(line.index)
+    return line, signal_line, line - signal_line
@@ -0,0 +1,413 @@
+"""
+Shared market data helpers for the Stockbot apps.
+
+Pulls OHLCV for many tickers in a few grouped requests instead of one round
+trip per symbol, and splits the result back into per-ticker frames. Requests
+go to the active provider (Yahoo Finance or an offline replay, see providers.py).
+Everything is read through the on-disk bar store, so only bars newer than the
+last stored one are downloaded once a symbol has been seen. Weekly and monthly
+bars are built locally from the daily series rather than downloaded again.
+In memory, every app reads through the shared BAR_CACHE (see bar_cache.py),
+so a symbol is held once per process whichever apps use it.
+
+All network calls draw from one process-wide token bucket, and fetch_many()
+runs per-ticker work on a bounded thread pool for the apps' scan loops.
+Concurrent sessions that miss the cache for the same bars share one fetch
+(see SingleFlight) instead of each calling the provider, and symbols that
+keep failing are skipped with exponential backoff (see quarantine.py).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+from bar_cache import BAR_CACHE
+from providers import get_provider
+from quarantine import QUARANTINE
+
+# Number of symbols requested per grouped download
+DEFAULT_BATCH_SIZE = 50
+
+# Concurrency and request-rate limits shared by every scan in the process
+DEFAULT_MAX_WORKERS = int(os.environ.get("STOCKBOT_MAX_WORKERS", 8))
+REQUESTS_PER_SECOND = float(os.environ.get("STOCKBOT_REQUESTS_PER_SECOND", 10))
+REQUEST_BURST = int(os.environ.get("STOCKBOT_REQUEST_BURST", 20))
+
+# Yahoo labels weekly bars with the Monday of the week and monthly bars with
+# the first day of the month; a partial current week/month is labelled the same way
+RESAMPLE_RULES = {
+    "1wk": "W-MON",
+    "1mo": "MS",
+}
+
+RESAMPLE_AGG = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+    "Dividends": "sum",
+    "Stock Splits": "max",
+    "Capital Gains": "sum",
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    Tokens refill at `rate` per second up to `capacity`; acquire() blocks until enough are available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take `tokens` from the bucket, sleeping as needed; returns the seconds spent waiting"""
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# One limiter for the whole process, so concurrent scans and sessions share the request budget
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception). `saved` counts the
+    duplicate calls avoided.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.saved = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "result": None, "error": None}
+            else:
+                self.saved += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+                self.executed += 1
+            call["done"].set()
+
+    def stats(self):
+        with self.lock:
+            return {"fetches": self.executed, "in flight": len(self.calls), "duplicates saved": self.saved}
+
+
+# Shared by every session in the process, keyed by (kind, symbols, interval, range)
+IN_FLIGHT = SingleFlight()
+
+
+def fetch_many(items, fn, max_workers=DEFAULT_MAX_WORKERS, initializer=None):
+    """
+    Run fn(item) for every item on a bounded thread pool.
+
+    Yields (item, result, error) tuples as they complete so the caller can
+    update progress from its own thread. initializer runs once per worker
+    thread (e.g. to attach a Streamlit script context).
+    """
+    items = list(items)
+    if not items:
+        return
+    workers = max(1, min(int(max_workers), len(items)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+
+
+def chunk_list(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def resample_bars(daily, interval):
+    """
+    Build weekly/monthly OHLCV bars from a daily series.
+
+    Only sessions present in the daily data contribute, so exchange holidays
+    are respected, and weeks or months without any session are dropped.
+    """
+    if interval == "1d" or daily is None or daily.empty:
+        return daily
+    rule = RESAMPLE_RULES[interval]
+    agg = {col: how for col, how in RESAMPLE_AGG.items() if col in daily.columns}
+    values = {col: daily[col].to_numpy() for col in agg}
+    if (daily.index.tz is None and daily.index.is_monotonic_increasing
+            and all(v.dtype.kind in "iu" or (v.dtype.kind == "f" and not np.isnan(v).any()) for v in values.values())):
+        return _resample_sorted(daily.index, values, agg, interval)
+    if rule == "W-MON":
+        bars = daily.resample(rule, label="left", closed="left").agg(agg)
+    else:
+        bars = daily.resample(rule).agg(agg)
+    return bars.dropna(subset=["Close"])
+
+
+def _resample_sorted(index, values, agg, interval):
+    """
+    resample_bars of a sorted, tz-naive daily series without missing values,
+    from the sessions' week/month labels: several times faster than a pandas
+    resample, which dominates a cold scan of many symbols
+    """
+    days = index.values.astype("datetime64[D]")
+    if interval == "1wk":
+        # Monday of each session's week (1970-01-01 was a Thursday)
+        labels = days - (days.astype(np.int64) + 3) % 7
+    else:
+        labels = days.astype("datetime64[M]").astype("datetime64[D]")
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+    reducers = {
+        "first": lambda v: v[starts],
+        "last": lambda v: v[ends],
+        "max": lambda v: np.maximum.reduceat(v, starts),
+        "min": lambda v: np.minimum.reduceat(v, starts),
+        "sum": lambda v: np.add.reduceat(v, starts),
+    }
+    return pd.DataFrame({col: reducers[how](values[col]) for col, how in agg.items()},
+                        index=pd.DatetimeIndex(labels[starts].astype(index.dtype), name=index.name))
+
+
+def get_timeframes(symbol, timeframes, max_age=0, app=None):
+    """
+    Fetch one daily history long enough for every requested timeframe and
+    derive the others locally.
+
+    timeframes is a list of (period, interval) pairs; returns a list of
+    DataFrames in the same order. Derived frames are kept on the shared cache
+    entry, so another scan of the same symbol does not resample again.
+    """
+    longest = longest_period([period for period, _ in timeframes])
+    daily = BAR_CACHE.get_full(symbol, "1d", longest, max_age, _store_loader(symbol, "1d", max_age), app)
+    return [
+        BAR_CACHE.derived(symbol, "1d", (period, interval), daily, lambda d, p=period, i=interval: split_timeframe(d, p, i))
+        for period, interval in timeframes
+    ]
+
+
+def longest_period(periods):
+    """Pick the period that reaches furthest back ("max" beats everything)"""
+    starts = {period: bar_store.period_start(period) for period in periods}
+    if any(start is None for start in starts.values()):
+        return "max"
+    return min(starts, key=starts.get)
+
+
+def split_timeframe(daily, period, interval):
+    """Resample a daily history to an interval and trim it to a period"""
+    return bar_store.slice_period(resample_bars(daily, interval), period)
+
+
+def download_history(symbol, interval="1d", period=None, start=None):
+    """Download one symbol's bars from the active provider, either for a period or from a start date"""
+    provider = get_provider()
+    if provider.rate_limited:
+        RATE_LIMITER.acquire()
+    return provider.history(symbol, interval, period=period, start=start)
+
+
+def _load_bars(symbol, interval, period, max_age):
+    """
+    Read through the bar store, skipping quarantined symbols and recording
+    failures. Returns (bars, when they were fetched or None for just now)
+    """
+    if QUARANTINE.blocked(symbol, interval):
+        return pd.DataFrame(), None
+    try:
+        data, fetched_at = bar_store.load_bars(symbol, interval, period, download_history, max_age=max_age)
+    except Exception as e:
+        QUARANTINE.failed(symbol, interval, e)
+        raise
+    if data is None or data.empty:
+        QUARANTINE.failed(symbol, interval, "No data returned")
+    else:
+        QUARANTINE.succeeded(symbol, interval)
+    return data, fetched_at
+
+
+def _store_loader(symbol, interval, max_age):
+    """Loader for BAR_CACHE misses: one in-flight load per key"""
+    return lambda period: IN_FLIGHT.do(
+        ("history", symbol, interval, period),
+        lambda: _load_bars(symbol, interval, period, max_age),
+    )
+
+
+def get_history(symbol, period="1y", interval="1d", max_age=0, app=None):
+    """
+    Get a symbol's bars through the shared in-memory cache and the bar store.
+    Bars refreshed less than max_age seconds ago are served from memory or disk
+    without a request; app names the caller in the cache statistics.
+    """
+    return BAR_CACHE.get(symbol, interval, period, max_age, _store_loader(symbol, interval, max_age), app)
+
+
+def _download_batch(batch, interval, period=None, start=None):
+    """Run one grouped download and return (per-ticker bars, seconds, error)"""
+    provider = get_provider()
+    if provider.rate_limited:
+        # yf.download issues one request per symbol under the hood
+        RATE_LIMITER.acquire(len(batch))
+    started = time.perf_counter()
+    error = None
+    try:
+        bars = provider.download(batch, interval, period=period, start=start)
+    except Exception as e:
+        bars = {ticker: pd.DataFrame() for ticker in batch}
+        error = str(e)
+    return bars, time.perf_counter() - started, error
+
+
+def fetch_batch_history(tickers, period="1y", interval="1d", batch_size=DEFAULT_BATCH_SIZE, max_age=0, app=None,
+                        max_workers=1, progress=None):
+    """
+    Fetch history for many tickers using grouped downloads through the shared
+    cache and the bar store.
+
+    Symbols held in memory are served from BAR_CACHE; symbols already in the
+    store only request bars since their last stored timestamp (grouped by that
+    start date); new symbols download the full period. Quarantined symbols are
+    skipped and come back as empty frames. Up to max_workers batches are
+    downloaded at once; progress(done, total) is called as batches finish.
+
+    Returns a tuple (bars, batch_stats) where bars maps each ticker to its
+    OHLCV DataFrame and batch_stats holds one dict per batch with its size
+    and wall-clock latency, so the batch size can be tuned.
+    """
+    tickers = list(dict.fromkeys(tickers))  # De-duplicate, keep order
+    bars = {}
+    batch_stats = []
+
+    # Work out which symbols need a full download and which only need new bars
+    plans = {}
+    groups = {}
+    for ticker in tickers:
+        cached = BAR_CACHE.lookup(ticker, interval, period, max_age, app)
+        if cached is not None:
+            bars[ticker] = bar_store.slice_period(cached, period)
+            continue
+        if QUARANTINE.blocked(ticker, interval):
+            bars[ticker] = pd.DataFrame()
+            continue
+        mode, stored, meta = bar_store.plan_update(ticker, interval, period, max_age)
+        plans[ticker] = (mode, stored, meta)
+        if mode == "fresh":
+            bars[ticker] = BAR_CACHE.store(ticker, interval, period, bar_store.slice_period(stored, period), app,
+                                           meta.get("fetched_at"))
+        elif mode == "incremental":
+            groups.setdefault(("incremental", bar_store.incremental_start(stored)), []).append(ticker)
+        else:
+            groups.setdefault(("full", None), []).append(ticker)
+
+    jobs = []
+    for (mode, start), group in groups.items():
+        for batch in chunk_list(group, batch_size):
+            jobs.append((len(jobs) + 1, mode, start, batch))
+
+    def fetch_batch(job):
+        number, mode, start, batch = job
+        # Sessions scanning the same universe concurrently share identical batches
+        batch_bars, elapsed, error = IN_FLIGHT.do(
+            ("batch", tuple(batch), interval, period, start),
+            lambda: _download_batch(batch, interval, period=period, start=start),
+        )
+
+        # A split or dividend rescales the whole history: those symbols are downloaded again
+        fetched, errors, redone = dict(batch_bars), dict.fromkeys(batch, error), []
+        if mode == "incremental" and error is None:
+            redone = [ticker for ticker in batch if bar_store.readjusted(plans[ticker][1], fetched.get(ticker))]
+        if redone:
+            full_bars, seconds, full_error = IN_FLIGHT.do(
+                ("batch", tuple(redone), interval, period, None),
+                lambda: _download_batch(redone, interval, period=period),
+            )
+            elapsed += seconds
+            for ticker in redone:
+                fetched[ticker], errors[ticker] = full_bars.get(ticker), full_error
+
+        for ticker in batch:
+            _, stored, meta = plans[ticker]
+            if errors[ticker] is not None:
+                merged = stored  # A failed request must not mark the stored bars as fresh
+            elif ticker in redone:
+                merged = bar_store.save_update(ticker, interval, period, "full", stored.iloc[:0], meta, fetched[ticker])
+            else:
+                merged = bar_store.save_update(ticker, interval, period, mode, stored, meta, fetched.get(ticker))
+            bars[ticker] = BAR_CACHE.store(ticker, interval, period, bar_store.slice_period(merged, period), app)
+            # A failed request says nothing about individual symbols, an empty result in a good one does
+            if errors[ticker] is None:
+                if merged is None or merged.empty:
+                    QUARANTINE.failed(ticker, interval, "No data returned")
+                else:
+                    QUARANTINE.succeeded(ticker, interval)
+
+        return {
+            "interval": interval,
+            "period": period,
+            "mode": mode,
+            "batch": number,
+            "symbols": len(batch),
+            "returned": sum(1 for frame in batch_bars.values() if not frame.empty),
+            "re-downloaded": len(redone),
+            "seconds": round(elapsed, 3),
+            "error": error,
+        }
+
+    # Batches run on the bounded pool (the rate limiter still paces requests)
+    done = len(tickers) - sum(len(job[3]) for job in jobs)  # Served without a request
+    for _, stats, error in fetch_many(jobs, fetch_batch, max_workers=max_workers):
+        if error is not None:
+            raise error
+        batch_stats.append(stats)
+        done += stats["symbols"]
+        if progress:
+            progress(done, len(tickers))
+    batch_stats.sort(key=lambda stats: stats["batch"])
+
+    return bars, batch_stats
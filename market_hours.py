@@ -0,0 +1,165 @@
+"""
+Exchange trading sessions for cache expiry.
+
+Bars of a market that is closed cannot change, so instead of a fixed TTL a
+symbol's cached bars stay valid until its exchange next opens. While the
+market is open the caller's max_age applies (scaled down for FOREX and
+futures, which trade around the clock and should refresh faster).
+
+The exchange is derived from the Yahoo symbol: its suffix (.L, .DE, .T, ...),
+=X for currency pairs, =F for futures, and a lookup table for ^ indices.
+Symbols without a suffix are treated as US listings. Regular hours only:
+exchange holidays and lunch breaks are not modelled, so on a holiday the
+cache simply refreshes as if the market were open.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# Bars fetched shortly after the close may not be final yet
+SETTLE_DELAY = 15 * 60
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+class Session:
+    """
+    Regular trading hours of one market.
+
+    open/close are hours after local midnight of the trading day; a negative
+    open means the session starts the evening before (e.g. FOREX opens at
+    17:00 New York time on the previous day).
+    """
+
+    def __init__(self, name, tz, open, close, days=WEEKDAYS, ttl_factor=1.0):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open = timedelta(hours=open)
+        self.close = timedelta(hours=close)
+        self.days = days
+        self.ttl_factor = ttl_factor
+
+    def sessions_around(self, when):
+        """(open, close) datetimes for the trading days from the day before `when` to four days after"""
+        # Offsets are applied to local wall-clock time so DST changes are respected
+        local = when.astimezone(self.tz)
+        today = datetime(local.year, local.month, local.day, tzinfo=self.tz)
+        for offset in range(-1, 5):
+            day = today + timedelta(days=offset)
+            if day.weekday() in self.days:
+                yield day + self.open, day + self.close
+
+    def is_open(self, when):
+        return any(start <= when < end for start, end in self.sessions_around(when))
+
+    def last_close(self, when):
+        closes = [end for _, end in self.sessions_around(when) if end <= when]
+        return max(closes) if closes else None
+
+    def next_open(self, when):
+        return min(start for start, _ in self.sessions_around(when) if start > when)
+
+
+SESSIONS = {
+    "US": Session("US", "America/New_York", 9.5, 16),
+    "LSE": Session("LSE", "Europe/London", 8, 16.5),
+    "XETRA": Session("XETRA", "Europe/Berlin", 9, 17.5),
+    "EURONEXT": Session("EURONEXT", "Europe/Paris", 9, 17.5),
+    "BME": Session("BME", "Europe/Madrid", 9, 17.5),
+    "MIL": Session("MIL", "Europe/Rome", 9, 17.5),
+    "SIX": Session("SIX", "Europe/Zurich", 9, 17.5),
+    "HEL": Session("HEL", "Europe/Helsinki", 10, 18.5),
+    "OSL": Session("OSL", "Europe/Oslo", 9, 16 + 20 / 60),
+    "STO": Session("STO", "Europe/Stockholm", 9, 17.5),
+    "VIE": Session("VIE", "Europe/Vienna", 9, 17.5),
+    "TSE": Session("TSE", "Asia/Tokyo", 9, 15.5),
+    "HKEX": Session("HKEX", "Asia/Hong_Kong", 9.5, 16),
+    "SGX": Session("SGX", "Asia/Singapore", 9, 17),
+    "SSE": Session("SSE", "Asia/Shanghai", 9.5, 15),
+    "ASX": Session("ASX", "Australia/Sydney", 10, 16),
+    # Sunday 17:00 to Friday 17:00 New York time
+    "FOREX": Session("FOREX", "America/New_York", -7, 17, ttl_factor=0.25),
+    # CME Globex: Sunday 18:00 to Friday 17:00 with a daily one-hour break
+    "FUTURES": Session("FUTURES", "America/New_York", -6, 17, ttl_factor=0.5),
+}
+
+SUFFIX_SESSIONS = {
+    ".L": "LSE",
+    ".DE": "XETRA",
+    ".PA": "EURONEXT",
+    ".AS": "EURONEXT",
+    ".MC": "BME",
+    ".MI": "MIL",
+    ".SW": "SIX",
+    ".HE": "HEL",
+    ".OL": "OSL",
+    ".ST": "STO",
+    ".VI": "VIE",
+    ".T": "TSE",
+    ".HK": "HKEX",
+    ".SI": "SGX",
+    ".SS": "SSE",
+    "=X": "FOREX",
+    "=F": "FUTURES",
+}
+
+INDEX_SESSIONS = {
+    "^GSPC": "US",
+    "^IXIC": "US",
+    "^DJI": "US",
+    "^RUT": "US",
+    "^FTSE": "LSE",
+    "^GDAXI": "XETRA",
+    "^FCHI": "EURONEXT",
+    "^STOXX50E": "EURONEXT",
+    "^AEX": "EURONEXT",
+    "^IBEX": "BME",
+    "^SSMI": "SIX",
+    "^AXJO": "ASX",
+    "^N225": "TSE",
+    "^HSI": "HKEX",
+    "^STI": "SGX",
+}
+
+
+def session_for(symbol):
+    """Trading session a Yahoo symbol belongs to (US hours when unknown)"""
+    if symbol in INDEX_SESSIONS:
+        return SESSIONS[INDEX_SESSIONS[symbol]]
+    for suffix, name in SUFFIX_SESSIONS.items():
+        if symbol.endswith(suffix):
+            return SESSIONS[name]
+    return SESSIONS["US"]
+
+
+def expires_at(symbol, fetched_at, max_age):
+    """
+    Epoch time at which bars fetched at `fetched_at` should be refreshed.
+
+    Fetched while the market is open: after max_age (scaled per session).
+    Fetched after the close has settled: at the next session open.
+    max_age <= 0 disables caching altogether.
+    """
+    if max_age <= 0:
+        return fetched_at
+    return _session_expiry(session_for(symbol).name, fetched_at, max_age)
+
+
+@lru_cache(maxsize=16384)
+def _session_expiry(name, fetched_at, max_age):
+    # Memoized: a cached history keeps the same fetched_at until it is refreshed
+    session = SESSIONS[name]
+    when = datetime.fromtimestamp(fetched_at, timezone.utc)
+    if session.is_open(when):
+        return fetched_at + max_age * session.ttl_factor
+    last_close = session.last_close(when)
+    if last_close is not None and fetched_at < last_close.timestamp() + SETTLE_DELAY:
+        return last_close.timestamp() + SETTLE_DELAY
+    return session.next_open(when).timestamp()
+
+
+def is_fresh(symbol, fetched_at, max_age, now=None):
+    """Whether bars fetched at `fetched_at` (epoch seconds) can still be served without a request"""
+    now = time.time() if now is None else now
+    return now < expires_at(symbol, fetched_at, max_age)
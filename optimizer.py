@@ -0,0 +1,195 @@
+"""
+Parameter sweeps of the scanners' constants against stored history.
+
+A sweep backtests one signal (see backtest.py) under many combinations of
+parameters, from a grid or a random sample of one, on a process pool. Each
+worker gets the histories once, when it starts, and then evaluates chunks of
+combinations. Combinations are sorted before they are chunked, so the
+combinations of a chunk mostly differ in their last parameters and share
+the indicators of the others, which are computed once per chunk (the cache
+of signals.historical_setups). List the parameters that change indicators
+(EMA spans, RSI and MACD settings, lookbacks) first and thresholds or exits
+last.
+
+Parameters a combination can set:
+
+- strategy setups: the strategy spec's params (e.g. ema_short, rsi_window),
+- dashboard labels: the scorecard's params and the dashboard's indicator
+  settings (DASHBOARD_SETTINGS),
+- the MCSO: level and window,
+- any signal: the exits (hold, stop, target, cost).
+
+Results are one row per combination: its parameters and the backtest's
+aggregate stats, in compact dtypes.
+"""
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import indicator_state
+import panel
+import signals
+
+EXIT_PARAMS = ("hold", "stop", "target", "cost")
+DASHBOARD_SETTINGS = {
+    "rsi_window": indicator_state.RSI_WINDOW,
+    "rsi_signal": indicator_state.RSI_SIGNAL,
+    "macd_fast": indicator_state.MACD_FAST,
+    "macd_slow": indicator_state.MACD_SLOW,
+    "macd_signal": indicator_state.MACD_SIGNAL,
+}
+# Parameters that must stay in this order for a combination to make sense
+ORDERED_PARAMS = (
+    ("ema_short", "ema_long"), ("ema_long", "ema_context"), ("macd_fast", "macd_slow"), ("monthly_weak", "monthly_strong"),
+)
+
+# Aggregate stats kept per combination
+STATS = ("trades", "win rate", "avg return", "median return", "profit factor", "avg bars",
+         "avg total return per symbol", "profitable symbols")
+
+# Histories of this worker process, set once by _start_worker
+_FRAMES = None
+
+
+def valid(params, base=None):
+    """False for combinations that break ORDERED_PARAMS (e.g. a short EMA longer than the long one)"""
+    merged = dict(base or {}, **params)
+    return all(merged[a] < merged[b] for a, b in ORDERED_PARAMS if a in merged and b in merged)
+
+
+def grid(space, base=None):
+    """Every valid combination of {parameter: values}, in the order of the space's parameters"""
+    names = list(space)
+    combinations = (dict(zip(names, values)) for values in itertools.product(*space.values()))
+    return [params for params in combinations if valid(params, base)]
+
+
+def random_search(space, count, seed=0, base=None):
+    """count distinct valid combinations drawn at random from the grid of space (fewer if the grid is smaller)"""
+    names, choices = list(space), [list(values) for values in space.values()]
+    sizes = [len(values) for values in choices]
+    total = math.prod(sizes)
+    rng = np.random.default_rng(seed)
+    combinations = []
+    # Draw grid positions in a random order and decode them, without building the grid
+    for position in rng.permutation(total) if total <= 10_000_000 else rng.integers(0, total, count * 4):
+        params = {}
+        for name, values, size in zip(reversed(names), reversed(choices), reversed(sizes)):
+            position, digit = divmod(int(position), size)
+            params[name] = values[digit]
+        params = {name: params[name] for name in names}
+        if valid(params, base) and params not in combinations:
+            combinations.append(params)
+            if len(combinations) == count:
+                break
+    return combinations
+
+
+def _variant(signal, params):
+    """(signal, spec, dashboard settings, exits) of one combination; raises ValueError for unknown parameters"""
+    spec, direction = backtest.signal_spec(signal)
+    exits = {name: params[name] for name in EXIT_PARAMS if name in params}
+    rest = {name: value for name, value in params.items() if name not in EXIT_PARAMS}
+    settings = {}
+    if signal[0] == "mcso":
+        window = signal[2] if len(signal) > 2 else backtest.MCSO_WINDOW
+        signal = ("mcso", rest.pop("level", signal[1]), rest.pop("window", window))
+    elif signal[0] == "dashboard":
+        settings = {name: rest.pop(name) for name in list(rest) if name in DASHBOARD_SETTINGS}
+    known = spec.spec.get("params", {}) if spec is not None else {}
+    unknown = sorted(set(rest) - set(known))
+    if unknown:
+        raise ValueError(f"Unknown parameters for {signal!r}: {', '.join(unknown)}")
+    if rest:
+        spec = type(spec)(dict(spec.spec, params=dict(known, **rest)), spec.name)
+    if settings:
+        merged = dict(DASHBOARD_SETTINGS, **settings)
+        settings = {
+            "rsi_window": merged["rsi_window"],
+            "rsi_signal": merged["rsi_signal"],
+            "macd": (merged["macd_fast"], merged["macd_slow"], merged["macd_signal"]),
+        }
+    return signal, spec, direction, settings, exits
+
+
+def evaluate(signal, frames, params, exits=None, cache=None):
+    """
+    Aggregate backtest stats (see backtest.trade_stats) of a signal under
+    one combination of parameters, over clean frames (signals.clean_frames).
+    exits are the backtest's defaults for hold/stop/target/cost; cache is a
+    dict shared by the combinations evaluated over the same frames.
+    """
+    cache = {} if cache is None else cache
+    signal, spec, direction, settings, overrides = _variant(signal, params)
+    history = backtest.signal_history(signal, spec, frames, cache=cache.setdefault("setups", {}), **settings)
+    entries = backtest.entry_matrix(signal, history, frames)
+    if "bars" not in cache:
+        cache["bars"] = panel.Panel(frames, columns=("Open", "High", "Low", "Close"))
+    trades = backtest.simulate(cache["bars"], entries, direction, **dict(exits or {}, **overrides))
+    _, summary = backtest.trade_stats(trades)
+    return {name: summary[name] for name in STATS}
+
+
+def _start_worker(frames):
+    global _FRAMES
+    _FRAMES = frames
+
+
+def _run_chunk(signal, combinations, exits):
+    # One indicator cache per chunk: its combinations share most indicators
+    cache = {}
+    return [dict(params, **evaluate(signal, _FRAMES, params, exits, cache)) for params in combinations]
+
+
+def sweep(signal, frames, combinations, exits=None, workers=None, chunk_size=None, progress=None):
+    """
+    Backtest signal (see backtest.entry_signals) over {symbol: daily bars}
+    for every combination of parameters, on a pool of worker processes.
+    exits are the defaults for the exits a combination does not set;
+    progress(done, total) is called as chunks finish.
+    Returns a DataFrame with a row per combination, best profit factor first.
+    """
+    frames = signals.clean_frames(frames)
+    names = list(combinations[0]) if combinations else []
+    for params in combinations:
+        if set(params) != set(names):
+            raise ValueError(f"Combinations must set the same parameters: {sorted(params)} vs {sorted(names)}")
+        _variant(signal, params)  # Bad combinations fail here rather than in a worker
+    # None (e.g. no target) sorts before the values of its parameter
+    ordered = sorted(combinations, key=lambda params: tuple((params[name] is not None, params[name]) for name in names))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ordered) or 1))
+    # A few chunks per worker balance the load; bigger chunks share more indicators
+    chunk_size = chunk_size or max(1, math.ceil(len(ordered) / (workers * 4)))
+    chunks = [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+    rows = []
+    if workers == 1:
+        _start_worker(frames)
+        for chunk in chunks:
+            rows += _run_chunk(signal, chunk, exits)
+            if progress:
+                progress(len(rows), len(ordered))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(frames,)) as pool:
+            futures = [pool.submit(_run_chunk, signal, chunk, exits) for chunk in chunks]
+            for future in as_completed(futures):
+                rows += future.result()
+                if progress:
+                    progress(len(rows), len(ordered))
+    return _compact(pd.DataFrame(rows, columns=names + list(STATS)))
+
+
+def _compact(table):
+    """Smallest dtypes that hold the results, best profit factor first"""
+    for column in table.columns:
+        if column == "trades":
+            table[column] = table[column].astype(np.int32)
+        elif pd.api.types.is_float_dtype(table[column]):
+            table[column] = table[column].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(table[column]):
+            table[column] = pd.to_numeric(table[column], downcast="integer")
+    return table.sort_values("profit factor", ascending=False, ignore_index=True)
@@ -0,0 +1,261 @@
+"""
+Cross-sectional indicator engine.
+
+Per-ticker indicator calls spend most of their time in pandas overhead on
+small frames. A Panel stacks the bars of many symbols for one timeframe into
+(bars x symbols) NumPy matrices, and the functions below compute each
+indicator for every symbol in one vectorized pass.
+
+Symbols trade on different calendars, so the panel is aligned by position
+rather than by date: each symbol's history is right-aligned (its latest bar
+is the last row) and shorter histories are padded with NaN at the top. Every
+recursion starts at each column's own first bar, so a column gives the same
+values as running the per-ticker function on that symbol alone.
+"""
+import numpy as np
+import pandas as pd
+
+
+class Panel:
+    """Right-aligned (bars x symbols) OHLCV matrices for one timeframe"""
+
+    def __init__(self, frames, columns=("Open", "High", "Low", "Close")):
+        frames = {symbol: data for symbol, data in frames.items() if data is not None and not data.empty}
+        self.symbols = list(frames)
+        self.positions = {symbol: j for j, symbol in enumerate(self.symbols)}
+        self.lengths = np.array([len(data) for data in frames.values()], dtype=int)
+        self.rows = int(self.lengths.max()) if len(self.lengths) else 0
+        # First row of each symbol's history
+        self.starts = self.rows - self.lengths
+        self.index = {symbol: data.index for symbol, data in frames.items()}
+        self.values = {column: np.full((self.rows, len(self.symbols)), np.nan) for column in columns}
+        for j, data in enumerate(frames.values()):
+            # Column access is far cheaper than reindexing many small frames
+            for column in columns:
+                if column in data:
+                    self.values[column][self.starts[j]:, j] = data[column].to_numpy(dtype=float)
+
+    def __getitem__(self, column):
+        return self.values[column]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def series(self, values, symbol):
+        """One symbol's column of an indicator matrix as a Series on its own dates"""
+        j = self.positions[symbol]
+        return pd.Series(values[self.starts[j]:, j], index=self.index[symbol])
+
+    def latest(self, values, offset=1):
+        """Row `offset` from the end for every symbol (1 = latest bar)"""
+        if self.rows < offset:
+            return np.full(len(self.symbols), np.nan)
+        return values[-offset]
+
+
+def ewm_mean(values, alpha, adjust=False, min_periods=0):
+    """
+    Exponentially weighted mean down every column, with the same recursion
+    (and NaN handling) as DataFrame.ewm(alpha=..., adjust=...).mean() but
+    stepping over rows, so each step is one vector operation across symbols.
+    """
+    rows, columns = values.shape
+    if columns <= rows:
+        # Narrow panels: pandas' per-column loop beats one Python step per row
+        return pd.DataFrame(values).ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean().to_numpy()
+    result = np.full((rows, columns), np.nan)
+    if rows == 0:
+        return result
+    min_periods = max(int(min_periods), 1)
+    new_weight = 1.0 if adjust else alpha
+    decay = 1 - alpha
+    observed = ~np.isnan(values)
+    counts = np.cumsum(observed, axis=0)
+    weighted = values[0].copy()
+    old_weight = np.ones(columns)
+    result[0] = weighted
+    blended = np.empty(columns)
+    for i in range(1, rows):
+        current = values[i]
+        started = ~np.isnan(weighted)
+        # Old weights keep decaying across gaps, as with ignore_na=False
+        np.multiply(old_weight, decay, out=old_weight, where=started)
+        update = started & observed[i]
+        with np.errstate(invalid="ignore"):
+            np.divide(old_weight * weighted + new_weight * current, old_weight + new_weight, out=blended)
+        np.copyto(weighted, blended, where=update & (weighted != current))
+        if adjust:
+            np.add(old_weight, new_weight, out=old_weight, where=update)
+        else:
+            old_weight[update] = 1.0
+        # A column's first observation starts its average
+        np.copyto(weighted, current, where=~started & observed[i])
+        result[i] = weighted
+    result[counts < min_periods] = np.nan
+    return result
+
+
+def first_valid_rows(values):
+    """Index of the first non-NaN row in each column (len(values) if there is none)"""
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+
+
+def _sma_seeded(values, length, starts):
+    """
+    Blank each column before row start + length - 1 and put the mean of its
+    first `length` values there, so a following EMA starts from an SMA seed.
+    Columns shorter than `length` come back all NaN.
+    """
+    rows, columns = values.shape
+    seeded = np.full_like(values, np.nan)
+    seed_rows = starts + length - 1
+    ok = seed_rows < rows
+    if not ok.any():
+        return seeded
+    cols = np.nonzero(ok)[0]
+    # NaN-skipping window means from cumulative sums, like Series.mean()
+    valid = ~np.isnan(values)
+    sums = np.vstack([np.zeros(columns), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(columns), np.cumsum(valid, axis=0)])
+    top, bottom = starts[cols], seed_rows[cols] + 1
+    with np.errstate(invalid="ignore"):
+        seeds = (sums[bottom, cols] - sums[top, cols]) / (counts[bottom, cols] - counts[top, cols])
+    row_numbers = np.arange(rows)[:, None]
+    keep = row_numbers > seed_rows[None, :]
+    seeded[keep] = values[keep]
+    seeded[seed_rows[cols], cols] = seeds
+    return seeded
+
+
+def ema(values, span, sma_seed=False, starts=None):
+    """
+    EMA of every column with adjust=False.
+    With sma_seed the recursion starts from the SMA of the first `span` values
+    (pandas_ta's convention); starts gives each column's first row (default:
+    its first non-NaN value).
+    """
+    if sma_seed:
+        starts = first_valid_rows(values) if starts is None else starts
+        values = _sma_seeded(values, span, starts)
+    return ewm_mean(values, 2 / (span + 1))
+
+
+def sma(values, window):
+    """Rolling mean of every column; NaN unless all `window` values in the window are valid"""
+    rows, columns = values.shape
+    result = np.full((rows, columns), np.nan)
+    if rows < window:
+        return result
+    valid = ~np.isnan(values)
+    sums = np.vstack([np.zeros(columns), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(columns), np.cumsum(valid, axis=0)])
+    window_sums = sums[window:] - sums[:-window]
+    full = (counts[window:] - counts[:-window]) == window
+    result[window - 1:] = np.where(full, window_sums / window, np.nan)
+    return result
+
+
+def price_changes(close):
+    """Bar-to-bar changes, split into gains and losses (missing changes count as no move)"""
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    return delta, gain, loss
+
+
+def _wilder_average(values, window, starts):
+    """Panel version of indicators.wilder_average, seeded per column at start + window"""
+    rows, columns = values.shape
+    seed_rows = starts + window
+    ok = seed_rows < rows
+    seeded = np.full_like(values, np.nan)
+    if not ok.any():
+        return seeded
+    cols = np.nonzero(ok)[0]
+    sums = np.vstack([np.zeros(columns), np.cumsum(values, axis=0)])
+    # Mean of rows start + 1 .. start + window
+    seeds = (sums[seed_rows[cols] + 1, cols] - sums[starts[cols] + 1, cols]) / window
+    keep = np.arange(rows)[:, None] > seed_rows[None, :]
+    seeded[keep] = values[keep]
+    seeded[seed_rows[cols], cols] = seeds
+    return ewm_mean(seeded, 1 / window)
+
+
+def wilder_averages(close, window=14, starts=None):
+    """Wilder-smoothed average gain and loss of every column (the RSI's running state)"""
+    starts = first_valid_rows(close) if starts is None else starts
+    _, gain, loss = price_changes(close)
+    return _wilder_average(gain, window, starts), _wilder_average(loss, window, starts)
+
+
+def wilder_rsi(close, window=14, starts=None):
+    """
+    Dashboard RSI (see indicators.wilder_rsi) for every column.
+    Columns with fewer than 2 * window bars are all NaN, as the dashboard shows them.
+    """
+    starts = first_valid_rows(close) if starts is None else starts
+    avg_gain, avg_loss = wilder_averages(close, window, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[:, (len(close) - starts) < window * 2] = np.nan
+    return rsi
+
+
+def rma_rsi(close, length=14):
+    """
+    RSI with pandas_ta's smoothing: an adjusted EMA with alpha = 1 / length
+    and min_periods = length over the raw gains and losses.
+    """
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    # Keep the undefined first change as NaN so it is skipped, as in pandas_ta
+    gain = np.where(delta < 0, 0.0, delta)
+    loss = np.where(delta > 0, 0.0, -delta)
+    avg_gain = ewm_mean(gain, 1 / length, adjust=True, min_periods=length)
+    avg_loss = ewm_mean(loss, 1 / length, adjust=True, min_periods=length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * avg_gain / (avg_gain + avg_loss)
+
+
+def macd(close, fast=12, slow=26, signal=9, sma_seed=False, starts=None):
+    """
+    MACD line, signal line and histogram for every column.
+    sma_seed selects pandas_ta's SMA-seeded EMAs (the signal line is seeded
+    from the first valid MACD value); otherwise plain adjust=False EMAs.
+    """
+    if sma_seed:
+        starts = first_valid_rows(close) if starts is None else starts
+        line = ema(close, fast, sma_seed=True, starts=starts) - ema(close, slow, sma_seed=True, starts=starts)
+        signal_line = ema(line, signal, sma_seed=True)
+    else:
+        line = ema(close, fast) - ema(close, slow)
+        signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def window_position(high, low, close, window=20):
+    """
+    Where the latest close sits in the high/low range of the last `window`
+    bars, in percent (the MCSO). Returns (position, close, window low,
+    window high) for every column; flat ranges give 0.
+    """
+    recent_high = np.max(high[-window:], axis=0) if len(high) >= window else np.full(high.shape[1], np.nan)
+    recent_low = np.min(low[-window:], axis=0) if len(low) >= window else np.full(low.shape[1], np.nan)
+    last_close = close[-1] if len(close) else np.full(close.shape[1], np.nan)
+    spread = recent_high - recent_low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position = np.where(np.abs(spread) < 1e-6, 0.0, (last_close - recent_low) / spread * 100)
+    return position, last_close, recent_low, recent_high
+
+
+def window_positions(high, low, close, window=20):
+    """window_position on every bar (NaN until a column has `window` bars)"""
+    position = np.full(close.shape, np.nan)
+    if len(close) < window:
+        return position
+    recent_high = np.lib.stride_tricks.sliding_window_view(high, window, axis=0).max(axis=-1)
+    recent_low = np.lib.stride_tricks.sliding_window_view(low, window, axis=0).min(axis=-1)
+    spread = recent_high - recent_low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position[window - 1:] = np.where(np.abs(spread) < 1e-6, 0.0, (close[window - 1:] - recent_low) / spread * 100)
+    return position
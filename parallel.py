@@ -0,0 +1,155 @@
+"""
+Optional process-pool backend for the strategy scanner's indicator stage.
+
+Panel indicators of many symbols are NumPy work, but they still run on one
+core under the GIL of the Streamlit script thread. With this backend the
+symbols whose snapshots are stale are split into chunks and computed on a
+pool of worker processes:
+
+- the bars go to the workers through one shared memory block per call
+  (the columns Strategy.indicators reads, every symbol's rows one after the
+  other), so no DataFrame is pickled; a task only names its symbols' rows,
+- each worker builds its chunk's frames as views on the block and runs
+  Strategy.indicators on them,
+- workers return the snapshots: a few bars of the indicator columns per
+  symbol, a few hundred bytes each.
+
+The pool uses spawned processes (forking a process with Streamlit's
+threads is not safe), started on first use and kept for later scans.
+SCAN_PROCESSES (STOCKBOT_SCAN_PROCESSES) turns it on; calls with fewer than
+MIN_PARALLEL_SYMBOLS symbols stay in-process, where the pool's overhead
+would dominate.
+"""
+import atexit
+import json
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import strategy_rules
+
+# Worker processes for the indicator stage; 0 or 1 computes in-process
+SCAN_PROCESSES = int(os.environ.get("STOCKBOT_SCAN_PROCESSES", 0))
+# Below this many symbols a call is computed in-process
+MIN_PARALLEL_SYMBOLS = 200
+# Chunks per worker: a few balance the load without much per-task overhead
+CHUNKS_PER_WORKER = 2
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+# Strategies compiled in this worker process, by (name, spec as JSON)
+_STRATEGIES = {}
+
+
+def _pool(workers):
+    """The shared pool, restarted if a different size is asked for"""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown()
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def shutdown():
+    """Stop the worker processes (they are started again on the next parallel call)"""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+        _POOL, _POOL_WORKERS = None, 0
+
+
+atexit.register(shutdown)
+
+
+def pack(frames, columns):
+    """
+    Copy the columns of {symbol: bars} into a new shared memory block.
+    Returns (block, layout, spans): layout is what a worker needs to read
+    the block (its name, row count and columns) and spans each symbol's
+    (first row, end row). The caller closes and unlinks the block.
+    """
+    lengths = [len(data) for data in frames.values()]
+    rows = sum(lengths)
+    # Float columns first, then the int64 dates
+    block = shared_memory.SharedMemory(create=True, size=max(1, rows * 8 * (len(columns) + 1)))
+    values = np.ndarray((len(columns), rows), dtype=np.float64, buffer=block.buf)
+    dates = np.ndarray(rows, dtype=np.int64, buffer=block.buf, offset=rows * 8 * len(columns))
+    ends = np.cumsum(lengths)
+    spans = {}
+    for (symbol, data), end, length in zip(frames.items(), ends, lengths):
+        start = end - length
+        for k, column in enumerate(columns):
+            values[k, start:end] = data[column].to_numpy(dtype=float)
+        dates[start:end] = data.index.values.astype("datetime64[ns]").view(np.int64)
+        spans[symbol] = (int(start), int(end))
+    del values, dates
+    return block, (block.name, rows, tuple(columns)), spans
+
+
+def _strategy(name, spec):
+    key = (name, spec)
+    if key not in _STRATEGIES:
+        _STRATEGIES[key] = strategy_rules.Strategy(json.loads(spec), name)
+    return _STRATEGIES[key]
+
+
+def _indicators_chunk(layout, spans, name, spec, timeframe):
+    """Worker: Strategy.indicators of the symbols at spans ({symbol: rows}) of a shared block"""
+    block_name, rows, columns = layout
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        values = np.ndarray((len(columns), rows), dtype=np.float64, buffer=block.buf)
+        dates = np.ndarray(rows, dtype=np.int64, buffer=block.buf, offset=rows * 8 * len(columns))
+        frames = {}
+        for symbol, (start, end) in spans.items():
+            frames[symbol] = pd.DataFrame({column: values[k, start:end] for k, column in enumerate(columns)},
+                                          index=pd.DatetimeIndex(dates[start:end].view("datetime64[ns]")))
+        # Snapshots are new arrays, so nothing returned points into the block
+        snapshots = _strategy(name, spec).indicators(frames, timeframe)
+        del values, dates, frames
+        return snapshots
+    finally:
+        block.close()
+
+
+def indicators(strategy, frames, timeframe, workers=None):
+    """
+    strategy.indicators(frames, timeframe), computed on `workers` processes
+    (SCAN_PROCESSES by default) when there are enough symbols
+    """
+    workers = SCAN_PROCESSES if workers is None else workers
+    frames = {symbol: data for symbol, data in frames.items()
+              if data is not None and len(data) >= strategy.min_bars}
+    if workers <= 1 or len(frames) < MIN_PARALLEL_SYMBOLS or not strategy.columns.get(timeframe):
+        return strategy.indicators(frames, timeframe)
+
+    block, layout, spans = pack(frames, strategy.prices(timeframe))
+    try:
+        symbols = list(frames)
+        size = math.ceil(len(symbols) / (workers * CHUNKS_PER_WORKER))
+        spec = json.dumps(strategy.spec, sort_keys=True)
+        pool = _pool(workers)
+        futures = [
+            pool.submit(_indicators_chunk, layout, {symbol: spans[symbol] for symbol in symbols[i:i + size]},
+                        strategy.name, spec, timeframe)
+            for i in range(0, len(symbols), size)
+        ]
+        snapshots = {}
+        for future in futures:
+            snapshots.update(future.result())
+        return snapshots
+    finally:
+        block.close()
+        block.unlink()
@@ -0,0 +1,175 @@
+"""
+Market data providers.
+
+Every fetch in the apps goes through a provider, so a scan can run against
+Yahoo Finance or against bars recorded on disk. The replay provider makes scan
+throughput measurable on an offline box by serving recorded OHLCV with a
+configurable artificial latency.
+
+Pick the provider with STOCKBOT_PROVIDER ("yfinance" or "replay"); replay
+reads STOCKBOT_REPLAY_DIR and STOCKBOT_REPLAY_LATENCY (seconds per request).
+"""
+import os
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+import bar_store
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def split_grouped_download(data, tickers):
+    """
+    Split a grouped yf.download frame into one OHLCV DataFrame per ticker.
+    Rows where a ticker has no data (e.g. other exchanges' trading days) are dropped.
+    """
+    bars = {}
+    if data is None or data.empty:
+        return {ticker: pd.DataFrame() for ticker in tickers}
+
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker not in available:
+                bars[ticker] = pd.DataFrame()
+                continue
+            frame = data[ticker]
+            columns = [col for col in OHLCV_COLUMNS if col in frame.columns]
+            bars[ticker] = frame[columns].dropna(how="all")
+    else:
+        # A single-ticker download comes back with flat columns
+        columns = [col for col in OHLCV_COLUMNS if col in data.columns]
+        bars[tickers[0]] = data[columns].dropna(how="all")
+
+    return bars
+
+
+class MarketDataProvider:
+    """Interface every market data source implements"""
+
+    name = "base"
+    # Whether requests should draw from the shared network rate limiter
+    rate_limited = False
+
+    def history(self, symbol, interval="1d", period=None, start=None):
+        """Return one symbol's bars, either for a period or from a start date"""
+        raise NotImplementedError
+
+    def download(self, symbols, interval="1d", period=None, start=None):
+        """Return {symbol: DataFrame} for several symbols; providers may group the request"""
+        return {symbol: self.history(symbol, interval, period=period, start=start) for symbol in symbols}
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance"""
+
+    name = "yfinance"
+    rate_limited = True
+
+    def history(self, symbol, interval="1d", period=None, start=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def download(self, symbols, interval="1d", period=None, start=None):
+        data = yf.download(
+            list(symbols),
+            period=None if start is not None else period,
+            start=start,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,  # Match Ticker.history() defaults
+            actions=False,
+            threads=True,
+            progress=False,
+        )
+        return split_grouped_download(data, list(symbols))
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serve recorded bars from disk.
+
+    Recordings use the bar store layout (<root>/<interval>/<symbol>.parquet),
+    so a warm bar store folder can be replayed as-is. Every request sleeps for
+    `latency` seconds (plus `latency_per_symbol` for grouped downloads) to
+    mimic a network round trip.
+    """
+
+    name = "replay"
+
+    def __init__(self, root, latency=0.0, latency_per_symbol=0.0):
+        self.root = root
+        self.latency = float(latency)
+        self.latency_per_symbol = float(latency_per_symbol)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def _load(self, symbol, interval):
+        data, _ = bar_store.read_bars(symbol, interval, root=self.root)
+        return data
+
+    def _sleep(self, symbols=1):
+        with self.lock:
+            self.requests += 1
+        delay = self.latency + self.latency_per_symbol * symbols
+        if delay > 0:
+            time.sleep(delay)
+
+    def _slice(self, data, period, start):
+        if data is None or data.empty:
+            return pd.DataFrame()
+        if start is not None:
+            return data[data.index >= pd.Timestamp(start)]
+        return bar_store.slice_period(data, period)
+
+    def history(self, symbol, interval="1d", period=None, start=None):
+        self._sleep()
+        return self._slice(self._load(symbol, interval), period, start)
+
+    def download(self, symbols, interval="1d", period=None, start=None):
+        symbols = list(symbols)
+        self._sleep(len(symbols))
+        return {symbol: self._slice(self._load(symbol, interval), period, start) for symbol in symbols}
+
+
+def record(provider, symbols, root, interval="1d", period="10y"):
+    """Save bars from any provider into a folder the ReplayProvider can serve"""
+    for symbol in symbols:
+        data = bar_store.normalize_bars(provider.history(symbol, interval, period=period))
+        if data is not None and not data.empty:
+            bar_store.write_bars(symbol, interval, data, {"covered_from": None, "fetched_at": time.time()}, root=root)
+
+
+def provider_from_env():
+    """Build the provider selected by the STOCKBOT_PROVIDER environment variable"""
+    kind = os.environ.get("STOCKBOT_PROVIDER", "yfinance").lower()
+    if kind == "replay":
+        return ReplayProvider(
+            os.environ.get("STOCKBOT_REPLAY_DIR", bar_store.STORE_DIR),
+            latency=float(os.environ.get("STOCKBOT_REPLAY_LATENCY", 0.0)),
+        )
+    if kind == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Unknown market data provider: {kind}")
+
+
+_provider = None
+
+
+def get_provider():
+    """Return the process-wide provider, creating it from the environment on first use"""
+    global _provider
+    if _provider is None:
+        _provider = provider_from_env()
+    return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (e.g. for benchmarks or offline runs)"""
+    global _provider
+    _provider = provider
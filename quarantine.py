@@ -0,0 +1,130 @@
+"""
+Negative cache for symbols that keep failing.
+
+Delisted or renamed tickers (e.g. AVV.L, AVST.L) return no bars on every
+scan. A symbol whose fetch fails is quarantined for a backoff interval that
+doubles with each consecutive failure, and fetches for it are skipped until
+the interval has passed. One successful fetch releases it.
+
+The quarantine list is saved next to the bar store so it survives restarts
+and is shared by every app using the same store.
+"""
+import json
+import os
+import threading
+import time
+
+import bar_store
+
+# First quarantine lasts BASE_BACKOFF seconds, doubling up to MAX_BACKOFF
+BASE_BACKOFF = 15 * 60
+MAX_BACKOFF = 7 * 24 * 3600
+
+
+class Quarantine:
+    """Thread-safe, file-backed record of failing (symbol, interval) pairs"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.loaded_from = None  # (path, mtime) of the file last read
+
+    def _path(self):
+        # Resolved on use so a relocated bar store takes its quarantine list along
+        return self.path or os.path.join(bar_store.STORE_DIR, "quarantine.json")
+
+    def _load(self, force=False):
+        """Read the file if it changed since the last read (always with force)"""
+        path = self._path()
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if self.loaded_from == (path, mtime) and not force:
+            return
+        entries = {}
+        if mtime is not None:
+            try:
+                with open(path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+        self.entries = entries
+        self.loaded_from = (path, mtime)
+
+    def _save(self):
+        path = self._path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, path)
+        self.loaded_from = (path, os.path.getmtime(path))
+
+    @staticmethod
+    def _key(symbol, interval):
+        return f"{interval}|{symbol}"
+
+    def blocked(self, symbol, interval="1d"):
+        """Whether fetches for a symbol should be skipped right now"""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(self._key(symbol, interval))
+            return entry is not None and time.time() < entry["retry_at"]
+
+    def failed(self, symbol, interval, error):
+        """Record a failed fetch and push the next retry further out"""
+        with self.lock:
+            # Re-read so changes saved by other processes since the last read are kept
+            self._load(force=True)
+            key = self._key(symbol, interval)
+            entry = self.entries.get(key, {"failures": 0})
+            failures = entry["failures"] + 1
+            backoff = min(BASE_BACKOFF * 2 ** (failures - 1), MAX_BACKOFF)
+            self.entries[key] = {
+                "symbol": symbol,
+                "interval": interval,
+                "failures": failures,
+                "error": str(error)[:200],
+                "failed_at": time.time(),
+                "retry_at": time.time() + backoff,
+            }
+            self._save()
+
+    def succeeded(self, symbol, interval):
+        """Release a symbol after a successful fetch"""
+        key = self._key(symbol, interval)
+        with self.lock:
+            self._load()
+            if key not in self.entries:
+                return  # Nothing to release, nothing to write
+            self._load(force=True)
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def clear(self):
+        """Release every symbol, e.g. to force a retry after fixing the universe"""
+        with self.lock:
+            self._load(force=True)
+            if self.entries:
+                self.entries = {}
+                self._save()
+
+    def report(self):
+        """One row per quarantined symbol, longest-failing first"""
+        with self.lock:
+            self._load()
+            now = time.time()
+            rows = [
+                {
+                    "symbol": entry["symbol"],
+                    "interval": entry["interval"],
+                    "failures": entry["failures"],
+                    "last error": entry["error"],
+                    "retry in (h)": round(max(0.0, entry["retry_at"] - now) / 3600, 2),
+                }
+                for entry in self.entries.values()
+            ]
+        return sorted(rows, key=lambda row: (-row["failures"], row["symbol"]))
+
+
+# Shared by every app in the process
+QUARANTINE = Quarantine()
@@ -0,0 +1,154 @@
+"""
+Score leaderboards for the scanners' result tables and top performer cards.
+
+A Leaderboard keeps one score per item in a NumPy array, with the groups an
+item belongs to (its category, "Bullish", ...) as boolean columns. Once a
+scan has collected its results, Leaderboard.build makes the arrays in one
+pass; ties keep the order of the keys (as a stable sort of the original list
+would). Top/bottom-K of a group is an argpartition, and full rankings are
+one stable argsort shared by every group until a score changes.
+
+Single items can still be added and updated in place (add/update), e.g. to
+correct one result, but filling a board one update at a time costs more than
+building it.
+
+Items without a score (NaN, e.g. a failed scan) are left out of rankings.
+A Leaderboard is not thread-safe: update it from the thread that collects
+the results.
+"""
+import numpy as np
+
+INITIAL_CAPACITY = 256
+
+
+def order(scores, descending=True):
+    """Stable argsort of scores, NaN last, e.g. to sort a table by a float column"""
+    scores = np.asarray(scores, dtype=float)
+    keys = np.where(np.isnan(scores), np.inf, -scores if descending else scores)
+    return np.argsort(keys, kind="stable")
+
+
+class Leaderboard:
+    """Scores of items by key, with top/bottom-K and rankings per group"""
+
+    def __init__(self, keys=(), capacity=INITIAL_CAPACITY):
+        self._scores = np.full(max(capacity, len(keys), 1), np.nan)
+        self._groups = {}
+        self._slots = {}
+        self._keys = []
+        self._items = []
+        self._memberships = []  # groups of each slot
+        self._order = None
+        for key in keys:
+            self.add(key)
+
+    @classmethod
+    def build(cls, keys, scores, items=None, groups=None):
+        """
+        A leaderboard of every key at once, from their scores (None or NaN for
+        no score), items (the keys themselves by default) and groups (the
+        group names of each key), all in the order of keys
+        """
+        keys = list(keys)
+        board = cls()
+        board._slots = {key: slot for slot, key in enumerate(keys)}
+        if len(board._slots) != len(keys):
+            raise ValueError("Leaderboard keys must be unique")
+        board._keys = keys
+        board._items = list(keys if items is None else items)
+        board._memberships = [tuple(names) for names in groups] if groups is not None else [()] * len(keys)
+        if len(board._items) != len(keys) or len(board._memberships) != len(keys):
+            raise ValueError("Leaderboard keys, items and groups must have the same length")
+        board._scores = np.full(max(len(keys), 1), np.nan)
+        board._scores[:len(keys)] = np.array(scores, dtype=float)  # None becomes NaN
+        members = {}
+        for slot, names in enumerate(board._memberships):
+            for name in names:
+                members.setdefault(name, []).append(slot)
+        for name, slots in members.items():
+            board._groups[name] = np.zeros(len(board._scores), dtype=bool)
+            board._groups[name][slots] = True
+        return board
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def add(self, key, item=None):
+        """Reserve a slot for key, without a score yet; ties rank in the order keys were added"""
+        if key in self._slots:
+            return self._slots[key]
+        slot = len(self._keys)
+        if slot == len(self._scores):
+            # Grow by doubling, so adding n items copies O(n) scores
+            self._scores = np.concatenate([self._scores, np.full(slot, np.nan)])
+            for name, members in self._groups.items():
+                self._groups[name] = np.concatenate([members, np.zeros(slot, dtype=bool)])
+        self._slots[key] = slot
+        self._keys.append(key)
+        self._items.append(key if item is None else item)
+        self._memberships.append(())
+        return slot
+
+    def update(self, key, score, item=None, groups=()):
+        """
+        Set key's score (NaN leaves it out of rankings), the item returned for
+        it and the groups it belongs to, replacing any earlier ones
+        """
+        slot = self.add(key)
+        self._scores[slot] = np.nan if score is None else score
+        if item is not None:
+            self._items[slot] = item
+        for name in self._memberships[slot]:
+            self._groups[name][slot] = False
+        for name in groups:
+            if name not in self._groups:
+                self._groups[name] = np.zeros(len(self._scores), dtype=bool)
+            self._groups[name][slot] = True
+        self._memberships[slot] = tuple(groups)
+        self._order = None
+
+    def score(self, key):
+        return float(self._scores[self._slots[key]])
+
+    def item(self, key):
+        return self._items[self._slots[key]]
+
+    def _members(self, group):
+        """Slots with a score, in group (all of them for None)"""
+        scored = ~np.isnan(self._scores[:len(self._keys)])
+        if group is None:
+            return scored
+        members = self._groups.get(group)
+        return scored & members[:len(self._keys)] if members is not None else np.zeros_like(scored)
+
+    def count(self, group=None):
+        """Items with a score in group"""
+        return int(np.count_nonzero(self._members(group)))
+
+    def _select(self, k, group, descending):
+        slots = np.flatnonzero(self._members(group))
+        keys = -self._scores[slots] if descending else self._scores[slots]
+        if 0 < k < len(slots):
+            # Everything tied with the k-th score stays a candidate, so ties keep their order
+            kth = np.partition(keys, k - 1)[k - 1]
+            slots, keys = slots[keys <= kth], keys[keys <= kth]
+        chosen = slots[np.lexsort((slots, keys))][:max(k, 0)]
+        return [self._items[slot] for slot in chosen]
+
+    def top(self, k, group=None):
+        """The k highest-scoring items of group (of all items for None), best first"""
+        return self._select(k, group, descending=True)
+
+    def bottom(self, k, group=None):
+        """The k lowest-scoring items of group (of all items for None), lowest first"""
+        return self._select(k, group, descending=False)
+
+    def ranked(self, group=None):
+        """Every scored item of group, highest score first"""
+        if self._order is None:
+            self._order = order(self._scores[:len(self._keys)])
+        members = self._members(group)
+        return [self._items[slot] for slot in self._order[members[self._order]]]
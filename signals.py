@@ -0,0 +1,427 @@
+"""
+Historical signals: a strategy's setup on every past daily bar, and the
+dashboard's labels and the MCSO the same way (for backtest.py).
+
+The scanner classifies the latest bar, with the week and month still
+forming: their last bar is resampled from the daily bars so far. Replaying
+that without look-ahead means using, on each day, the weekly (monthly) bars
+completed before its week plus the week-to-date bar as of that day.
+
+Recomputing the weekly history for every day would cost O(days x weeks).
+Instead the indicators are computed once over the completed weekly bars
+(one panel pass for all symbols), and each day's week-to-date value is a
+single step from the bar before it: one EMA or Wilder/RMA recursion step,
+or the last window of an SMA plus the partial value. The operations mirror
+panel.py, so a day's values equal what a scan with the history up to that
+day computes. Each day then becomes a column of (bars x days) windows, and
+the strategy's compiled rules classify every day of a batch of symbols in
+one pass (Strategy.evaluate).
+
+Indicators run over all the history given rather than the scanner's
+5y weekly / 1y daily windows, so long EMAs are better converged than in a
+live scan of the same day. The dashboard's weekly RSI is replayed the same
+way (dashboard_history).
+"""
+import numpy as np
+import pandas as pd
+
+import indicator_state
+import panel
+
+# (bars x days) cells evaluated per batch of symbols; bounds the window memory
+BATCH_CELLS = 200_000
+
+
+def setup_labels(strategy):
+    """Every setup the strategy can give, the categories of a signal table's Setup"""
+    labels = ["None"]
+    for side in strategy.setups:
+        labels += [f"{kind} {side['side']}" for kind in ("Watch", "Potential", "Caution")]
+    return labels + ["Conflicting"]
+
+
+def _previous(completed, week, first, back=1, columns=None):
+    """
+    completed[week - back] for every day (NaN before the symbol's first bar).
+    week is a (days x symbols) grid unless columns gives each day's symbol.
+    """
+    rows = week - back
+    if columns is None:
+        columns = np.broadcast_to(np.arange(completed.shape[1]), week.shape)
+    values = completed[np.clip(rows, 0, None), columns]
+    return np.where(rows >= first, values, np.nan)
+
+
+def _ewm_step(prior, old_weight, value, new_weight):
+    """One panel.ewm_mean step from `prior`; a missing value or an unchanged one keeps it"""
+    with np.errstate(invalid="ignore"):
+        blended = (old_weight * prior + new_weight * value) / (old_weight + new_weight)
+    return np.where(np.isnan(value) | (prior == value), prior, blended)
+
+
+def _ema(inputs, completed, partial, week, first, span):
+    """
+    SMA-seeded EMA (panel.ema with sma_seed) of the week-to-date bar: a step
+    from the previous bar's EMA, or the seed when this is the seed bar.
+    first is each column's first input row.
+    """
+    alpha = 2 / (span + 1)
+    seed_row = first + span - 1
+    prior = _previous(completed, week, 0)
+    stepped = _ewm_step(prior, 1 - alpha, partial, alpha)
+    # Seed: mean of the inputs from the first row up to and including this bar
+    valid = ~np.isnan(inputs)
+    sums = np.vstack([np.zeros(inputs.shape[1]), np.cumsum(np.where(valid, inputs, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(inputs.shape[1]), np.cumsum(valid, axis=0)])
+    columns = np.broadcast_to(np.arange(inputs.shape[1]), week.shape)
+    row, top = np.clip(week, 0, None), np.minimum(np.clip(first, 0, None), len(inputs))
+    here = ~np.isnan(partial)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seed = ((sums[row, columns] + np.where(here, partial, 0.0)) - sums[top, columns]) / (
+            (counts[row, columns] + here) - counts[top, columns])
+    return np.where(week > seed_row, stepped, np.where(week == seed_row, seed, np.nan))
+
+
+def _rma_weights(rows, length):
+    """Old weight of an adjusted EWM (alpha = 1 / length) after k observations, as ewm_mean accumulates it"""
+    weights = np.ones(rows + 1)
+    decay = 1 - 1 / length
+    for k in range(2, rows + 1):
+        weights[k] = weights[k - 1] * decay + 1.0
+    return weights
+
+
+def _rsi(close, partial, week, first, length):
+    """panel.rma_rsi of the week-to-date bar, one adjusted-EWM step on from the previous bar"""
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    averages = [
+        panel.ewm_mean(np.where(delta < 0, 0.0, delta), 1 / length, adjust=True),
+        panel.ewm_mean(np.where(delta > 0, 0.0, -delta), 1 / length, adjust=True),
+    ]
+    change = partial - _previous(close, week, first)
+    partial_moves = [np.where(change < 0, 0.0, change), np.where(change > 0, 0.0, -change)]
+    # Observations before this bar: every bar after the first
+    seen = np.clip(week - first - 1, 0, None)
+    old_weight = _rma_weights(int(seen.max(initial=0)) + 1, length)[seen] * (1 - 1 / length)
+    stepped = []
+    for average, move in zip(averages, partial_moves):
+        prior = _previous(average, week, first)
+        value = np.where(seen == 0, move, _ewm_step(prior, old_weight, move, 1.0))
+        # min_periods = length observations, counting this bar's
+        stepped.append(np.where(week - first >= length, value, np.nan))
+    gain, loss = stepped
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * gain / (gain + loss)
+
+
+def _sma(inputs, partial, week, window):
+    """panel.sma of the week-to-date bar: the previous window - 1 bars plus this one"""
+    valid = ~np.isnan(inputs)
+    sums = np.vstack([np.zeros(inputs.shape[1]), np.cumsum(np.where(valid, inputs, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(inputs.shape[1]), np.cumsum(valid, axis=0)])
+    columns = np.broadcast_to(np.arange(inputs.shape[1]), week.shape)
+    row, top = np.clip(week, 0, None), np.clip(week + 1 - window, 0, None)
+    here = ~np.isnan(partial)
+    total = (sums[row, columns] + np.where(here, partial, 0.0)) - sums[top, columns]
+    full = (week + 1 - window >= 0) & ((counts[row, columns] + here) - counts[top, columns] == window)
+    return np.where(full, total / window, np.nan)
+
+
+def _wilder_rsi(close, partial, week, first, window):
+    """Dashboard RSI (panel.wilder_rsi) of the week-to-date bar, one Wilder step on from the previous bar"""
+    _, gains, losses = panel.price_changes(close)
+    change = partial - _previous(close, week, first)
+    # A missing change counts as no move, as in panel.price_changes
+    partial_moves = (np.where(change > 0, change, 0.0), np.where(change < 0, -change, 0.0))
+    columns = np.broadcast_to(np.arange(close.shape[1]), week.shape)
+    seed_row = first + window
+    averages = []
+    for moves, average, partial_move in zip((gains, losses), panel.wilder_averages(close, window, first), partial_moves):
+        stepped = _ewm_step(_previous(average, week, first), 1 - 1 / window, partial_move, 1 / window)
+        # Seed: mean of the moves of the first `window` bars after the first, this one included
+        sums = np.vstack([np.zeros(close.shape[1]), np.cumsum(moves, axis=0)])
+        seed = (sums[np.clip(week, 0, None), columns] - sums[np.clip(first + 1, 0, len(close)), columns] + partial_move) / window
+        averages.append(np.where(week > seed_row, stepped, np.where(week == seed_row, seed, np.nan)))
+    gain, loss = averages
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + gain / loss))
+    # Like panel.wilder_rsi, blank until there are 2 * window bars
+    return np.where(week - first + 1 >= window * 2, rsi, np.nan)
+
+
+def _periods(index, interval):
+    """
+    Week or month number of every day, the bins of market_data.resample_bars
+    (weeks from Monday, calendar months) without resampling
+    """
+    days = index.values.astype("datetime64[D]")
+    if interval == "1wk":
+        # Day 0 is a Thursday, so weeks counted from day 4 start on Mondays
+        return (days.astype(np.int64) - 4) // 7
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+class _Timeframe:
+    """
+    A higher timeframe's completed bars for a batch of symbols and, for
+    every day, the index of its bar and the values of the bar so far
+    """
+
+    def __init__(self, frames, daily, interval):
+        bars = {}
+        self.week = np.full((daily.rows, len(daily)), -1)
+        self.partial = {column: np.full((daily.rows, len(daily)), np.nan) for column in ("Open", "High", "Low", "Close")}
+        groups = {}
+        for symbol, data in frames.items():
+            period = _periods(data.index, interval)
+            first_days = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+            last_days = np.r_[first_days[1:], len(data)] - 1
+            groups[symbol] = np.repeat(np.arange(len(first_days)), last_days - first_days + 1)
+            high, low = data["High"].to_numpy(dtype=float), data["Low"].to_numpy(dtype=float)
+            bars[symbol] = pd.DataFrame({
+                "Open": data["Open"].to_numpy(dtype=float)[first_days],
+                "High": np.fmax.reduceat(high, first_days),
+                "Low": np.fmin.reduceat(low, first_days),
+                "Close": data["Close"].to_numpy(dtype=float)[last_days],
+            }, index=data.index[first_days])
+        self.panel = panel.Panel(bars, columns=("Open", "High", "Low", "Close"))
+        self.first = self.panel.starts
+        for j, symbol in enumerate(daily.symbols):
+            data, group, top = frames[symbol], groups[symbol], daily.starts[j]
+            # Row of each day's bar in the panel (-1 on padding rows of the daily panel)
+            self.week[top:, j] = self.first[j] + group
+            self.partial["Open"][top:, j] = bars[symbol]["Open"].to_numpy()[group]
+            self.partial["High"][top:, j] = data["High"].groupby(group).cummax().to_numpy(dtype=float)
+            self.partial["Low"][top:, j] = data["Low"].groupby(group).cummin().to_numpy(dtype=float)
+            self.partial["Close"][top:, j] = data["Close"].to_numpy(dtype=float)
+        self.completed = {}
+        self.today = {}
+
+    def values(self, strategy, node):
+        """node's value on the bar so far of every day, after its completed values"""
+        if node.key in self.today:
+            return self.today[node.key]
+        bars, first, week = self.panel, self.first, self.week
+        completed = strategy._compute(node, bars, self.completed)
+        close, partial_close = bars["Close"], self.partial["Close"]
+        args = node.args
+        if node.name in ("open", "high", "low", "close"):
+            value = self.partial[node.name.capitalize()]
+        elif node.name == "ema":
+            value = _ema(close, completed, partial_close, week, first, args[0])
+        elif node.name == "rsi":
+            value = _rsi(close, partial_close, week, first, args[0])
+        elif node.name == "sma":
+            source = args[0]
+            value = _sma(self.completed[source.key], self.values(strategy, source), week, args[1])
+        else:
+            fast, slow, signal = args
+            line = (_ema(close, panel.ema(close, fast, sma_seed=True, starts=first), partial_close, week, first, fast)
+                    - _ema(close, panel.ema(close, slow, sma_seed=True, starts=first), partial_close, week, first, slow))
+            parts = dict(zip(("macd", "macd_signal", "macd_hist"),
+                             panel.macd(close, fast, slow, signal, sma_seed=True, starts=first)))
+            signal_line = _ema(parts["macd"], parts["macd_signal"], line, week,
+                               panel.first_valid_rows(parts["macd"]), signal)
+            # One step gives all three parts
+            for part, part_value in zip(parts, (line, signal_line, line - signal_line)):
+                self.today[part + node.key[len(node.name):]] = part_value
+            return self.today[node.key]
+        self.today[node.key] = value
+        return value
+
+    def window(self, completed, today, rows, keep):
+        """(keep x days) windows for the days at `rows`: the completed bars before each day's, then its own"""
+        columns = rows[1]
+        window = np.empty((keep, len(columns)))
+        window[:-1] = _window(completed, self.week[rows] - 1, self.first[columns], columns, keep - 1)
+        window[-1] = today[rows]
+        return window
+
+
+def _window(values, last, first, columns, keep):
+    """(keep x days) windows of values[.., column] ending at row last (NaN above each column's first row)"""
+    rows = last[None, :] - np.arange(keep - 1, -1, -1)[:, None]
+    window = values[np.clip(rows, 0, None), columns[None, :]]
+    window[rows < first[None, :]] = np.nan
+    return window
+
+
+def _daily_window(values, rows, first, keep):
+    """(keep x days) windows of daily values ending at each day"""
+    days, columns = rows
+    return _window(values, days, first[columns], columns, keep)
+
+
+def clean_frames(frames):
+    """Daily frames without days missing a close (they add nothing to resampled bars) or empty frames"""
+    frames = {
+        symbol: data.dropna(subset=["Close"]) if data["Close"].isna().any() else data
+        for symbol, data in frames.items() if data is not None and not data.empty
+    }
+    return {symbol: data for symbol, data in frames.items() if not data.empty}
+
+
+def historical_setups(strategy, frames, start=None, cache=None):
+    """
+    The strategy's setup and score on every daily bar of every symbol, as
+    the scanner would have classified it that day. frames is {symbol: daily
+    bars} (e.g. the daily histories a strategy scan downloads); weekly and
+    monthly bars are resampled from them. Days before start, or with too
+    little history on a required timeframe, are left out.
+    cache is an optional dict kept between calls over the same frames (e.g.
+    by a parameter sweep), so bars and indicators another strategy already
+    computed are reused.
+    Returns {symbol: DataFrame of Setup (categorical) and Score}.
+    """
+    signals = {}
+    for daily, rows, (table,) in _batches([strategy], frames, start, cache):
+        setups = pd.Categorical(table["Setup"], categories=setup_labels(strategy))
+        scores = np.asarray(table["Score"], dtype=np.int8)
+        for j, symbol in enumerate(daily.symbols):
+            mine = rows[1] == j
+            dates = daily.index[symbol][rows[0][mine] - daily.starts[j]]
+            signals[symbol] = pd.DataFrame({"Setup": setups[mine], "Score": scores[mine]}, index=dates)
+    return signals
+
+
+def historical_variants(strategies, frames, start=None):
+    """
+    Setups of several variants of one strategy that differ only in
+    thresholds (equal signature() on every timeframe), e.g. to re-fit them:
+    the indicator windows are built once and each variant only evaluates
+    its rules on them. Returns {symbol: DataFrame with a column per variant
+    of codes into setup_labels()} over the days historical_setups keeps.
+    """
+    base = strategies[0]
+    for strategy in strategies[1:]:
+        if strategy.timeframes != base.timeframes or any(strategy.signature(tf) != base.signature(tf) for tf in base.timeframes):
+            raise ValueError(f"{strategy.name} reads other indicators than {base.name}; only thresholds can vary")
+    codes = {label: code for code, label in enumerate(setup_labels(base))}
+    signals = {}
+    for daily, rows, tables in _batches(strategies, frames, start, None):
+        setups = [pd.Series(table["Setup"]).map(codes).to_numpy(dtype=np.int8) for table in tables]
+        for j, symbol in enumerate(daily.symbols):
+            mine = rows[1] == j
+            dates = daily.index[symbol][rows[0][mine] - daily.starts[j]]
+            signals[symbol] = pd.DataFrame({k: values[mine] for k, values in enumerate(setups)}, index=dates)
+    return signals
+
+
+def _batches(strategies, frames, start, cache):
+    """(daily panel, days kept, evaluate() table per strategy) for each batch of symbols"""
+    strategy = strategies[0]
+    frames = clean_frames(frames)
+    longest = max([len(data) for data in frames.values()] + [1])
+    per_batch = max(1, BATCH_CELLS // (longest * max(strategy.keep.values(), default=1)))
+    symbols = list(frames)
+    for i in range(0, len(symbols), per_batch):
+        batch = symbols[i:i + per_batch]
+        batch_cache = cache.setdefault(tuple(batch), {}) if cache is not None else {}
+        daily, rows, envs, present = _batch_envs(strategy, {symbol: frames[symbol] for symbol in batch}, start, batch_cache)
+        yield daily, rows, [variant.evaluate(envs, present, describe=False) for variant in strategies]
+
+
+def _batch_envs(strategy, frames, start, cache):
+    """The daily panel of a batch, the days kept and the strategy's windows and present flags on them"""
+    if "daily" not in cache:
+        cache["daily"] = panel.Panel(frames, columns=("Open", "High", "Low", "Close"))
+    daily = cache["daily"]
+    higher = {}
+    for timeframe, interval in (("weekly", "1wk"), ("monthly", "1mo")):
+        if timeframe in strategy.timeframes:
+            if timeframe not in cache:
+                cache[timeframe] = _Timeframe(frames, daily, interval)
+            higher[timeframe] = cache[timeframe]
+    # Bars each day sees on every timeframe, to apply the scanner's min_bars
+    seen = {"daily": np.arange(daily.rows)[:, None] - daily.starts[None, :] + 1}
+    for timeframe, bars in higher.items():
+        seen[timeframe] = np.where(bars.week >= 0, bars.week - bars.first[None, :] + 1, 0)
+    usable = np.ones((daily.rows, len(daily)), dtype=bool)
+    for timeframe in strategy.required:
+        usable &= seen[timeframe] >= strategy.min_bars
+    if start is not None:
+        for j, symbol in enumerate(daily.symbols):
+            dates = daily.index[symbol]
+            usable[daily.starts[j]:, j] &= dates >= pd.Timestamp(start)
+    rows = np.nonzero(usable)
+    computed = cache.setdefault("daily computed", {})
+
+    def window(timeframe, key, keep):
+        node = strategy.indicator_nodes[key]
+        if timeframe == "daily":
+            values = _daily_window(strategy._compute(node, daily, computed), rows, daily.starts, keep)
+        else:
+            bars = higher[timeframe]
+            values = bars.window(strategy._compute(node, bars.panel, bars.completed), bars.values(strategy, node), rows, keep)
+        # As in a scan, a timeframe with too few bars has no values at all
+        values[:, seen[timeframe][rows] < strategy.min_bars] = np.nan
+        return values
+
+    envs, present = {}, {}
+    for timeframe in strategy.timeframes:
+        keep = strategy.keep[timeframe]
+        envs[timeframe] = {key: window(timeframe, key, keep) for key in strategy.columns[timeframe]}
+        present[timeframe] = seen[timeframe][rows] >= strategy.min_bars
+    return daily, rows, envs, present
+
+
+def _by_symbol(daily, usable, columns):
+    """{symbol: DataFrame of the usable days} from (bars x symbols) matrices"""
+    tables = {}
+    for j, symbol in enumerate(daily.symbols):
+        rows = np.nonzero(usable[daily.starts[j]:, j])[0]
+        tables[symbol] = pd.DataFrame(
+            {name: values[daily.starts[j]:, j][rows] for name, values in columns.items()},
+            index=daily.index[symbol][rows],
+        )
+    return tables
+
+
+def dashboard_history(scorecard, frames, rsi_window=indicator_state.RSI_WINDOW, rsi_signal=indicator_state.RSI_SIGNAL,
+                      macd=(indicator_state.MACD_FAST, indicator_state.MACD_SLOW, indicator_state.MACD_SIGNAL)):
+    """
+    The dashboard's labels (e.g. the trend emoji) and bullish score on every
+    daily bar, from its inputs as of that day: daily Wilder RSI, its signal
+    line and MACD, and the weekly RSI with the week so far as its last bar.
+    Indicators run over the whole history rather than the dashboard's 3mo
+    daily / 1y weekly windows. Days the dashboard would reject for too
+    little data are left out. The indicator settings default to the
+    dashboard's (indicator_state).
+    Returns {symbol: DataFrame of the scorecard's labels and score}.
+    """
+    frames = clean_frames(frames)
+    daily = panel.Panel(frames, columns=("Open", "High", "Low", "Close"))
+    close, starts = daily["Close"], daily.starts
+    window = rsi_window
+    seen = np.arange(daily.rows)[:, None] - starts[None, :] + 1
+    # wilder_rsi blanks whole columns; a day only needs 2 * window bars up to it
+    avg_gain, avg_loss = panel.wilder_averages(close, window, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(seen >= window * 2, 100 - (100 / (1 + avg_gain / avg_loss)), np.nan)
+    fast, slow, signal = macd
+    line = panel.ema(close, fast) - panel.ema(close, slow)
+
+    weeks = _Timeframe(frames, daily, "1wk")
+    weekly_close = weeks.panel["Close"]
+    weekly_rsi = _wilder_rsi(weekly_close, weeks.partial["Close"], weeks.week, weeks.first, window)
+    weekly_seen = np.where(weeks.week >= 0, weeks.week - weeks.first[None, :] + 1, 0)
+
+    values = {
+        "daily_rsi": rsi,
+        "weekly_rsi": weekly_rsi,
+        "rsi_signal": panel.sma(rsi, rsi_signal),
+        "macd_line": line,
+        "signal_line": panel.ema(line, signal),
+    }
+    # The dashboard's minimum history (30 daily, 14 weekly bars) and valid RSIs
+    usable = (seen >= 30) & (weekly_seen >= 14) & ~np.isnan(rsi) & ~np.isnan(weekly_rsi)
+    scored = scorecard.evaluate({name: np.where(usable, value, np.nan) for name, value in values.items()})
+    return _by_symbol(daily, usable, {name: np.broadcast_to(value, usable.shape) for name, value in scored.items()})
+
+
+def mcso_history(frames, window=20):
+    """The MCSO (panel.window_position) on every daily bar. Returns {symbol: DataFrame of MCSO}"""
+    frames = clean_frames(frames)
+    daily = panel.Panel(frames, columns=("High", "Low", "Close"))
+    mcso = panel.window_positions(daily["High"], daily["Low"], daily["Close"], window)
+    return _by_symbol(daily, ~np.isnan(mcso), {"MCSO": mcso})
@@ -1,11 +1,18 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import time
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from market_data import fetch_batch_history, fetch_many, get_history, split_timeframe, DEFAULT_BATCH_SIZE, IN_FLIGHT
+from bar_cache import BAR_CACHE
+from quarantine import QUARANTINE
+from indicator_state import INDICATOR_STATES, PARAMS as SCAN_PARAMS
+from indicator_memo import INDICATOR_MEMO
+from ranking import Leaderboard
+import strategy_rules
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Set page config - favicon needs to be in the same folder as your script
 st.set_page_config(
@@ -451,6 +458,9 @@ SYMBOL_EXPLANATION = {
     "❌": "EMAs NOT aligned on Daily Timeframe"
 }
 
+# Emoji and bullish score rules, edited in strategies/dashboard.json
+DASHBOARD = strategy_rules.load_scorecard("dashboard")
+
 # Expanded FTSE 100 stocks
 FTSE_STOCKS = {
     # Original listings
@@ -1039,205 +1049,120 @@ TICKER_CATEGORIES = {
     "ASIAN STOCKS": ASIAN_STOCKS
 }
 
-@st.cache_data(ttl=600)
 def fetch_stock_data(ticker, period="6mo", interval="1d"):
     """
     Fetch stock data for a given ticker
     """
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period, interval=interval)
+        # Read through the shared bar cache and on-disk store; only new bars hit the network
+        hist = get_history(ticker, period=period, interval=interval, max_age=600, app="dashboard")
         return hist
     except Exception as e:
         st.error(f"Error fetching data for {ticker}: {e}")
         return pd.DataFrame()
 
-def calculate_rsi_signal(rsi_series, period=14):
-    """Calculate a signal line (SMA) for RSI"""
-    if len(rsi_series.dropna()) < period:
-        return pd.Series([np.nan] * len(rsi_series))
-    
-    signal_line = rsi_series.rolling(window=period).mean()
-    return signal_line
-
-def calculate_rsi(data, window=14):
+def fetch_batched_stock_data(tickers, period="6mo", interval="1d", batch_size=DEFAULT_BATCH_SIZE):
     """
-    Calculate RSI (Relative Strength Index) using the standard method
+    Fetch stock data for a whole universe of tickers in grouped requests.
+    Returns per-ticker DataFrames plus per-batch latency stats.
     """
-    if data.empty or len(data) < window*2:
-        return pd.Series([np.nan] * len(data))
-    
-    # Calculate price changes
-    delta = data['Close'].diff()
-    
-    # Separate gains and losses
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    
-    # First average gain and loss
-    first_avg_gain = gain.iloc[1:window+1].mean()
-    first_avg_loss = loss.iloc[1:window+1].mean()
-    
-    # Initialize lists with NaNs for the first window periods
-    avg_gains = [np.nan] * window
-    avg_losses = [np.nan] * window
-    
-    # Set the first average gain and loss
-    avg_gains.append(first_avg_gain)
-    avg_losses.append(first_avg_loss)
-    
-    # Calculate subsequent values
-    for i in range(window+1, len(delta)):
-        avg_gain = (avg_gains[-1] * (window-1) + gain.iloc[i]) / window
-        avg_loss = (avg_losses[-1] * (window-1) + loss.iloc[i]) / window
-        avg_gains.append(avg_gain)
-        avg_losses.append(avg_loss)
-    
-    # Convert to Series
-    avg_gain_series = pd.Series(avg_gains, index=data.index)
-    avg_loss_series = pd.Series(avg_losses, index=data.index)
-    
-    # Calculate RS and RSI
-    rs = avg_gain_series / avg_loss_series
-    rsi = 100 - (100 / (1 + rs))
-    
-    # Handle division by zero (when avg_loss is 0)
-    rsi = rsi.replace([np.inf, -np.inf], 100)
-    
-    return rsi
-
-def calculate_ema(data, spans=[7, 11, 21]):
-    """
-    Calculate EMAs for given spans
-    """
-    emas = {}
-    for span in spans:
-        emas[f'EMA_{span}'] = data['Close'].ewm(span=span, adjust=False).mean()
-    return emas
-    
-def calculate_macd(data, fast_period=12, slow_period=26, signal_period=9):
-    """Calculate MACD (Moving Average Convergence Divergence)"""
-    # Calculate Fast and Slow EMA
-    ema_fast = data['Close'].ewm(span=fast_period, adjust=False).mean()
-    ema_slow = data['Close'].ewm(span=slow_period, adjust=False).mean()
-    
-    # Calculate MACD line and Signal line
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
-    histogram = macd_line - signal_line
-    
-    return {
-        'macd_line': macd_line,
-        'signal_line': signal_line,
-        'histogram': histogram
-    }
+    return fetch_batch_history(list(tickers), period=period, interval=interval, batch_size=batch_size, max_age=600, app="dashboard")
 
 def check_ema_alignment(emas):
     """
-    Check if EMAs are aligned (7 EMA > 11 EMA > 21 EMA)
+    Check if EMAs are aligned (7 EMA > 11 EMA > 21 EMA), given their latest values
     """
-    if all(pd.isna(ema.iloc[-1]) for ema in emas.values()):
+    if all(pd.isna(ema) for ema in emas.values()):
         return False
     
-    return emas['EMA_7'].iloc[-1] > emas['EMA_11'].iloc[-1] > emas['EMA_21'].iloc[-1]
+    return emas['EMA_7'] > emas['EMA_11'] > emas['EMA_21']
 
-def calculate_bullish_score(daily_rsi, weekly_rsi, ema_aligned, macd_above_signal, pct_change):
+def calculate_scan_indicators(daily_frames, weekly_frames):
     """
-    Calculate a bullish score to sort results (higher is more bullish)
-    Uses RSI and MACD for scoring
+    Latest scan indicators for many tickers (Wilder RSI, EMAs and MACD as
+    pandas ewm computes them). Each ticker's recursive state is kept
+    between refreshes, so only new or revised bars are computed; tickers
+    without usable state are rebuilt in one vectorized panel pass.
+    Returns {ticker: dict of latest values}
     """
-    # Daily RSI is weighted 2x as it's more current
-    score = daily_rsi * 2 + weekly_rsi
-    
-    # Add bonus points for good MACD signal
-    if macd_above_signal:
-        score += 10  # Bonus for positive MACD
-    
-    return score
+    daily = INDICATOR_STATES.update(daily_frames, "1d")
+    weekly = INDICATOR_STATES.update(weekly_frames, "1wk")
+    
+    indicators = {}
+    for ticker, values in daily.items():
+        weekly_values = weekly.get(ticker)
+        indicators[ticker] = {
+            "daily_rsi": values["rsi"],
+            "weekly_rsi": weekly_values["rsi"] if weekly_values else np.nan,
+            "has_rsi": bool(values["has_rsi"] and weekly_values and weekly_values["has_rsi"]),
+            "rsi_signal": values["rsi_signal"],
+            "macd_line": values["macd_line"],
+            "signal_line": values["signal_line"],
+            "emas": {f"EMA_{span}": value for span, value in values["emas"].items()},
+            "series": values["series"],
+        }
+    return indicators
 
-def scan_ticker(ticker, display_name):
+def scan_ticker(ticker, display_name, daily_data=None, weekly_data=None, indicators=None):
     """
-    Scan a ticker and return analysis based on criteria
+    Scan a ticker and return analysis based on criteria.
+    Pre-fetched daily/weekly data can be passed in (e.g. from a batched download);
+    otherwise the ticker is fetched on its own. indicators are the ticker's
+    values from calculate_scan_indicators when the whole scan was computed at once.
     """
     try:
-        # Fetch data
-        daily_data = fetch_stock_data(ticker, period="3mo", interval="1d")
-        weekly_data = fetch_stock_data(ticker, period="1y", interval="1wk")
+        # Fetch data - one daily history, weekly bars are derived from it
+        if daily_data is None or weekly_data is None:
+            daily_history = fetch_stock_data(ticker, period="1y", interval="1d")
+            daily_data = split_timeframe(daily_history, "3mo", "1d")
+            weekly_data = split_timeframe(daily_history, "1y", "1wk")
         
         if daily_data.empty or weekly_data.empty or len(daily_data) < 30 or len(weekly_data) < 14:
             return {"display_name": display_name, "error": "Insufficient data", "score": -1000}
         
         # Calculate indicators
-        daily_rsi = calculate_rsi(daily_data)
-        weekly_rsi = calculate_rsi(weekly_data)
-        emas = calculate_ema(daily_data)
+        if indicators is None:
+            indicators = calculate_scan_indicators({ticker: daily_data}, {ticker: weekly_data})[ticker]
+        emas = indicators["emas"]
 
         # Check if RSI calculations returned valid data
-        if daily_rsi.empty or weekly_rsi.empty or daily_rsi.isna().all() or weekly_rsi.isna().all():
+        if not indicators["has_rsi"]:
             return {"display_name": display_name, "error": "Invalid RSI calculation", "score": -1000}
 
-        # Get latest values - ensure they exist before proceeding
-        try:
-            latest_daily_rsi = daily_rsi.iloc[-1]
-            latest_weekly_rsi = weekly_rsi.iloc[-1]
-            
-            # Only calculate signal line if we have valid RSI values
-            if not pd.isna(latest_daily_rsi):
-                # Calculate RSI signal line (9-period SMA of RSI)
-                daily_rsi_signal = calculate_rsi_signal(daily_rsi, period=9)
-                latest_rsi_signal = daily_rsi_signal.iloc[-1]
-                
-                # Handle potential NaN in signal line
-                if pd.isna(latest_rsi_signal):
-                    rsi_above_signal = False
-                    rsi_signal_status = "❌"
-                else:
-                    rsi_above_signal = latest_daily_rsi > latest_rsi_signal
-                    rsi_signal_status = "✅" if rsi_above_signal else "❌"
-            else:
-                # Default values if RSI is invalid
-                latest_rsi_signal = np.nan
-                rsi_above_signal = False
-                rsi_signal_status = "❌"
-        except (IndexError, KeyError) as e:
-            return {"display_name": display_name, "error": f"RSI data access error: {str(e)}", "score": -1000}
+        # Get latest values
+        latest_daily_rsi = indicators["daily_rsi"]
+        latest_weekly_rsi = indicators["weekly_rsi"]
         
-        # Add MACD calculation here
-        macd = calculate_macd(daily_data)
-        try:
-            latest_macd_line = macd['macd_line'].iloc[-1]
-            latest_signal_line = macd['signal_line'].iloc[-1]
-            macd_above_zero = latest_macd_line > 0
-            macd_above_signal = latest_macd_line > latest_signal_line
-            macd_status = "✅" if macd_above_signal else "❌"
-        except (IndexError, KeyError) as e:
-            # Handle MACD calculation errors
-            latest_macd_line = np.nan
-            latest_signal_line = np.nan
-            macd_above_zero = False
-            macd_above_signal = False
-            macd_status = "❌"
+        # RSI signal line (9-period SMA of RSI), only used if the latest RSI is valid
+        latest_rsi_signal = indicators["rsi_signal"] if not pd.isna(latest_daily_rsi) else np.nan
+        if pd.isna(latest_rsi_signal):
+            rsi_above_signal = False
+            rsi_signal_status = "❌"
+        else:
+            rsi_above_signal = latest_daily_rsi > latest_rsi_signal
+            rsi_signal_status = "✅" if rsi_above_signal else "❌"
+        
+        # MACD
+        latest_macd_line = indicators["macd_line"]
+        latest_signal_line = indicators["signal_line"]
+        macd_above_zero = latest_macd_line > 0
+        macd_above_signal = latest_macd_line > latest_signal_line
+        macd_status = "✅" if macd_above_signal else "❌"
 
         ema_aligned = check_ema_alignment(emas)
-        
-        # Determine conditions
-        daily_bullish = latest_daily_rsi > 50
-        weekly_bullish = latest_weekly_rsi > 50
-        
-        # Prepare status strings
-        daily_status = "Bullish" if daily_bullish else "Bearish"
-        weekly_status = "Bullish" if weekly_bullish else "Bearish"
         ema_status = "✅" if ema_aligned else "❌"
         
-        # Determine emoji
-        if daily_bullish and weekly_bullish:
-            emoji = "🚀🚀"
-        elif not daily_bullish and weekly_bullish:
-            emoji = "🕣🕣"
-        elif daily_bullish and not weekly_bullish:
-            emoji = "⚠️⚠️"
-        else:
-            emoji = "💀💀"
+        # Trend statuses, emoji and bullish score from the dashboard scorecard (strategies/dashboard.json)
+        scored = DASHBOARD.evaluate({
+            "daily_rsi": latest_daily_rsi,
+            "weekly_rsi": latest_weekly_rsi,
+            "rsi_signal": latest_rsi_signal,
+            "macd_line": latest_macd_line,
+            "signal_line": latest_signal_line,
+        })
+        daily_status = scored["daily_status"]
+        weekly_status = scored["weekly_status"]
+        emoji = scored["emoji"]
         
         # Current price
         current_price = daily_data['Close'].iloc[-1]
@@ -1249,11 +1174,6 @@ def scan_ticker(ticker, display_name):
         else:
             pct_change = 0
             
-        # Update bullish score calculation to include RSI signal
-        bullish_score = calculate_bullish_score(latest_daily_rsi, latest_weekly_rsi, ema_aligned, macd_above_signal, pct_change)
-        if rsi_above_signal:
-            bullish_score += 5  # Add bonus points for RSI above signal line
-        
         # Return result as dictionary for easier sorting
         return {
             "display_name": display_name,
@@ -1269,10 +1189,8 @@ def scan_ticker(ticker, display_name):
             "rsi_signal": latest_rsi_signal,
             "price": current_price,
             "pct_change": pct_change,
-            "score": bullish_score,
-            "daily_data": daily_data,
-            "weekly_data": weekly_data,
-            "emas": emas,
+            "score": scored["score"],
+            "chart": chart_bundle(daily_data, indicators["series"]),
             "error": None
         }
     
@@ -1284,12 +1202,30 @@ def scan_ticker(ticker, display_name):
             "score": -1000
         }
         
+def chart_bundle(daily_data, series):
+    """
+    Everything create_chart draws, as plain arrays: daily OHLC plus the EMA and
+    RSI series computed during the scan (so charting computes nothing)
+    """
+    bundle = {
+        "dates": daily_data.index,
+        "open": daily_data['Open'].to_numpy(),
+        "high": daily_data['High'].to_numpy(),
+        "low": daily_data['Low'].to_numpy(),
+        "close": daily_data['Close'].to_numpy(),
+        "rsi": series["rsi"],
+    }
+    for span in [7, 11, 21]:
+        bundle[f'EMA_{span}'] = series[span]
+    return bundle
+
 def create_chart(result):
     """
-    Create an interactive chart for a given ticker
+    Create an interactive chart for a given ticker from its scan-time chart bundle
     """
-    if result.get("error") or "daily_data" not in result:
+    if result.get("error") or "chart" not in result:
         return None
+    chart = result["chart"]
     
     # Create figure with secondary y-axis
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
@@ -1299,44 +1235,43 @@ def create_chart(result):
     
     # Add candlestick chart
     fig.add_trace(go.Candlestick(
-        x=result["daily_data"].index,
-        open=result["daily_data"]['Open'],
-        high=result["daily_data"]['High'],
-        low=result["daily_data"]['Low'],
-        close=result["daily_data"]['Close'],
+        x=chart["dates"],
+        open=chart["open"],
+        high=chart["high"],
+        low=chart["low"],
+        close=chart["close"],
         name="Price",
         increasing_line_color='#26A69A', 
         decreasing_line_color='#EF5350'
     ), row=1, col=1)
     
     # Add EMAs
-    emas = result["emas"]
     colors = ['#1E88E5', '#FFC107', '#7CB342']  # Blue, Amber, Green
     for i, span in enumerate([7, 11, 21]):
         fig.add_trace(go.Scatter(
-            x=emas[f'EMA_{span}'].index,
-            y=emas[f'EMA_{span}'],
+            x=chart["dates"],
+            y=chart[f'EMA_{span}'],
             mode='lines',
             line=dict(width=2, color=colors[i]),
             name=f'EMA {span}'
         ), row=1, col=1)
     
     # Add RSI
-    daily_rsi_series = calculate_rsi(result["daily_data"])
+    dates = chart["dates"]
     fig.add_trace(go.Scatter(
-        x=daily_rsi_series.index, 
-        y=daily_rsi_series,
+        x=dates, 
+        y=chart["rsi"],
         line=dict(color='#BA68C8', width=2),
         name='RSI (14)'
     ), row=2, col=1)
     
     # Add RSI horizontal lines at 70 and 30
-    fig.add_shape(type="line", x0=daily_rsi_series.index[0], x1=daily_rsi_series.index[-1], 
+    fig.add_shape(type="line", x0=dates[0], x1=dates[-1], 
                  y0=70, y1=70, line=dict(color="red", width=1, dash="dash"), row=2, col=1)
-    fig.add_shape(type="line", x0=daily_rsi_series.index[0], x1=daily_rsi_series.index[-1], 
+    fig.add_shape(type="line", x0=dates[0], x1=dates[-1], 
                  y0=30, y1=30, line=dict(color="green", width=1, dash="dash"), row=2, col=1)
     # Add a center line at 50
-    fig.add_shape(type="line", x0=daily_rsi_series.index[0], x1=daily_rsi_series.index[-1], 
+    fig.add_shape(type="line", x0=dates[0], x1=dates[-1], 
                  y0=50, y1=50, line=dict(color="gray", width=1, dash="dash"), row=2, col=1)
     
     # Update layout
@@ -1614,6 +1549,17 @@ def main():
         st.markdown("<p style='font-size: 0.875rem; color: #6B7280; margin: 1rem 0 0.5rem;'>Display Options</p>", unsafe_allow_html=True)
         show_charts = st.checkbox("Show Charts for Top Performers", value=True)
         
+        # Download batching
+        st.markdown("<p style='font-size: 0.875rem; color: #6B7280; margin: 1rem 0 0.5rem;'>Download Batch Size (tickers per request)</p>", unsafe_allow_html=True)
+        batch_size = st.slider(
+            "",  # Empty label since we're using the custom label above
+            min_value=10,
+            max_value=200,
+            value=DEFAULT_BATCH_SIZE,
+            step=10,
+            key="batch_size"
+        )
+        
         st.markdown("<div style='height: 1px; background-color: #E5E7EB; margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
         
         st.markdown("""
@@ -1712,26 +1658,102 @@ def main():
             # Create a progress bar
             progress_bar = st.progress(0)
             
+            # Download the whole selected universe in grouped requests
+            universe = tuple(
+                ticker
+                for category in selected_categories if category in TICKER_CATEGORIES
+                for ticker in TICKER_CATEGORIES[category]
+            )
+            # One daily history per ticker; the weekly bars are resampled locally
+            daily_histories, batch_stats = fetch_batched_stock_data(universe, period="1y", interval="1d", batch_size=batch_size)
+            
             # Collect all results
             all_results = []
-            category_results = {cat: [] for cat in selected_categories}
             tickers_scanned = 0
             
-            # Scan each selected category
-            for category in selected_categories:
-                if category in TICKER_CATEGORIES:
-                    category_tickers = TICKER_CATEGORIES[category]
-                    
-                    # Scan each ticker in the category
-                    for ticker, name in category_tickers.items():
-                        result = scan_ticker(ticker, name)
-                        result["category"] = category  # Add category info
-                        all_results.append(result)
-                        category_results[category].append(result)
-                        
-                        # Update progress
-                        tickers_scanned += 1
-                        progress_bar.progress(tickers_scanned / total_tickers)
+            # Split each history into the scan's daily and weekly bars, then update
+            # the indicators of every ticker with enough data from its saved state
+            # (memoized on the cached history, so unchanged tickers keep the same frames)
+            daily_frames = {
+                ticker: BAR_CACHE.derived(ticker, "1d", ("3mo", "1d"), history, lambda h: split_timeframe(h, "3mo", "1d"))
+                for ticker, history in daily_histories.items()
+            }
+            weekly_frames = {
+                ticker: BAR_CACHE.derived(ticker, "1d", ("1y", "1wk"), history, lambda h: split_timeframe(h, "1y", "1wk"))
+                for ticker, history in daily_histories.items()
+            }
+            # Scan results are memoized on the bars: reruns over unchanged bars reuse them
+            memo_keys = {
+                ticker: INDICATOR_MEMO.key(ticker, "1d", SCAN_PARAMS, (daily_frames[ticker], weekly_frames[ticker]))
+                for ticker in daily_frames
+            }
+            memoized = {}
+            for ticker, key in memo_keys.items():
+                snapshot = INDICATOR_MEMO.get(key)
+                if snapshot is not None:
+                    memoized[ticker] = snapshot
+            scannable = [
+                ticker for ticker in daily_frames
+                if ticker not in memoized and len(daily_frames[ticker]) >= 30 and len(weekly_frames[ticker]) >= 14
+            ]
+            scan_indicators = calculate_scan_indicators(
+                {ticker: daily_frames[ticker] for ticker in scannable},
+                {ticker: weekly_frames[ticker] for ticker in scannable}
+            )
+            # Keep the indicator states for a warm start after a restart
+            INDICATOR_STATES.save()
+            
+            def scan_item(item):
+                """Scan one (category, ticker, name) item, fetching on its own only if the batch missed it"""
+                category, ticker, name = item
+                if QUARANTINE.blocked(ticker):
+                    return {"display_name": name, "ticker": ticker, "error": "Quarantined after repeated fetch failures", "score": -1000}
+                if ticker in daily_frames:
+                    result = memoized.get(ticker)
+                    if result is None:
+                        result = scan_ticker(
+                            ticker, name, daily_frames[ticker], weekly_frames[ticker], scan_indicators.get(ticker)
+                        )
+                        # Errors are not memoized, so the ticker is retried on the next rerun
+                        if result.get("error") is None:
+                            INDICATOR_MEMO.put(memo_keys[ticker], result)
+                    # Copy: the memoized result is shared, and the same ticker can be listed under several names
+                    return dict(result, display_name=name)
+                return scan_ticker(ticker, name)
+            
+            # Scan each ticker of each selected category on the shared bounded pool
+            scan_items = [
+                (category, ticker, name)
+                for category in selected_categories if category in TICKER_CATEGORIES
+                for ticker, name in TICKER_CATEGORIES[category].items()
+            ]
+            scanned = {}
+            ctx = get_script_run_ctx()
+            for item, result, error in fetch_many(scan_items, scan_item, initializer=lambda: add_script_run_ctx(ctx=ctx)):
+                if error is not None:
+                    result = {"display_name": item[2], "ticker": item[1], "error": str(error), "score": -1000}
+                scanned[item] = result
+                
+                # Update progress
+                tickers_scanned += 1
+                progress_bar.progress(tickers_scanned / total_tickers)
+            
+            # Keep category order regardless of completion order
+            scores, groups = [], []
+            for item in scan_items:
+                result = scanned[item]
+                result["category"] = item[0]  # Add category info
+                all_results.append(result)
+                if result.get("error"):
+                    scores.append(None)
+                    groups.append(())
+                else:
+                    # Bullish/Bearish when the daily and weekly trends agree
+                    trend = (result["daily_status"],) if result["daily_status"] == result["weekly_status"] else ()
+                    scores.append(result.get("score", -1000))
+                    groups.append((item[0],) + trend)
+            # Ranked by bullish score; ties keep category order
+            leaderboard = Leaderboard.build(scan_items, scores, all_results, groups)
             
             # Remove progress elements when done
             progress_bar.empty()
@@ -1740,8 +1762,8 @@ def main():
             # Calculate market metrics for sidebar
             valid_results = [r for r in all_results if not r.get("error")]
             if valid_results:
-                bullish_count = sum(1 for r in valid_results if r["daily_status"] == "Bullish" and r["weekly_status"] == "Bullish")
-                bearish_count = sum(1 for r in valid_results if r["daily_status"] == "Bearish" and r["weekly_status"] == "Bearish")
+                bullish_count = leaderboard.count("Bullish")
+                bearish_count = leaderboard.count("Bearish")
                 mixed_count = len(valid_results) - bullish_count - bearish_count
                 
                 # Display metrics in sidebar
@@ -1782,17 +1804,13 @@ def main():
                     
                     st.markdown("""</div>""", unsafe_allow_html=True)
             
-            # Sort all results by bullish score (most bullish first)
-            all_results.sort(key=lambda x: x.get("score", -1000), reverse=True)
-            # Assign global ranks to all results
-            for idx, result in enumerate(all_results, 1):
-                if not result.get("error"):
-                    result["global_rank"] = idx
+            # Assign global ranks by bullish score (most bullish first)
+            ranked_results = leaderboard.ranked()
+            for idx, result in enumerate(ranked_results, 1):
+                result["global_rank"] = idx
             
-            # Sort category results
-            for cat in category_results:
-                category_results[cat] = [r for r in category_results[cat] if not r.get("error")]
-                category_results[cat].sort(key=lambda x: x.get("score", -1000), reverse=True)
+            # Category results in the same order, without sorting again
+            category_results = {cat: leaderboard.ranked(cat) for cat in selected_categories}
         
         # Display the results in the main area
         with results_placeholder.container():
@@ -1806,7 +1824,7 @@ def main():
                 # All Markets tab
                 with tabs[0]:
                     display_data = []
-                    for r in all_results:
+                    for r in ranked_results:
                         if not r.get("error"):
                             display_data.append({
                                 "Rank": r["global_rank"],
@@ -2028,10 +2046,8 @@ def main():
                     st.markdown('<div class="card">', unsafe_allow_html=True)
                     st.subheader("📈 Top Bulls")
                     
-                    # Filter and sort by highest RSI for bulls
-                    bullish_results = [r for r in valid_results 
-                                      if r["daily_status"] == "Bullish" and r["weekly_status"] == "Bullish"]
-                    bullish_results.sort(key=lambda x: x.get("score", -1000), reverse=True)
+                    # Highest bullish scores among the bulls
+                    bullish_results = leaderboard.top(3, "Bullish")
                     
                     # Show top 3 (or fewer if not enough)
                     top_n = min(3, len(bullish_results))
@@ -2077,10 +2093,8 @@ def main():
                     st.markdown('<div class="card">', unsafe_allow_html=True)
                     st.subheader("📉 Top Bears")
                     
-                    # Filter and sort by lowest RSI for bears
-                    bearish_results = [r for r in valid_results 
-                                      if r["daily_status"] == "Bearish" and r["weekly_status"] == "Bearish"]
-                    bearish_results.sort(key=lambda x: x.get("score", 1000))
+                    # Lowest bullish scores among the bears
+                    bearish_results = leaderboard.bottom(3, "Bearish")
                     
                     # Show top 3 (or fewer if not enough)
                     top_n = min(3, len(bearish_results))
@@ -2128,6 +2142,34 @@ def main():
             with st.expander("Show Errors", expanded=False):
                 for e in errors:
                     st.error(f"{e['display_name']}: {e['error']}")
+        
+        # Show per-batch download latency to help tune the batch size
+        if batch_stats:
+            with st.expander("Data Fetch Stats", expanded=False):
+                stats_df = pd.DataFrame(batch_stats)
+                total_seconds = stats_df["seconds"].sum()
+                st.caption(f"{len(stats_df)} grouped requests, {total_seconds:.2f}s total, "
+                           f"{stats_df['seconds'].mean():.2f}s per batch on average")
+                st.dataframe(stats_df, use_container_width=True, hide_index=True)
+        
+        # Bar cache shared with the other Stockbot apps in this process
+        with st.expander("Bar Cache", expanded=False):
+            st.dataframe(pd.DataFrame(BAR_CACHE.report()), use_container_width=True, hide_index=True)
+            flight = IN_FLIGHT.stats()
+            st.caption(f"{flight['fetches']} fetches run, {flight['duplicates saved']} duplicate concurrent fetches saved by coalescing")
+            served = INDICATOR_STATES.stats()
+            st.caption(f"Indicators: {served['unchanged']} unchanged, {served['provisional']} latest bar updated, "
+                       f"{served['committed']} new bars committed, {served['rebuilt']} rebuilt from full history")
+            memo = INDICATOR_MEMO.stats()
+            st.caption(f"Indicator snapshots: {memo['snapshots']} held ({memo['memory MB']} MB), hit rate {memo['hit rate']:.0%}")
+        
+        # Symbols skipped because they keep failing (delisted, renamed, ...)
+        quarantined = QUARANTINE.report()
+        if quarantined:
+            with st.expander(f"Quarantined Symbols ({len(quarantined)})", expanded=False):
+                st.dataframe(pd.DataFrame(quarantined), use_container_width=True, hide_index=True)
+                if st.button("Retry quarantined symbols on the next scan"):
+                    QUARANTINE.clear()
     
     else:
         st.warning("Please select at least one category to scan.")
@@ -0,0 +1,688 @@
+"""
+Declarative strategies for the strategy scanner.
+
+A strategy is a JSON file in strategies/ (STOCKBOT_STRATEGIES points
+elsewhere). It gives its parameters, names indicators and conditions as small
+expressions over one timeframe's bars, and builds its rules, display metrics
+and setups from them (see strategies/strict.json):
+
+    "params":  {"rsi_window": 14, ...}
+    "define":  {"rsi": "rsi(rsi_window)", "golden_cross": "recent(cross_up(macd, signal), 9)", ...}
+    "rules":   {"W_RSI_Long": {"timeframe": "weekly", "when": "rsi > 50 and rsi > rsi_ma", ...}, ...}
+    "metrics": [{"id": "W_RSI", "timeframe": "weekly", "cases": [...], ...}, ...]
+    "setups":  [{"side": "Long", "trend": [...], "check": ..., "entries": [...]}, ...]
+
+Expressions are Python syntax limited to names, numbers, strings, arithmetic,
+comparisons, and/or/not and these functions:
+
+    open high low close                      price columns
+    ema(n) rsi(n) sma(x, n)                  indicators (x is another indicator)
+    macd(f, s, g) macd_signal(f, s, g) macd_hist(f, s, g)
+    cross_up(x, y) cross_down(x, y)          events on the bar they complete (events.py)
+    hook(x, bars, "up"|"down") touch_and_reject(extreme, close, level, "support"|"resistance")
+    recent(condition, n)                     condition held on one of the last n bars
+    round(x, digits) abs(x)
+
+Strategy() compiles a spec once. Only the indicators its expressions reference
+are computed, for every symbol of a timeframe in one panel pass
+(indicators()), and only the last bars the expressions read are kept.
+classify() then evaluates every rule, metric and setup as array operations
+over all symbols. Text is only built for the rows on screen, by metrics(),
+rules_met() and rule_details().
+
+A Scorecard compiles the same expressions over values the caller already has
+(the dashboard's latest indicator values) into labels and a score.
+"""
+import ast
+import json
+import os
+import string
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+import events
+import panel
+
+STRATEGY_DIR = os.environ.get(
+    "STOCKBOT_STRATEGIES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategies")
+)
+
+# Timeframes a strategy can read, in evaluation order
+TIMEFRAMES = ("weekly", "daily", "monthly")
+
+PRICE_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close"}
+MACD_PARTS = ("macd", "macd_signal", "macd_hist")
+
+BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+}
+COMPARISONS = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+
+class _Indicator:
+    """An indicator column, known by its canonical call (e.g. 'sma(rsi(14), 9)')"""
+
+    def __init__(self, name, args=()):
+        self.name = name
+        self.args = tuple(args)
+        if name in PRICE_COLUMNS or not self.args:
+            self.key = name
+        else:
+            self.key = f"{name}({', '.join(arg.key if isinstance(arg, _Indicator) else repr(arg) for arg in self.args)})"
+        self.indicators = {self.key: self}
+        for arg in self.args:
+            if isinstance(arg, _Indicator):
+                self.indicators.update(arg.indicators)
+
+
+class _Expr:
+    """A compiled expression: evaluate(columns) gives its values, history is the trailing bars it reads"""
+
+    def __init__(self, evaluate, history, indicators):
+        self.evaluate = evaluate
+        self.history = history
+        self.indicators = indicators
+
+
+def _is_constant(node):
+    return not isinstance(node, (_Indicator, _Expr))
+
+
+def _plain(value):
+    # Folded constants stay Python numbers, so they can be used as indicator lengths
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _as_expr(node):
+    if isinstance(node, _Expr):
+        return node
+    if isinstance(node, _Indicator):
+        key = node.key
+        return _Expr(lambda columns: columns[key], 1, dict(node.indicators))
+    return _Expr(lambda columns: node, 0, {})
+
+
+def _recent(values, bars):
+    """True where values held on any of the last `bars` bars (this one included)"""
+    hits = np.cumsum(np.asarray(values, dtype=bool), axis=0)
+    if bars < 1:
+        return np.zeros(hits.shape, dtype=bool)
+    before = np.zeros_like(hits)
+    before[bars:] = hits[:-bars]
+    return hits - before > 0
+
+
+class _Compiler:
+    """
+    Compiles expression strings against a spec's params and defines.
+    leaf(name) resolves the remaining names; with series=True the indicator
+    and event functions are available (expressions over bars), otherwise
+    only plain arithmetic (expressions over latest values).
+    """
+
+    def __init__(self, params, defines, leaf, series=True):
+        self.params = params
+        self.defines = defines
+        self.leaf = leaf
+        self.series = series
+        self.compiled = {}  # define name -> node
+        self.expanding = []
+
+    def compile(self, source):
+        try:
+            tree = ast.parse(str(source).strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {source!r}: {e.msg}")
+        return self._node(tree.body)
+
+    def _node(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float, str)):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self._name(node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+            func = np.logical_not if isinstance(node.op, ast.Not) else np.negative
+            return self._apply(func, self._node(node.operand))
+        if isinstance(node, ast.BoolOp):
+            func = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            operands = [self._node(value) for value in node.values]
+            return self._apply(lambda *values: reduce(func, values), *operands)
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            return self._apply(BINARY_OPERATORS[type(node.op)], self._node(node.left), self._node(node.right))
+        if isinstance(node, ast.Compare) and all(type(op) in COMPARISONS for op in node.ops):
+            # a < b < c means a < b and b < c
+            operands = [self._node(node.left)] + [self._node(value) for value in node.comparators]
+            parts = [
+                self._apply(COMPARISONS[type(op)], operands[k], operands[k + 1])
+                for k, op in enumerate(node.ops)
+            ]
+            return self._apply(lambda *values: reduce(np.logical_and, values), *parts)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self._call(node.func.id, [self._node(arg) for arg in node.args])
+        raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
+
+    def _name(self, name):
+        if name in self.params:
+            return self.params[name]
+        if name in self.defines:
+            if name not in self.compiled:
+                if name in self.expanding:
+                    raise ValueError(f"Circular definition: {' -> '.join(self.expanding + [name])}")
+                self.expanding.append(name)
+                try:
+                    self.compiled[name] = self.compile(self.defines[name])
+                finally:
+                    self.expanding.pop()
+            return self.compiled[name]
+        node = self.leaf(name)
+        if node is None:
+            raise ValueError(f"Unknown name '{name}'")
+        return node
+
+    def _apply(self, func, *operands, history=0):
+        """func over the operands' values; folded now if they are all constants"""
+        if all(_is_constant(operand) for operand in operands):
+            return _plain(func(*operands))
+        exprs = [_as_expr(operand) for operand in operands]
+
+        def evaluate(columns):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return func(*(expr.evaluate(columns) for expr in exprs))
+
+        indicators = {}
+        for expr in exprs:
+            indicators.update(expr.indicators)
+        return _Expr(evaluate, max(expr.history for expr in exprs) + history, indicators)
+
+    def _call(self, name, args):
+        if name == "round" and len(args) in (1, 2):
+            digits = self._length(name, args[1]) if len(args) > 1 else 0
+            return self._apply(lambda values: np.round(values, digits), args[0])
+        if name == "abs" and len(args) == 1:
+            return self._apply(np.abs, args[0])
+        if not self.series:
+            raise ValueError(f"Unknown function or wrong arguments: {name}()")
+        if name in ("ema", "rsi") and len(args) == 1:
+            return _Indicator(name, [self._length(name, args[0])])
+        if name == "sma" and len(args) == 2:
+            if not isinstance(args[0], _Indicator):
+                raise ValueError("sma() averages an indicator, e.g. sma(rsi(14), 9)")
+            return _Indicator(name, [args[0], self._length(name, args[1])])
+        if name in MACD_PARTS and len(args) == 3:
+            return _Indicator(name, [self._length(name, arg) for arg in args])
+        if name in ("cross_up", "cross_down") and len(args) == 2:
+            self._series(name, args[0])
+            return self._apply(getattr(events, name), *args, history=1)
+        if name == "hook" and len(args) in (1, 2, 3):
+            self._series(name, args[0])
+            bars = self._length(name, args[1]) if len(args) > 1 else 3
+            direction = args[2] if len(args) > 2 else "up"
+            return self._apply(lambda values: events.hook(values, bars, direction), args[0], history=bars - 1)
+        if name == "touch_and_reject" and len(args) in (3, 4):
+            self._series(name, args[0])
+            side = args[3] if len(args) > 3 else "support"
+            return self._apply(lambda *values: events.touch_and_reject(*values, side=side), *args[:3], history=1)
+        if name == "recent" and len(args) == 2:
+            bars = self._length(name, args[1])
+            return self._apply(lambda values: _recent(values, bars), args[0], history=max(bars - 1, 0))
+        raise ValueError(f"Unknown function or wrong arguments: {name}()")
+
+    @staticmethod
+    def _length(name, value):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{name}() needs whole-number lengths, got {value!r}")
+        return value
+
+    @staticmethod
+    def _series(name, value):
+        if _is_constant(value):
+            raise ValueError(f"{name}() needs a series, got {value!r}")
+
+
+def _price_column(name):
+    return _Indicator(name) if name in PRICE_COLUMNS else None
+
+
+def _latest(node, columns, n):
+    """The latest bar's value of a compiled node for n symbols"""
+    values = np.asarray(_as_expr(node).evaluate(columns))
+    if values.ndim == 0:
+        return np.full(n, values[()])
+    return values[-1]
+
+
+def _tail(values, rows):
+    """The last `rows` rows, padded with NaN at the top when there are fewer"""
+    if len(values) >= rows:
+        return values[-rows:]
+    padded = np.full((rows,) + values.shape[1:], np.nan)
+    padded[rows - len(values):] = values
+    return padded
+
+
+def _fields(text):
+    """Names used by a format string"""
+    return {field.split(".")[0].split("[")[0] for _, field, _, _ in string.Formatter().parse(text) if field}
+
+
+class _Missing:
+    """Formats as N/A whatever the format spec, for timeframes a symbol has no bars on"""
+
+    def __format__(self, spec):
+        return "N/A"
+
+
+MISSING = _Missing()
+
+
+class Strategy:
+    """A strategy spec compiled into vectorized rules, metrics and setups"""
+
+    def __init__(self, spec, source=None):
+        self.spec = spec
+        self.name = spec.get("name") or source or "Strategy"
+        self.description = spec.get("description", "")
+        self.params = dict(spec.get("params", {}))
+        guide = spec.get("guide", "")
+        self.guide = self._text("\n".join(guide) if isinstance(guide, list) else guide)
+        scoring = spec.get("scoring", {})
+        self.min_entries = scoring.get("min_entries", 2)
+        self.check_penalty = scoring.get("check_penalty", 1)
+        optional = set(spec.get("optional_timeframes", []))
+
+        self._compiler = _Compiler(self.params, spec.get("define", {}), _price_column)
+        self.nodes = {tf: [] for tf in TIMEFRAMES}  # compiled nodes read on each timeframe
+        self.quotes = {tf: {} for tf in TIMEFRAMES}  # names quoted by the text, per timeframe
+
+        self.rules = {}
+        for rule_id, rule in spec.get("rules", {}).items():
+            timeframe = self._timeframe(rule, f"rule {rule_id}")
+            compiled = {
+                "timeframe": timeframe,
+                "when": self._compile(rule["when"], timeframe),
+                "name": self._text(rule.get("name", rule_id)),
+                "details": self._quote(rule.get("details", ""), timeframe),
+                "label": self._text(rule.get("label", rule_id)),
+            }
+            for part in ("strong", "bonus"):
+                if part in rule:
+                    compiled[part] = self._compile(rule[part], timeframe)
+                    compiled[f"{part}_label"] = self._text(rule.get(f"{part}_label", compiled["label"]))
+            if "warning" in rule:
+                compiled["warning"] = self._text(rule["warning"])
+            self.rules[rule_id] = compiled
+
+        self.metric_specs = []
+        for metric in spec.get("metrics", []):
+            timeframe = self._timeframe(metric, f"metric {metric.get('id')}")
+            default = metric.get("default", {})
+            self.metric_specs.append({
+                "id": metric["id"],
+                "column": metric.get("column", metric["id"]),
+                "timeframe": timeframe,
+                "value": self._quote(metric.get("value", ""), timeframe),
+                "cases": [
+                    (self._compile(case["when"], timeframe), case.get("signal", "neutral"),
+                     self._quote(case.get("desc", ""), timeframe))
+                    for case in metric.get("cases", [])
+                ],
+                "default": (default.get("signal", "neutral"), self._quote(default.get("desc", ""), timeframe)),
+            })
+        # Results table column of each display metric
+        self.metric_columns = {metric["column"]: metric["id"] for metric in self.metric_specs}
+
+        self.setups = []
+        for setup in spec.get("setups", []):
+            used = setup.get("trend", []) + setup.get("entries", []) + ([setup["check"]] if setup.get("check") else [])
+            for rule_id in used:
+                if rule_id not in self.rules:
+                    raise ValueError(f"{self.name}: setup {setup['side']} uses unknown rule {rule_id}")
+            self.setups.append({
+                "side": setup["side"],
+                "direction": setup.get("direction", 1),
+                "trend": list(setup.get("trend", [])),
+                "entries": list(setup.get("entries", [])),
+                "check": setup.get("check"),
+            })
+
+        # Timeframes read, the indicator columns computed on each and the bars kept
+        self.timeframes = [tf for tf in TIMEFRAMES if self.nodes[tf]]
+        self.required = [tf for tf in self.timeframes if tf not in optional]
+        self.indicator_nodes = {}
+        self.columns, self.keep = {}, {}
+        for tf in self.timeframes:
+            found = {}
+            for node in self.nodes[tf]:
+                found.update(_as_expr(node).indicators)
+            self.indicator_nodes.update(found)
+            self.columns[tf] = sorted(found)
+            self.keep[tf] = max([1] + [_as_expr(node).history for node in self.nodes[tf]])
+        # Shortest history every indicator is defined on
+        lengths = [arg for node in self.indicator_nodes.values() for arg in node.args if isinstance(arg, int)]
+        self.min_bars = max([1] + lengths)
+
+    def _timeframe(self, item, what):
+        timeframe = item.get("timeframe")
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"{self.name}: {what} needs a timeframe out of {', '.join(TIMEFRAMES)}")
+        return timeframe
+
+    def _compile(self, source, timeframe):
+        node = self._compiler.compile(source)
+        self.nodes[timeframe].append(node)
+        return node
+
+    def _text(self, text):
+        """Static text: only params are filled in"""
+        return text.format(**self.params) if _fields(text) <= set(self.params) else text
+
+    def _quote(self, text, timeframe):
+        """Text quoting latest values; the names it uses are evaluated along with the rules"""
+        for name in _fields(text):
+            if name not in self.params and name not in self.quotes[timeframe]:
+                self.quotes[timeframe][name] = self._compile(name, timeframe)
+        return text
+
+    def signature(self, timeframe):
+        """What indicators() computes on a timeframe; snapshots can be shared between equal signatures"""
+        return (tuple(self.columns.get(timeframe, ())), self.keep.get(timeframe, 1), self.min_bars)
+
+    def prices(self, timeframe):
+        """The bar columns indicators() reads on a timeframe"""
+        keys = self.columns.get(timeframe, ())
+        return ("Close",) + tuple(PRICE_COLUMNS[key] for key in keys if key in PRICE_COLUMNS and key != "close")
+
+    def indicators(self, frames, timeframe):
+        """
+        The indicator columns this strategy reads on one timeframe, for many
+        symbols in one panel pass. Returns {symbol: (bars x columns) array of
+        the last bars its expressions look at}. Symbols with fewer than
+        min_bars bars are left out, as the indicators are undefined for them.
+        """
+        keys, keep = self.columns.get(timeframe), self.keep.get(timeframe)
+        if not keys:
+            return {}
+        frames = {symbol: data for symbol, data in frames.items()
+                  if data is not None and len(data) >= self.min_bars}
+        bars = panel.Panel(frames, columns=self.prices(timeframe))
+        if not len(bars):
+            return {}
+        computed = {}
+        stacked = np.stack(
+            [_tail(self._compute(self.indicator_nodes[key], bars, computed), keep) for key in keys], axis=-1
+        )
+        return {symbol: stacked[:, j, :].copy() for j, symbol in enumerate(bars.symbols)}
+
+    def _compute(self, node, bars, computed):
+        """One indicator matrix, with the same values as pandas_ta on each symbol"""
+        if node.key in computed:
+            return computed[node.key]
+        close, args = bars["Close"], node.args
+        if node.name in PRICE_COLUMNS:
+            values = bars[PRICE_COLUMNS[node.name]]
+        elif node.name == "ema":
+            values = panel.ema(close, args[0], sma_seed=True, starts=bars.starts)
+        elif node.name == "rsi":
+            values = panel.rma_rsi(close, args[0])
+        elif node.name == "sma":
+            values = panel.sma(self._compute(args[0], bars, computed), args[1])
+        else:
+            # One MACD pass gives the line, signal and histogram
+            parts = panel.macd(close, *args, sma_seed=True, starts=bars.starts)
+            for part, part_values in zip(MACD_PARTS, parts):
+                computed[_Indicator(part, args).key] = part_values
+            values = computed[node.key]
+        computed[node.key] = values
+        return values
+
+    def classify(self, recent):
+        """
+        Rules, metrics, setup and score of every symbol as array operations.
+        recent is {timeframe: {symbol: indicators() array}}; symbols missing a
+        required timeframe are left out. Returns a table with a row per symbol
+        for metrics(), rules_met() and rule_details().
+        """
+        first = recent.get(self.required[0], {}) if self.required else {}
+        symbols = [symbol for symbol in first if all(symbol in recent.get(tf, {}) for tf in self.required)]
+        n = len(symbols)
+        envs, present = {}, {}
+        for tf in self.timeframes:
+            snapshots, keys = recent.get(tf, {}), self.columns[tf]
+            block = np.full((self.keep[tf], n, len(keys)), np.nan)
+            present[tf] = np.zeros(n, dtype=bool)
+            for j, symbol in enumerate(symbols):
+                values = snapshots.get(symbol)
+                if values is not None:
+                    block[:, j, :] = values
+                    present[tf][j] = True
+            envs[tf] = {key: block[:, :, k] for k, key in enumerate(keys)}
+        return pd.DataFrame(self.evaluate(envs, present), index=pd.Index(symbols, dtype=object))
+
+    def evaluate(self, envs, present, describe=True):
+        """
+        Rules, setup and score on the last row of envs, {timeframe: {indicator
+        column: (bars x n) matrix}}, for n columns at once (symbols, or days
+        of a symbol's history). present is {timeframe: (n,) bool}. With
+        describe, also the metric cases and quoted values the text needs.
+        Returns {table column: (n,) array}.
+        """
+        n = len(next(iter(present.values()))) if present else 0
+        table = {f"{tf}:present": present[tf] for tf in self.timeframes}
+
+        def latest(node, tf):
+            return _latest(node, envs[tf], n)
+
+        for rule_id, rule in self.rules.items():
+            table[rule_id] = latest(rule["when"], rule["timeframe"]).astype(bool)
+            for part in ("strong", "bonus"):
+                if part in rule:
+                    table[f"{rule_id}:{part}"] = latest(rule[part], rule["timeframe"]).astype(bool)
+
+        for metric in self.metric_specs if describe else []:
+            tf = metric["timeframe"]
+            conditions = [latest(when, tf).astype(bool) for when, _, _ in metric["cases"]]
+            cases = np.select(conditions, np.arange(1, len(conditions) + 1), 0) if conditions else np.zeros(n, dtype=int)
+            # Without bars on the metric's timeframe it shows its default
+            table[metric["id"]] = np.where(table[f"{tf}:present"], cases, 0)
+
+        setup = np.full(n, "None", dtype=object)
+        score = np.zeros(n, dtype=int)
+        trends = np.zeros(n, dtype=int)
+        for side in self.setups:
+            name = side["side"]
+            trend = reduce(np.logical_and, [table[rule] for rule in side["trend"]], np.ones(n, dtype=bool))
+            # Entry rules only count once every trend rule holds
+            entries = np.where(trend, sum((table[rule].astype(int) for rule in side["entries"]), np.zeros(n, dtype=int)), 0)
+            contradicted = ~table[side["check"]] if side["check"] else np.zeros(n, dtype=bool)
+            bonus = sum((table[f"{rule}:bonus"].astype(int) for rule in side["trend"] if "bonus" in self.rules[rule]),
+                        np.zeros(n, dtype=int))
+            potential, watch = entries >= self.min_entries, entries > 0
+            found = [potential & contradicted, potential, watch]
+            side_setup = np.select(found, [f"Caution {name}", f"Potential {name}", f"Watch {name}"], "None")
+            base = entries + len(side["trend"])
+            side_score = np.select(found, [base - self.check_penalty, base + bonus, base], 0) * side["direction"]
+            # A later side wins where it finds a setup
+            assigned = side_setup != "None"
+            setup = np.where(assigned, side_setup, setup)
+            score = np.where(assigned, side_score, score)
+            table[f"{name}:trend"] = trend
+            trends += trend
+        # The trend rules of more than one side hold at once
+        conflicting = trends > 1
+        table["Setup"] = np.where(conflicting, "Conflicting", setup)
+        table["Score"] = np.where(conflicting, 0, score)
+
+        # Latest values quoted by the text
+        for tf in self.timeframes if describe else []:
+            for name, node in self.quotes[tf].items():
+                table[f"{tf}.{name}"] = latest(node, tf).astype(float)
+        return table
+
+    def _values(self, row, timeframe):
+        """Format fields of one timeframe: params and the latest quoted values"""
+        values = dict(self.params)
+        present = row[f"{timeframe}:present"]
+        for name in self.quotes[timeframe]:
+            values[name] = row[f"{timeframe}.{name}"] if present else MISSING
+        return values
+
+    def metrics(self, row):
+        """Display metrics (value, signal, description) of one classified row"""
+        result = {}
+        for metric in self.metric_specs:
+            values = self._values(row, metric["timeframe"])
+            case = int(row[metric["id"]])
+            signal, desc = metric["cases"][case - 1][1:] if case else metric["default"]
+            result[metric["id"]] = {
+                "value": metric["value"].format(**values),
+                "signal": signal,
+                "desc": desc.format(**values),
+            }
+        return result
+
+    def _setup_side(self, setup):
+        for side in self.setups:
+            if setup in (f"Potential {side['side']}", f"Watch {side['side']}", f"Caution {side['side']}"):
+                return side
+        return None
+
+    def rules_met(self, row):
+        """Labels of the rules behind one classified row's setup"""
+        setup = row["Setup"]
+        if setup == "Conflicting":
+            return ["Conflicting Signals"]
+        side = self._setup_side(setup)
+        if side is None:
+            return []
+        # Watch setups list the entry rules without their strong variants
+        watch = setup.startswith("Watch")
+        met = [self.rules[rule]["label"] for rule in side["trend"]]
+        if not watch:
+            met += [self.rules[rule]["bonus_label"] for rule in side["trend"]
+                    if "bonus" in self.rules[rule] and row[f"{rule}:bonus"]]
+        for rule_id in side["entries"]:
+            rule = self.rules[rule_id]
+            if row[rule_id]:
+                strong = not watch and "strong" in rule and row[f"{rule_id}:strong"]
+                met.append(rule["strong_label"] if strong else rule["label"])
+        if setup.startswith("Caution") and side["check"]:
+            check = self.rules[side["check"]]
+            met.append(check.get("warning", check["label"]))
+        return met
+
+    def rule_details(self, row):
+        """Every rule of every side with its status and the values behind it"""
+        details = {}
+
+        def detail(rule_id, critical):
+            rule = self.rules[rule_id]
+            entry = {
+                "name": rule["name"],
+                "status": bool(row[rule_id]),
+                "details": rule["details"].format(**self._values(row, rule["timeframe"])),
+                "critical": critical,
+            }
+            for part in ("strong", "bonus"):
+                if part in rule:
+                    entry[part] = bool(row[f"{rule_id}:{part}"])
+            details[rule_id] = entry
+
+        for side in self.setups:
+            for rule_id in side["trend"]:
+                detail(rule_id, True)
+            if side["check"]:
+                detail(side["check"], False)
+            # Entry rules are only checked once the trend holds
+            if row[f"{side['side']}:trend"]:
+                for rule_id in side["entries"]:
+                    detail(rule_id, False)
+        return details
+
+
+class Scorecard:
+    """
+    Labels and a score from values the caller already has (e.g. the
+    dashboard's latest indicator values), compiled from a spec's "inputs",
+    "params", "define", "labels" and "score".
+    """
+
+    def __init__(self, spec, source=None):
+        self.spec = spec
+        self.name = spec.get("name") or source or "Scorecard"
+        self.inputs = list(spec.get("inputs", []))
+        inputs = set(self.inputs)
+        compiler = _Compiler(
+            dict(spec.get("params", {})),
+            spec.get("define", {}),
+            lambda name: _Indicator(name) if name in inputs else None,
+            series=False,
+        )
+        self.labels = {
+            name: ([(compiler.compile(case["when"]), case["label"]) for case in label.get("cases", [])],
+                   label.get("default", ""))
+            for name, label in spec.get("labels", {}).items()
+        }
+        self.score = compiler.compile(spec.get("score", "0"))
+
+    def evaluate(self, values):
+        """{label name: label, 'score': score} for {input: value}, or for arrays of values at once"""
+        columns = {name: np.asarray(values[name], dtype=float) for name in self.inputs}
+        result = {}
+        for name, (cases, default) in self.labels.items():
+            conditions = [np.asarray(_as_expr(when).evaluate(columns), dtype=bool) for when, _ in cases]
+            labels = np.select(conditions, [label for _, label in cases], default) if conditions else np.asarray(default)
+            result[name] = labels.item() if labels.ndim == 0 else labels
+        score = np.asarray(_as_expr(self.score).evaluate(columns), dtype=float)
+        result["score"] = score.item() if score.ndim == 0 else score
+        return result
+
+
+# Compiled specs by (path, kind), with the file's modification time they were compiled from
+_COMPILED = {}
+
+
+def _load(path, kind):
+    mtime = os.path.getmtime(path)
+    cached = _COMPILED.get((path, kind))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    compiled = None
+    if spec.get("kind", "strategy") == kind:
+        source = os.path.splitext(os.path.basename(path))[0]
+        compiled = (Scorecard if kind == "scorecard" else Strategy)(spec, source)
+    _COMPILED[path, kind] = (mtime, compiled)
+    return compiled
+
+
+def load_strategies(directory=None):
+    """{name: Strategy} for every strategy spec in the strategies folder, compiled once per file version"""
+    directory = directory or STRATEGY_DIR
+    strategies = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            strategy = _load(os.path.join(directory, filename), "strategy")
+            if strategy is not None:
+                strategies[strategy.name] = strategy
+    return strategies
+
+
+def load_scorecard(name, directory=None):
+    """The scorecard spec strategies/<name>.json, compiled"""
+    scorecard = _load(os.path.join(directory or STRATEGY_DIR, f"{name}.json"), "scorecard")
+    if scorecard is None:
+        raise ValueError(f"{name}.json is not a scorecard spec")
+    return scorecard
@@ -0,0 +1,235 @@
+"""
+The strategy scanner's scan pipeline, without Streamlit.
+
+A scan of any number of symbols runs in three phases:
+
+- fetch: one daily history per symbol in grouped downloads, a few batches at
+  a time (market_data.fetch_batch_history); weekly and monthly bars are
+  resampled locally and kept on the shared cache entry,
+- indicators: one panel pass per timeframe over the symbols whose bars
+  changed since the last scan (snapshots are memoized on the bars),
+  optionally split over worker processes (see parallel.py),
+- classify: the setups of every symbol in one vectorized pass.
+
+Every symbol selected is scanned. MAX_TICKERS (STOCKBOT_MAX_SCAN_TICKERS)
+is an optional safety valve for small hosts, off by default. Each phase is
+timed against SCAN_BUDGET (STOCKBOT_SCAN_BUDGET seconds), the latency a
+full-universe scan is expected to fit in; `python benchmarks.py
+strategy-scan` checks it.
+"""
+import os
+import time
+
+from bar_cache import BAR_CACHE
+from indicator_memo import INDICATOR_MEMO
+from market_data import DEFAULT_BATCH_SIZE, fetch_batch_history, longest_period, split_timeframe
+import parallel
+from quarantine import QUARANTINE
+
+# Timeframes
+TF_CONDITIONS = '1wk'  # Timeframe for Market Conditions (Weekly)
+TF_ENTRY = '1d'        # Timeframe for Entry Signals (Daily)
+TF_MONTHLY = '1mo'     # Monthly timeframe for additional context
+
+# Data Periods
+PERIOD_CONDITIONS = "5y"
+PERIOD_ENTRY = "1y"
+PERIOD_MONTHLY = "10y"
+
+# Timeframe name used by the strategy specs -> bar interval
+TIMEFRAME_INTERVALS = {"weekly": TF_CONDITIONS, "daily": TF_ENTRY, "monthly": TF_MONTHLY}
+# (period, interval) of the weekly, daily and monthly frames of a scan
+SCAN_TIMEFRAMES = [(PERIOD_CONDITIONS, TF_CONDITIONS), (PERIOD_ENTRY, TF_ENTRY), (PERIOD_MONTHLY, TF_MONTHLY)]
+
+# Bars fetched less than this many seconds ago are reused (30 minutes while the market is open)
+MAX_AGE = 1800
+# Grouped downloads in flight at once
+BATCH_WORKERS = int(os.environ.get("STOCKBOT_BATCH_WORKERS", 4))
+# Optional cap on the symbols of one scan; 0 scans everything selected
+MAX_TICKERS = int(os.environ.get("STOCKBOT_MAX_SCAN_TICKERS", 0))
+# Seconds a full-universe scan is expected to take at most
+SCAN_BUDGET = float(os.environ.get("STOCKBOT_SCAN_BUDGET", 60))
+
+
+def error_result(ticker, name, setup, message=None):
+    """Result row of a ticker that could not be scanned"""
+    return {
+        "ticker": ticker,
+        "name": name,
+        "Setup": setup,
+        "Score": 0,
+        "Rules Met": [f"Error: {message}"] if message else [],
+        "error": True,
+        "metrics": {},
+        "rule_details": {}
+    }
+
+
+def fetch_frames(tickers, min_bars, batch_size=DEFAULT_BATCH_SIZE, max_workers=BATCH_WORKERS, progress=None):
+    """
+    (weekly, daily, monthly) bars of every ticker with at least min_bars
+    weekly and daily bars, from grouped downloads of one daily history each.
+    progress(done, total) is called as batches finish.
+    Returns {ticker: frames}; tickers without enough bars are left out.
+    """
+    longest = longest_period([period for period, _ in SCAN_TIMEFRAMES])
+    histories, _ = fetch_batch_history(tickers, period=longest, interval="1d", batch_size=batch_size, max_age=MAX_AGE,
+                                       app="strategy", max_workers=max_workers, progress=progress)
+    frames = {}
+    for ticker, daily in histories.items():
+        if daily is None or daily.empty:
+            continue
+        # Derived frames are kept on the shared cache entry, as get_timeframes does
+        data = [
+            BAR_CACHE.derived(ticker, "1d", (period, interval), daily,
+                              lambda d, p=period, i=interval: split_timeframe(d, p, i))
+            for period, interval in SCAN_TIMEFRAMES
+        ]
+        if len(data[0]) >= min_bars and len(data[1]) >= min_bars:
+            frames[ticker] = tuple(data)
+    return frames
+
+
+def strategy_snapshots(frames, strategy, timeframe):
+    """
+    Each symbol's recent values of the indicators the strategy reads on one
+    timeframe (see Strategy.indicators). Snapshots are memoized on the bars,
+    so only symbols whose bars changed since the last rerun are computed, in
+    one panel pass (on worker processes if parallel.SCAN_PROCESSES is set).
+    Symbols without enough bars are left out.
+    """
+    interval = TIMEFRAME_INTERVALS[timeframe]
+    # Strategies reading the same indicators share snapshots
+    params = ("strategy", timeframe) + strategy.signature(timeframe)
+    snapshots, stale, keys = {}, {}, {}
+    for symbol, data in frames.items():
+        if data is None or data.empty:
+            continue
+        keys[symbol] = INDICATOR_MEMO.key(symbol, interval, params, data)
+        snapshot = INDICATOR_MEMO.get(keys[symbol])
+        if snapshot is None:
+            stale[symbol] = data
+        else:
+            snapshots[symbol] = snapshot
+    for symbol, recent in parallel.indicators(strategy, stale, timeframe).items():
+        snapshots[symbol] = INDICATOR_MEMO.put(keys[symbol], recent)
+    return snapshots
+
+
+def classify_setups(strategy, snapshots):
+    """
+    Classify every symbol in one vectorized pass. Takes {timeframe: {symbol:
+    snapshot}} and returns {symbol: row of strategy.classify()}; descriptions
+    are built from a row when shown.
+    """
+    return strategy.classify(snapshots).to_dict("index")
+
+
+def analyze_ticker(ticker, name, strategy, data_conditions, data_entry, data_monthly, snapshots=None, setup=None):
+    """
+    Run the indicator and setup checks on one ticker's fetched data.
+    snapshots holds the ticker's {timeframe: snapshot} of strategy_snapshots
+    and setup its row of classify_setups when the whole scan was computed at
+    once; otherwise they are computed here.
+    """
+    if data_conditions is None or data_entry is None:
+        return error_result(ticker, name, "Data Error")
+
+    if snapshots is None:
+        frames = dict(zip(("weekly", "daily", "monthly"), (data_conditions, data_entry, data_monthly)))
+        snapshots = {
+            timeframe: strategy.indicators({ticker: frames[timeframe]}, timeframe).get(ticker)
+            for timeframe in strategy.timeframes
+        }
+
+    if setup is None:
+        setup = classify_setups(strategy, {
+            timeframe: {ticker: snapshot} for timeframe, snapshot in snapshots.items() if snapshot is not None
+        }).get(ticker)
+
+    if setup is None:
+        return error_result(ticker, name, "Calc Error")
+
+    # Calculate price and date for display
+    current_price = data_entry['Close'].iloc[-1]
+    last_date = data_entry.index[-1].strftime('%Y-%m-%d')
+
+    return {
+        "ticker": ticker,
+        "name": name,
+        "Setup": setup["Setup"],
+        "Score": setup["Score"],
+        "Price": round(current_price, 2),
+        "Last Date": last_date,
+        "error": False,
+        # Metrics, rules met and rule details are described from this row when displayed
+        "rules": setup
+    }
+
+
+def scan(tickers, strategy, max_tickers=MAX_TICKERS, batch_size=DEFAULT_BATCH_SIZE, max_workers=BATCH_WORKERS,
+         progress=None):
+    """
+    Scan {ticker: name} with a strategy. max_tickers (0 for no limit) caps
+    the symbols scanned; progress(message, fraction) reports each phase.
+    Returns (results in the order of tickers, stats) where stats holds the
+    symbol counts, the seconds of each phase and whether the scan went over
+    SCAN_BUDGET.
+    """
+    started = time.perf_counter()
+    report = progress or (lambda message, fraction: None)
+    selected = list(tickers)
+    if max_tickers and len(selected) > max_tickers:
+        selected = selected[:max_tickers]
+
+    # Symbols that keep failing are skipped until their backoff expires
+    results = {}
+    to_fetch = []
+    for ticker in selected:
+        if QUARANTINE.blocked(ticker):
+            results[ticker] = error_result(ticker, tickers[ticker], "Error", "Quarantined after repeated fetch failures")
+        else:
+            to_fetch.append(ticker)
+
+    report(f"Fetching {len(to_fetch)} tickers...", 0.0)
+    frames = fetch_frames(
+        to_fetch, strategy.min_bars, batch_size, max_workers,
+        progress=lambda done, total: report(f"Fetched {done}/{total} tickers...", 0.8 * done / total)
+    )
+    fetched = time.perf_counter()
+
+    # Indicators for every ticker whose bars changed, one vectorized pass per timeframe
+    # (only the indicators the strategy reads, on the timeframes it uses)
+    report(f"Calculating indicators for {len(frames)} tickers...", 0.8)
+    snapshots = {
+        timeframe: strategy_snapshots({ticker: data[k] for ticker, data in frames.items()}, strategy, timeframe)
+        for k, timeframe in enumerate(("weekly", "daily", "monthly"))
+        if timeframe in strategy.timeframes
+    }
+    computed = time.perf_counter()
+
+    # Setups of every ticker in one pass
+    report(f"Classifying {len(frames)} tickers...", 0.95)
+    setups = classify_setups(strategy, snapshots)
+    for ticker in to_fetch:
+        data = frames.get(ticker, (None, None, None))
+        results[ticker] = analyze_ticker(
+            ticker, tickers[ticker], strategy, *data,
+            snapshots={timeframe: found.get(ticker) for timeframe, found in snapshots.items()},
+            setup=setups.get(ticker)
+        )
+    finished = time.perf_counter()
+    report(f"Scan Complete: {len(results)} tickers analyzed.", 1.0)
+
+    stats = {
+        "selected": len(tickers),
+        "scanned": len(selected),
+        "classified": len(setups),
+        "fetch seconds": fetched - started,
+        "indicator seconds": computed - fetched,
+        "classify seconds": finished - computed,
+        "seconds": finished - started,
+        "over budget": finished - started > SCAN_BUDGET,
+    }
+    # Keep the original ticker order
+    return [results[ticker] for ticker in selected], stats
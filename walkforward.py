@@ -0,0 +1,156 @@
+"""
+Walk-forward evaluation of a strategy's thresholds.
+
+The thresholds of a strategy (e.g. rsi_mid or the monthly RSI 60/40 levels
+of the strict strategy) are re-fitted on a rolling training window and the
+chosen values are traded on the window that follows, which they have not
+seen. Test windows tile the history back from its last day; each one is
+trained on the `train` period before it.
+
+Thresholds do not change the indicators, so the work is shared:
+
+- the indicator windows of every day are built once, and every threshold
+  variant only evaluates its rules on them (signals.historical_variants),
+- the variants' entry days are one (variants x bars x symbols) array on the
+  daily panel, which folds slice by date,
+- folds then only simulate trades (backtest.simulate), in parallel on a
+  process pool that receives the panel and entries once per worker.
+
+Training trades must exit before the test window starts, so no fold is
+fitted on bars it is scored on.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import bar_store
+import optimizer
+import panel
+import signals
+import strategy_rules
+
+DEFAULT_TRAIN = "3y"
+DEFAULT_TEST = "1y"
+DEFAULT_OBJECTIVE = "profit factor"
+MIN_TRAIN_TRADES = 30  # fewer training trades cannot pick a variant
+
+# Panel, entries and settings of this worker process, set once by _start_worker
+_STATE = None
+
+
+def folds(first, last, train=DEFAULT_TRAIN, test=DEFAULT_TEST):
+    """
+    (train start, test start, test end) of every fold between two dates,
+    oldest first: test windows of length `test` back from the day after
+    last, each with a full `train` period from first on before it
+    """
+    windows = []
+    test_end = pd.Timestamp(last).normalize() + pd.Timedelta(days=1)
+    while True:
+        test_start = bar_store.period_start(test, test_end)
+        train_start = bar_store.period_start(train, test_start)
+        if train_start < pd.Timestamp(first).normalize():
+            break
+        windows.append((train_start, test_start, test_end))
+        test_end = test_start
+    return windows[::-1]
+
+
+def _start_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _stats(trades):
+    _, summary = backtest.trade_stats(trades)
+    return {name: summary[name] for name in optimizer.STATS}
+
+
+def _run_fold(fold):
+    bars, entries, dates, direction, exits, objective, min_trades = _STATE
+    train_start, test_start, test_end = fold
+    train = (dates >= train_start) & (dates < test_start)
+    test = (dates >= test_start) & (dates < test_end)
+
+    scores = np.full(len(entries), np.nan)
+    counts = np.zeros(len(entries), dtype=int)
+    for variant, fired in enumerate(entries):
+        trades = backtest.simulate(bars, fired & train, direction, **exits)
+        # Only trades that were over when the test window opens
+        trades = trades[trades["Exit date"] < test_start]
+        counts[variant] = len(trades)
+        if len(trades) >= min_trades:
+            scores[variant] = _stats(trades)[objective]
+    # Variant 0 is the strategy as specified, kept when no variant has enough trades
+    chosen = int(np.nanargmax(scores)) if not np.isnan(scores).all() else 0
+
+    tested = backtest.simulate(bars, entries[chosen] & test, direction, **exits)
+    baseline = backtest.simulate(bars, entries[0] & test, direction, **exits)
+    row = {"Train start": train_start, "Test start": test_start, "Test end": test_end,
+           "Variant": chosen, "Train trades": counts[chosen], f"Train {objective}": scores[chosen]}
+    row.update({f"Test {name}": value for name, value in _stats(tested).items()})
+    row.update({f"Baseline {name}": value for name, value in _stats(baseline).items()})
+    return row, tested.assign(**{"Test start": test_start})
+
+
+def walk_forward(name, frames, space, setup="Potential Long", train=DEFAULT_TRAIN, test=DEFAULT_TEST,
+                 objective=DEFAULT_OBJECTIVE, min_trades=MIN_TRAIN_TRADES, exits=None, workers=None):
+    """
+    Walk-forward test of strategy `name`'s thresholds in space ({param:
+    values}, see optimizer.grid) on {symbol: daily bars}, trading `setup`
+    with the backtest exits (hold/stop/target/cost). Each fold picks the
+    variant with the best training objective (an optimizer.STATS name) and
+    is scored on its test window, next to the strategy as specified
+    ("Baseline"). Raises ValueError for params that change the indicators.
+    Returns {"folds": a row per fold, "variants": the params of each
+    variant, "trades": the out-of-sample trades, "summary": their stats}.
+    """
+    if objective not in optimizer.STATS:
+        raise ValueError(f"Unknown objective: {objective}")
+    strategy, direction = backtest.signal_spec(("setup", name, setup))
+    unknown = sorted(set(space) - set(strategy.params))
+    if unknown:
+        raise ValueError(f"Unknown parameters for {name}: {', '.join(unknown)}")
+    combinations = [{}] + [params for params in optimizer.grid(space, strategy.params)
+                           if any(strategy.params[key] != value for key, value in params.items())]
+    variants = [strategy_rules.Strategy(dict(strategy.spec, params=dict(strategy.params, **params)), strategy.name)
+                for params in combinations]
+
+    frames = signals.clean_frames(frames)
+    history = signals.historical_variants(variants, frames)
+    bars = panel.Panel(frames, columns=("Open", "High", "Low", "Close"))
+    code = signals.setup_labels(strategy).index(setup)
+    entries = np.zeros((len(variants), bars.rows, len(bars)), dtype=bool)
+    for j, symbol in enumerate(bars.symbols):
+        table = history.get(symbol)
+        if table is None:
+            continue
+        rows = bars.starts[j] + bars.index[symbol].get_indexer(table.index)
+        # Setups fire on the first day they appear
+        entries[:, rows, j] = backtest.first_days(table.to_numpy() == code).T
+    dates = backtest.panel_dates(bars)
+    first = min(index[0] for index in bars.index.values())
+    last = max(index[-1] for index in bars.index.values())
+    windows = folds(first, last, train, test)
+
+    state = (bars, entries, dates, direction, dict(exits or {}), objective, min_trades)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(windows) or 1))
+    if workers == 1:
+        _start_worker(state)
+        results = [_run_fold(fold) for fold in windows]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(state,)) as pool:
+            results = list(pool.map(_run_fold, windows))
+
+    rows = [row for row, _ in results]
+    trades = pd.concat([fold_trades for _, fold_trades in results], ignore_index=True) if results else pd.DataFrame()
+    table = pd.DataFrame(rows)
+    params = pd.DataFrame([{key: dict(strategy.params, **combination)[key] for key in space}
+                           for combination in combinations])
+    if len(table):
+        table = table.join(params, on="Variant")
+    _, summary = backtest.trade_stats(trades) if len(trades) else (None, {})
+    return {"folds": table, "variants": params, "trades": trades, "summary": summary}